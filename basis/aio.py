@@ -0,0 +1,152 @@
+"""Non-blocking entry points for services that run an :mod:`asyncio`
+event loop. The assembly and diagonalization run in an executor (the
+default thread pool, or any :class:`concurrent.futures.Executor` such as
+a process pool), so the event loop stays responsive while a solve is in
+progress.
+
+Identical requests that are in flight at the same time share a single
+solve. Cancelling a request only cancels the underlying solve once every
+caller waiting for it has been cancelled; a solve that has already
+started in an executor runs to completion but its result is discarded.
+
+.. note:: This module needs python 3.5 or later.
+"""
+import asyncio
+_inflight = {}
+"""dict: keys are the request tuples from :func:`_key`; values are lists
+`[future, waiters]` of the shared future for the solve and the number of
+callers waiting for it.
+"""
+def _key(loop, config, N, nev, params):
+    """Returns a hashable key that identifies a solve request.
+    """
+    from os import path
+    return (id(loop), path.abspath(config), N, nev, tuple(sorted(params.items())))
+
+def _solve(config, N, nev, params):
+    """Solves for the lowest levels of the potential in `config` with the
+    `params` adjusted; runs in the executor.
+
+    Returns:
+        tuple: `(E, C)` for the `nev` lowest levels.
+    """
+    from basis.solver import Solver
+    solver = Solver(config, N)
+    if len(params) > 0:
+        solver.update(**params)
+    E, C = solver.solve(nev)
+    return E[0:nev], C[:,0:nev]
+
+async def _shared(key, submit):
+    """Waits for the solve with the given key, submitting it through
+    `submit` if no identical request is already in flight.
+    """
+    if key not in _inflight:
+        future = submit()
+        _inflight[key] = [future, 0]
+        future.add_done_callback(lambda f: _inflight.pop(key, None))
+    entry = _inflight[key]
+    entry[1] += 1
+    try:
+        return await asyncio.shield(entry[0])
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not entry[0].done():
+            entry[0].cancel()
+
+async def solve_async(config, N, nev=10, executor=None, **params):
+    """Solves for the lowest energy levels of a potential without blocking
+    the event loop.
+
+    Args:
+        config (str): path to the potential config file.
+        N (int): number of basis functions to use.
+        nev (int): number of energy levels to return.
+        executor (concurrent.futures.Executor): executor that runs the solve;
+          defaults to the event loop's default thread pool.
+        params (dict): values of potential parameters to adjust before
+          solving.
+
+    Returns:
+        tuple: `(E, C)` with the `nev` lowest energies and the eigenvectors in
+          the columns of `C`.
+
+    Examples:
+        >>> E, C = await solve_async("potentials/paper.cfg", 200, nev=5, v0=50.)
+    """
+    from functools import partial
+    loop = asyncio.get_event_loop()
+    key = _key(loop, config, N, nev, params)
+    submit = partial(loop.run_in_executor, executor,
+                     partial(_solve, config, N, nev, params))
+    return await _shared(key, submit)
+
+class sweep_async(object):
+    """Asynchronous iterator over the points of a parameter sweep. All the
+    points are submitted to the executor at once and yielded as they
+    complete, so they arrive out of order when the executor has several
+    workers.
+
+    Args:
+        config (str): path to the potential config file.
+        N (int): number of basis functions to use.
+        param (str): name of the parameter to vary.
+        values (list): of values for the parameter.
+        nev (int): number of energy levels to compute at each point.
+        executor (concurrent.futures.Executor): executor that runs the
+          solves; defaults to the event loop's default thread pool.
+
+    Examples:
+        >>> async for value, E, C in sweep_async("potentials/paper.cfg", 200,
+        ...                                      "v0", [10., 20., 30.]):
+        ...     print(value, E[0])
+    """
+    def __init__(self, config, N, param, values, nev=10, executor=None):
+        self.config = config
+        self.N = N
+        self.param = param
+        self.values = list(values)
+        self.nev = nev
+        self.executor = executor
+        self._pending = None
+
+    async def _point(self, value):
+        """Solves a single point of the sweep.
+        """
+        E, C = await solve_async(self.config, self.N, self.nev,
+                                 self.executor, **{self.param: value})
+        return value, E, C
+
+    def cancel(self):
+        """Cancels the points of the sweep that have not completed yet.
+        """
+        if self._pending is not None:
+            for task in self._pending:
+                task.cancel()
+            self._pending = set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._pending is None:
+            self._pending = set(asyncio.ensure_future(self._point(v))
+                                for v in self.values)
+        if len(self._pending) == 0:
+            raise StopAsyncIteration
+
+        try:
+            done, self._pending = await asyncio.wait(
+                self._pending, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+
+        #Return one completed point now and put the rest back so that they
+        #are returned immediately by the next calls.
+        task = done.pop()
+        for other in done:
+            self._pending.add(other)
+        if task.exception() is not None:
+            self.cancel()
+        return task.result()
@@ -0,0 +1,137 @@
+"""Analytic solutions that the basis expansion can be compared
+against. For the Kronig-Penney potential, the dispersion relation
+:math:`\\cos(ka) = f(E)` (see e.g. [1]_) is solved directly for the
+band energies, so no precomputed band files are needed.
+
+.. [1] http://dx.doi.org/10.1119/1.4944706
+"""
+import numpy as np
+def _sinq(q, l):
+    """Returns :math:`\\sin(ql)/q`, including the limit :math:`l` as
+    :math:`q \\rightarrow 0`. Works for complex `q`.
+    """
+    small = np.abs(q) < 1e-12
+    qs = np.where(small, 1., q)
+    return np.where(small, l, np.sin(qs*l)/qs)
+
+def kp_dispersion(E, v0, a, b):
+    """Returns the right-hand side :math:`f(E)` of the Kronig-Penney
+    dispersion relation :math:`\\cos(ka) = f(E)`, in units of
+    :math:`\\frac{\\hbar^2}{2 \\mu}` (the same units used for
+    :func:`basis.evaluate.H`).
+
+    Args:
+        E (numpy.ndarray or float): energies to evaluate at.
+        v0 (float): height of the barriers.
+        a (float): period of the lattice.
+        b (float): width of each barrier; the wells have width `a-b`.
+
+    Returns:
+        numpy.ndarray or float: values of :math:`f(E)`; energies inside a
+          band have :math:`|f(E)| \\leq 1`.
+    """
+    E = np.asarray(E, dtype=complex)
+    alpha = np.sqrt(E)
+    beta = np.sqrt(E - v0)
+    w = a - b
+    f = (np.cos(alpha*w)*np.cos(beta*b) -
+         0.5*(alpha**2 + beta**2)*_sinq(alpha, w)*_sinq(beta, b))
+    return f.real
+
+def _niter(width, tol):
+    """Returns the number of bisection steps needed to reduce `width`
+    below `tol`; capped because the energies run out of precision
+    anyway.
+    """
+    if len(width) == 0:
+        return 0
+    return min(64, int(np.ceil(np.log2(max(np.max(width), tol)/tol))))
+
+def _extrema(v0, a, b, Emin, Emax, npts, tol):
+    """Returns the sorted energies of the local extrema of :math:`f(E)`
+    between `Emin` and `Emax`. There is exactly one extremum in each gap
+    (including gaps that close), so these separate the bands.
+    """
+    Es = np.linspace(Emin, Emax, npts)
+    rising = np.diff(kp_dispersion(Es, v0, a, b)) > 0
+    turns = np.nonzero(rising[:-1] != rising[1:])[0]
+    lo, hi = Es[turns], Es[turns+2]
+    up = rising[turns]
+
+    #Bisection on the sign of the (numerical) derivative; `up` records
+    #whether f increases on the left side of the extremum.
+    for i in range(_niter(hi - lo, tol)):
+        mid = (lo + hi)/2.
+        h = 1e-7*np.maximum(1., np.abs(mid))
+        slope = kp_dispersion(mid+h, v0, a, b) - kp_dispersion(mid-h, v0, a, b)
+        left = (slope > 0) == up
+        lo = np.where(left, mid, lo)
+        hi = np.where(left, hi, mid)
+
+    return (lo + hi)/2.
+
+def kp_bands(v0, a, b, nbands=3, k=None, nk=121, tol=1e-12):
+    """Returns the analytic Kronig-Penney bands in the reduced zone by
+    solving :math:`\\cos(ka) = f(E)` for all bands and wave numbers at
+    once. The bands are bracketed by the extrema of :math:`f(E)` on an
+    energy grid (one per gap, so closed or narrow gaps are still
+    separated); the roots are then refined by vectorized bisection.
+
+    Args:
+        v0 (float): height of the barriers.
+        a (float): period of the lattice.
+        b (float): width of each barrier.
+        nbands (int): number of bands to return.
+        k (numpy.ndarray): wave numbers in :math:`[0, \\pi/a]` to solve
+          for. Defaults to `nk` evenly spaced values.
+        nk (int): number of wave numbers if `k` is not specified.
+        tol (float): absolute tolerance on the energies.
+
+    Returns:
+        tuple: `(k, E)` where `E` has shape `(nbands, len(k))`.
+    """
+    if k is None:
+        k = np.linspace(0, np.pi/a, nk)
+    k = np.asarray(k, dtype=float)
+    c = np.cos(k*a)
+
+    #Below the minimum of the potential f(E) > 1 and decreasing, so the
+    #first band starts after Emin. The grid only has to resolve the
+    #extrema, which are at least a band width apart.
+    Emin = min(0., v0) - 1.
+    Emax = ((nbands + 1)*np.pi/a)**2 + abs(v0)
+    edges = []
+    while len(edges) < nbands:
+        npts = int(200*(nbands + 1) + 20*np.sqrt(Emax - Emin)*a)
+        edges = _extrema(v0, a, b, Emin, Emax, npts, tol)
+        Emax *= 2
+
+    #Band j lies between consecutive extrema; f decreases through
+    #even-numbered bands and increases through odd-numbered ones.
+    edges = np.append(Emin, edges[0:nbands])
+    lo = np.repeat(edges[0:nbands,np.newaxis], len(k), axis=1)
+    hi = np.repeat(edges[1:,np.newaxis], len(k), axis=1)
+    sign = np.where(np.arange(nbands) % 2 == 0, 1., -1.)[:,np.newaxis]
+    for i in range(_niter(hi - lo, tol)):
+        mid = (lo + hi)/2.
+        right = sign*(kp_dispersion(mid, v0, a, b) - c) > 0
+        lo = np.where(right, mid, lo)
+        hi = np.where(right, hi, mid)
+
+    return k, (lo + hi)/2.
+
+def extended_zone(k, a, nbands):
+    """Unfolds reduced-zone wave numbers into the extended zone so that
+    band `j` spans :math:`[j\\pi/a, (j+1)\\pi/a]`.
+
+    Args:
+        k (numpy.ndarray): reduced-zone wave numbers in :math:`[0, \\pi/a]`.
+        a (float): period of the lattice.
+        nbands (int): number of bands to unfold.
+
+    Returns:
+        numpy.ndarray: with shape `(nbands, len(k))`.
+    """
+    j = np.arange(nbands)[:,np.newaxis]
+    odd = j % 2 == 1
+    return np.where(odd, (j+1)*np.pi/a - k, j*np.pi/a + k)
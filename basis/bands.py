@@ -0,0 +1,149 @@
+"""Interpolation of band structures :math:`E_n(k)` from a coarse grid
+of wave numbers. Bands of a 1D lattice with period `a` are even and
+periodic in :math:`k`, so each band is expanded in the cosine series
+
+.. math::
+
+   E_n(k) = \\sum_{m=0}^{M-1} c_{nm} \\cos(m k a),
+
+which is fitted to the coarse samples once and can then be evaluated
+on dense grids for the cost of a matrix product.
+"""
+import numpy as np
+def order_bands(E):
+    """Reorders the bands at each wave number so that they follow
+    smooth curves instead of being sorted by energy. Where two bands
+    cross, sorting by energy swaps them and puts kinks into both
+    curves, which ruins the interpolation.
+
+    Args:
+        E (numpy.ndarray): with shape `(nbands, nk)`; band energies sorted
+          by increasing wave number.
+
+    Returns:
+        numpy.ndarray: with the same shape as `E`, but with each column
+          permuted so that band `n` continues smoothly from `k[i-1]` to
+          `k[i]`.
+    """
+    result = np.array(E, dtype=float)
+    nbands, nk = result.shape
+    for i in range(1, nk):
+        #Linear extrapolation from the previous two points predicts where
+        #each band should be; the actual energies are then matched
+        #greedily to the closest predictions.
+        if i > 1:
+            pred = 2*result[:,i-1] - result[:,i-2]
+        else:
+            pred = result[:,i-1]
+        cost = np.abs(pred[:,np.newaxis] - result[:,i])
+        result[:,i] = result[match(cost),i]
+
+    return result
+
+def match(cost):
+    """Greedily matches rows to columns of a square cost matrix, taking
+    the cheapest remaining pair each time.
+
+    Args:
+        cost (numpy.ndarray): with shape `(n, n)`.
+
+    Returns:
+        numpy.ndarray: of `int` column indices; row `i` is matched to
+          column `result[i]`.
+    """
+    n = cost.shape[0]
+    result = np.empty(n, dtype=int)
+    rowfree = np.ones(n, dtype=bool)
+    colfree = np.ones(n, dtype=bool)
+    for flat in np.argsort(cost, axis=None):
+        i, j = divmod(flat, n)
+        if rowfree[i] and colfree[j]:
+            result[i] = j
+            rowfree[i] = colfree[j] = False
+    return result
+
+class BandInterpolator(object):
+    """Interpolates band energies computed on a coarse grid of wave
+    numbers in the reduced zone.
+
+    Args:
+        k (numpy.ndarray): coarse wave numbers in :math:`[0, \\pi/a]`.
+        E (numpy.ndarray): with shape `(nbands, len(k))`; band energies at
+          each of the wave numbers.
+        a (float): period of the lattice.
+        order (bool): when True, the bands are first reordered with
+          :func:`order_bands` so that crossings are followed.
+        nterms (int): number of cosine terms to use; defaults to `len(k)`,
+          which interpolates the coarse values exactly.
+
+    Attributes:
+        coeffs (numpy.ndarray): with shape `(nbands, nterms)`; fitted
+          coefficients of the cosine series for each band.
+        errors (numpy.ndarray): maximum absolute error for each band at the
+          verification points passed to :meth:`verify`; `None` until then.
+
+    Examples:
+        >>> from basis.analytic import kp_bands
+        >>> k, E = kp_bands(100., 1., 1./6, nbands=3, nk=9)
+        >>> bands = BandInterpolator(k, E, 1.)
+        >>> kv, Ev = kp_bands(100., 1., 1./6, nbands=3, k=[0.3, 1.7, 2.9])
+        >>> bands.verify(kv, Ev)
+        >>> Edense = bands(np.linspace(0, np.pi, 10000))
+    """
+    def __init__(self, k, E, a, order=True, nterms=None):
+        self.k = np.asarray(k, dtype=float)
+        self.a = a
+        E = np.asarray(E, dtype=float)
+        if order:
+            isort = np.argsort(self.k)
+            self.k = self.k[isort]
+            E = order_bands(E[:,isort])
+        self.E = E
+        if nterms is None:
+            nterms = len(self.k)
+        if nterms > len(self.k):
+            raise ValueError("Cannot fit {} cosine terms to {} wave "
+                             "numbers.".format(nterms, len(self.k)))
+        self.nterms = nterms
+        self.errors = None
+
+        basis = self._basis(self.k)
+        self.coeffs = np.linalg.lstsq(basis, E.T, rcond=None)[0].T
+
+    def _basis(self, k):
+        """Returns the matrix of cosine basis functions evaluated at `k`.
+        """
+        return np.cos(np.outer(np.asarray(k, dtype=float)*self.a,
+                               np.arange(self.nterms)))
+
+    def __call__(self, k):
+        """Evaluates the interpolated bands.
+
+        Args:
+            k (numpy.ndarray): wave numbers to evaluate at.
+
+        Returns:
+            numpy.ndarray: with shape `(nbands, len(k))`.
+        """
+        return np.dot(self.coeffs, self._basis(k).T)
+
+    def verify(self, k, E):
+        """Estimates the interpolation error by comparing to band energies
+        that were computed directly at a few wave numbers.
+
+        Args:
+            k (numpy.ndarray): verification wave numbers (they should not be
+              on the coarse grid).
+            E (numpy.ndarray): with shape `(nbands, len(k))`; exact band
+              energies at `k`, sorted by energy.
+
+        Returns:
+            numpy.ndarray: maximum absolute error for each band, which is
+              also stored in :attr:`errors`.
+        """
+        Ei = self(k)
+        #The verification energies are sorted by value at each k, so the
+        #interpolated ones have to be as well to be comparable.
+        self.errors = np.max(np.abs(np.sort(Ei, axis=0) -
+                                    np.sort(E, axis=0)), axis=1)
+        return self.errors
@@ -20,7 +20,7 @@ def exhandler(function, parser):
     :arg parser: the initialized instance of the parser that has the
       additional, script-specific parameters.
     """
-    args = vars(bparser.parse_known_args()[0])
+    args = vars(common_parser().parse_known_args()[0])
     if args["examples"]:
         function()
         return
@@ -48,7 +48,26 @@ def _common_parser():
 
     return parser
 
-bparser = _common_parser()
+_bparser = None
+"""argparse.ArgumentParser: common parser, built by :func:`common_parser`
+the first time a script needs it.
+"""
+def common_parser():
+    """Returns the parser with the common command-line options, building it
+    on the first call so that library imports do not pay for it.
+    """
+    global _bparser
+    if _bparser is None:
+        _bparser = _common_parser()
+    return _bparser
+
+def __getattr__(name):
+    """Builds the common parser on first access of `base.bparser`.
+    """
+    if name == "bparser":
+        return common_parser()
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
 testmode = False
 """bool: when True, the package is operating in unit test mode, which changes
 how plotting is handled.
@@ -0,0 +1,309 @@
+"""Basis sets for the expansion of the wave functions. Each basis
+provides the Hamiltonian matrix and the wave function for a vector of
+expansion coefficients, so the solvers do not depend on the basis:
+
+- :class:`SineBasis`: the infinite square well :math:`\\sin(n \\pi x/L)`
+  functions of :mod:`basis.evaluate`, for potentials made of barriers.
+- :class:`HarmonicBasis`: harmonic oscillator (Hermite) functions, whose
+  matrix elements are computed by Gauss-Hermite quadrature. For smooth
+  potentials whose regions extend well beyond the low-lying states they
+  converge with far fewer functions. They do not for `sho.cfg`, whose
+  regions cut the low-lying states off: the basis is fitted to the regions
+  and its levels only approach those with hard walls at their ends as
+  :math:`1/N` (relative errors of 0.7% at `N=40` and 0.18% at `N=160`), so
+  :mod:`basis.fd` is the better solver there.
+- :class:`PlaneWaveBasis`: Bloch plane waves on a periodic cell, for
+  periodic potentials like `kp.cfg` and `paper.cfg` without the walls of
+  the infinite square well.
+
+Use :func:`get` to construct a basis by name.
+"""
+import numpy as np
+from basis import msg
+class SineBasis(object):
+    """Infinite square well basis on :math:`[0, L]`, see
+    :func:`basis.evaluate.H`.
+
+    Args:
+        V (basis.potential.Potential): potential with the barrier geometry
+          (`a`, `b`, `nb` and `l`) of the Kronig-Penney form.
+        N (int): number of basis functions.
+    """
+    name = "sine"
+    options = ()
+    def __init__(self, V, N):
+        self.V = V
+        self.N = N
+
+    @property
+    def domain(self):
+        """Returns the interval on which the basis functions live.
+        """
+        return (0., self.V.L)
+
+    def H(self, dtype=float):
+        """Returns the Hamiltonian matrix.
+        """
+        from basis.evaluate import H
+        return H(self.V, self.N, dtype)
+
+    def wave(self, Cn, prob=False):
+        """Returns the wave function for a vector of expansion coefficients;
+        see :func:`basis.evaluate.wave`.
+        """
+        from basis.evaluate import wave
+        return wave(self.V, Cn, prob)
+
+    def op(self):
+        """Returns the matrix-free Hamiltonian; see
+        :func:`basis.evaluate.Hop`.
+        """
+        from basis.evaluate import Hop
+        return Hop(self.V, self.N)
+
+    def diag(self):
+        """Returns the diagonal of the Hamiltonian matrix.
+        """
+        from basis.evaluate import Hdiag
+        return Hdiag(self.V, self.N)
+
+def _extent(V):
+    """Returns the interval covered by the regions of the potential.
+    """
+    return (min(r[0] for r in V.regions), max(r[1] for r in V.regions))
+
+class HarmonicBasis(object):
+    """Harmonic oscillator basis of Hermite functions
+    :math:`\\psi_n(x) = s^{-1/2} h_n(\\xi) e^{-\\xi^2/2}` with
+    :math:`\\xi = (x - x_0)/s`, where :math:`h_n` are the normalized Hermite
+    polynomials.
+
+    In the units of :mod:`basis.evaluate` (kinetic energy
+    :math:`-d^2/dx^2`), the kinetic matrix is pentadiagonal with elements
+    :math:`(n + 1/2)/s^2` and :math:`-\\sqrt{(n+1)(n+2)}/(2 s^2)`. The
+    potential matrix :math:`\\int \\psi_m V \\psi_n dx` is computed for all
+    `m, n` at once as a weighted product of the Hermite functions at the
+    Gauss-Hermite nodes.
+
+    Like :class:`basis.potential.Potential`, the potential vanishes outside
+    of its regions, so the basis would relax into that continuum if its
+    :attr:`domain` extended past them. When the oscillator that matches the
+    curvature does not fit inside the regions, the basis is centered on
+    them instead with the turning point of the highest function at their
+    ends; the levels then approach those with hard walls at the ends of the
+    regions (as :mod:`basis.fd` uses), but only with an error that falls
+    as :math:`1/N`. The smooth Hermite functions cannot represent the kink
+    of the wave functions at the walls, so this basis gives no advantage
+    over other solvers for such potentials, including `sho.cfg`.
+
+    Args:
+        V (basis.potential.Potential): potential to expand.
+        N (int): number of basis functions.
+        center (float): center :math:`x_0` of the oscillator; defaults to the
+          minimum of the potential.
+        scale (float): length scale :math:`s`. If not specified, it matches
+          the curvature :math:`k` of the potential at its minimum,
+          :math:`s = k^{-1/4}`; for potentials without curvature there, or
+          when that basis does not fit inside the regions, the highest basis
+          function is made to span the extent of the regions.
+        nquad (int): number of quadrature nodes; defaults to `2*N + 20`.
+    """
+    name = "harmonic"
+    options = ()
+    def __init__(self, V, N, center=None, scale=None, nquad=None):
+        self.V = V
+        self.N = N
+        self.nquad = 2*N + 20 if nquad is None else nquad
+        xi, xf = _extent(V)
+        x = np.linspace(xi, xf, 2000, endpoint=False)
+        Vx = V(x)
+        imin = np.argmin(Vx)
+        fixed = center is not None or scale is not None
+        if center is None:
+            center = x[imin] if np.ptp(Vx) > 0 else (xi + xf)/2.
+        if scale is None:
+            d = (xf - xi)/20.
+            k = (V(center + d) + V(center - d) - 2*V(center))/(2*d**2)
+            scale = k**-0.25 if k > 0 else np.inf
+        self.center = center
+        self.scale = scale
+
+        lower, upper = self.domain
+        if lower >= xi and upper <= xf:
+            return
+        if fixed:
+            wmsg = ("The harmonic basis spans [{:.4g}, {:.4g}], beyond the "
+                    "regions [{:.4g}, {:.4g}] of the potential.")
+            msg.warn(wmsg, args=(lower, upper, xi, xf))
+        else:
+            self.center = (xi + xf)/2.
+            self.scale = (xf - xi)/2./np.sqrt(2*N + 1)
+
+    @property
+    def domain(self):
+        """Returns the interval between the classical turning points of the
+        highest basis function, beyond which all of them decay.
+        """
+        width = np.sqrt(2*self.N + 1)*self.scale
+        return (self.center - width, self.center + width)
+
+    def _hermite(self, xi):
+        """Returns the normalized Hermite functions (without the
+        :math:`s^{-1/2}` factor) at `xi`, computed by their stable
+        three-term recurrence.
+
+        Returns:
+            numpy.ndarray: with shape `(N, len(xi))`.
+        """
+        psi = np.empty((self.N, len(xi)))
+        psi[0] = np.pi**-0.25*np.exp(-xi**2/2.)
+        if self.N > 1:
+            psi[1] = np.sqrt(2.)*xi*psi[0]
+        for n in range(1, self.N-1):
+            psi[n+1] = (np.sqrt(2./(n+1))*xi*psi[n] -
+                        np.sqrt(float(n)/(n+1))*psi[n-1])
+        return psi
+
+    def kinetic(self):
+        """Returns the kinetic energy matrix :math:`-d^2/dx^2`.
+        """
+        n = np.arange(self.N)
+        T = np.diag(n + 0.5)
+        off = -np.sqrt((n[0:-2] + 1.)*(n[0:-2] + 2.))/2.
+        T[n[0:-2], n[0:-2]+2] = off
+        T[n[0:-2]+2, n[0:-2]] = off
+        return T/self.scale**2
+
+    def H(self, dtype=float):
+        """Returns the Hamiltonian matrix.
+        """
+        from scipy.special import roots_hermite
+        xi, w = roots_hermite(self.nquad)
+        #The Hermite functions include the square root of the weight
+        #function, so the weights are rescaled to match. Weights that
+        #underflowed belong to nodes where all the functions vanish.
+        with np.errstate(divide="ignore"):
+            w = np.exp(np.log(w) + xi**2)
+        psi = self._hermite(xi)
+        Vq = self.V(self.center + self.scale*xi)
+        result = self.kinetic() + np.dot(psi*(w*Vq), psi.T)
+        return result.astype(dtype)
+
+    def wave(self, Cn, prob=False):
+        """Returns the wave function for a vector of expansion coefficients.
+
+        Returns:
+            function: that can be evaluated for array-valued arguments.
+        """
+        def evaluate(x):
+            xi = (np.asarray(x, dtype=float) - self.center)/self.scale
+            psi = np.dot(Cn, self._hermite(np.atleast_1d(xi)))/np.sqrt(self.scale)
+            psi = psi.reshape(np.shape(x))
+            return np.abs(psi)**2 if prob else psi
+        return evaluate
+
+class PlaneWaveBasis(object):
+    """Plane wave basis :math:`e^{i(k + 2\\pi m/a)x}/\\sqrt{a}` on a periodic
+    cell of length :math:`a`; see :func:`basis.evaluate.Hplane`. The
+    Hamiltonian is complex Hermitian and can also be applied matrix-free
+    in :math:`O(P \\log P)` time with :func:`basis.evaluate.Hplaneop`.
+
+    Args:
+        V (basis.potential.Potential): periodic potential to expand.
+        N (int): number of basis functions.
+        cell (float): length of the periodic cell, which starts at the
+          beginning of the regions. Defaults to the lattice parameter `a` of
+          the potential if it has one, and otherwise to the extent of its
+          regions (a supercell with periodic boundary conditions).
+        k (float): Bloch wave vector.
+        nsample (int): number of points to sample the potential at; see
+          :func:`basis.evaluate.Vplane`.
+    """
+    name = "plane"
+    options = ("cell", "k")
+    def __init__(self, V, N, cell=None, k=0., nsample=None):
+        self.V = V
+        self.N = N
+        xi, xf = _extent(V)
+        self.x0 = xi
+        self.extent = (xi, xf)
+        if cell is None:
+            cell = V.a if "a" in V.params else xf - xi
+        self.cell = cell
+        self.k = k
+        self.nsample = nsample
+
+    @property
+    def domain(self):
+        """Returns the interval covered by the regions of the potential; the
+        Bloch waves extend over all of them.
+        """
+        return self.extent
+
+    def H(self, dtype=complex):
+        """Returns the Hamiltonian matrix; real `dtype` values select the
+        complex type of the same precision.
+        """
+        from basis.evaluate import Hplane
+        return Hplane(self.V, self.N, self.cell, self.k, self.x0,
+                      self.nsample, np.result_type(dtype, np.complex64))
+
+    def op(self):
+        """Returns the matrix-free Hamiltonian; see
+        :func:`basis.evaluate.Hplaneop`.
+        """
+        from basis.evaluate import Hplaneop
+        return Hplaneop(self.V, self.N, self.cell, self.k, self.x0,
+                        self.nsample)
+
+    def diag(self):
+        """Returns the diagonal of the Hamiltonian matrix.
+        """
+        from basis.evaluate import Hplanediag
+        return Hplanediag(self.V, self.N, self.cell, self.k, self.x0,
+                          self.nsample)
+
+    def wave(self, Cn, prob=False):
+        """Returns the (complex) wave function for a vector of expansion
+        coefficients.
+
+        Returns:
+            function: that can be evaluated for array-valued arguments.
+        """
+        from basis.evaluate import _planewaves
+        q = self.k + 2*np.pi*_planewaves(self.N)/self.cell
+        def evaluate(x):
+            x = np.asarray(x, dtype=float)
+            psi = np.dot(np.exp(1j*np.multiply.outer(x, q)), Cn)
+            psi = psi/np.sqrt(self.cell)
+            return np.abs(psi)**2 if prob else psi
+        return evaluate
+
+bases = {"sine": SineBasis, "harmonic": HarmonicBasis, "plane": PlaneWaveBasis}
+"""dict: basis classes keyed by the names used for the `-basis` option of
+:mod:`basis.solve`.
+"""
+def get(name, V, N, **kwargs):
+    """Returns the basis with the given name for a potential.
+
+    Args:
+        name (str): one of the keys of :data:`bases`.
+        V (basis.potential.Potential): potential to expand.
+        N (int): number of basis functions.
+        kwargs (dict): additional arguments for the basis class.
+
+    Raises:
+        ValueError: for an unknown basis.
+    """
+    if name not in bases:
+        raise ValueError("Unknown basis '{}'; choose from {}.".format(
+            name, sorted(bases.keys())))
+    return bases[name](V, N, **kwargs)
+
+def arguments(name, args):
+    """Returns the keyword arguments for a basis from the parsed
+    command-line arguments of :mod:`basis.solve`, i.e. the values of the
+    options in the `options` attribute of its class that were specified.
+    """
+    cls = bases.get(name, SineBasis)
+    return dict((o, args[o]) for o in cls.options if args.get(o) is not None)
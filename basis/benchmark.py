@@ -0,0 +1,271 @@
+#!/usr/bin/python
+"""Benchmarks for the hot paths of the solver across problem sizes. The
+timings are written as JSON together with metadata about the machine,
+and can be compared against a stored baseline to flag regressions.
+
+Run the whole suite with `python -m basis.benchmark`; see
+:func:`examples` for comparing against a baseline.
+"""
+from basis import msg
+def examples():
+    """Prints examples of using the script to the console using colored output.
+    """
+    script = "BASIS: benchmarks for the basis expansion solver"
+    explain = ("Times the Hamiltonian assembly, the eigensolvers, the "
+               "evaluation of potentials and wave functions and complete "
+               "runs for a range of basis sizes, numbers of barriers and the "
+               "bundled potentials.")
+    contents = [(("Run all the benchmarks and save them as a baseline."),
+                 "python -m basis.benchmark -output baseline.json", ""),
+                (("Compare the Hamiltonian assembly against the baseline."),
+                 "python -m basis.benchmark -suites H -baseline baseline.json",
+                 "Benchmarks that are more than `-threshold` (default 25%) "
+                 "slower than the baseline are reported as regressions and the "
+                 "script exits with status 1.")]
+    required = ("REQUIRED: nothing; all options have defaults.")
+    output = ("RETURNS: JSON file with the timings in seconds and machine "
+              "metadata.")
+    details = ("Each benchmark is the best of `-repeat` runs. Dense "
+               "diagonalization is only timed up to `-maxdiag` basis functions; "
+               "the iterative eigensolver covers all sizes.")
+    outputfmt = ("{\"machine\": {...}, \"results\": {\"H/paper/N=400\": 0.01, ...}}")
+
+    msg.example(script, explain, contents, required, output, outputfmt, details)
+
+suites = ["H", "eigensolve", "potential", "wave", "nb", "run"]
+"""list: names of the benchmark suites.
+"""
+script_options = {
+    "-suites": dict(nargs="+", choices=suites, default=suites,
+                    help="Which benchmark suites to run."),
+    "-sizes": dict(nargs="+", type=int,
+                   default=[50, 100, 200, 400, 800, 1600, 3200, 8000],
+                   help="Numbers of basis functions to benchmark."),
+    "-nbs": dict(nargs="+", type=int, default=[1, 2, 5, 10, 20, 50, 100, 200],
+                 help="Numbers of barriers for the `nb` suite."),
+    "-potentials": dict(nargs="+",
+                        help=("Potential config files to benchmark; defaults "
+                              "to the bundled `potentials/*.cfg`.")),
+    "-maxdiag": dict(type=int, default=2000,
+                     help="Largest basis size for dense diagonalization."),
+    "-repeat": dict(type=int, default=3,
+                    help="Number of runs of each benchmark; the best is kept."),
+    "-output": dict(default="benchmark.json",
+                    help="File to write the timings to."),
+    "-baseline": dict(help="Timings file from an earlier run to compare to."),
+    "-threshold": dict(type=float, default=0.25,
+                       help=("Relative slowdown against the baseline that is "
+                             "reported as a regression."))
+    }
+"""dict: default command-line arguments and their
+    :meth:`argparse.ArgumentParser.add_argument` keyword arguments.
+"""
+
+def machine():
+    """Returns metadata about the machine and the library versions, so that
+    timings from different machines are not compared by accident.
+    """
+    import platform
+    import multiprocessing
+    import numpy
+    import scipy
+    from time import strftime
+    return {"platform": platform.platform(),
+            "processor": platform.processor(),
+            "machine": platform.machine(),
+            "node": platform.node(),
+            "cpus": multiprocessing.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "scipy": scipy.__version__,
+            "time": strftime("%Y-%m-%dT%H:%M:%S")}
+
+def timeit(function, repeat=3):
+    """Returns the best wall time in seconds of `repeat` calls to
+    `function`.
+    """
+    from time import time
+    best = None
+    for i in range(repeat):
+        start = time()
+        function()
+        elapsed = time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _potentials(args):
+    """Returns the potentials to benchmark, keyed by name, skipping the
+    config files that cannot be parsed.
+    """
+    from os import path
+    from glob import glob
+    from basis.potential import Potential
+    from basis.utility import reporoot
+    files = args["potentials"]
+    if not files:
+        files = sorted(glob(path.join(reporoot, "potentials", "*.cfg")))
+
+    result = {}
+    for filename in files:
+        name = path.splitext(path.basename(filename))[0]
+        try:
+            result[name] = Potential(filename)
+        except ValueError:
+            msg.warn("Skipping '{}', which could not be parsed.",
+                     args=(filename,))
+    return result
+
+def _kp(V):
+    """Returns True if the potential has the barrier geometry that the
+    Hamiltonian assembly needs.
+    """
+    return all(p in V.params for p in ("a", "b", "nb", "l"))
+
+def benchmark(args):
+    """Runs the benchmark suites in `args["suites"]`.
+
+    Args:
+        args (dict): parsed command-line arguments; see :data:`script_options`.
+
+    Returns:
+        dict: of the best times in seconds, keyed by `suite/potential/size`.
+    """
+    import numpy as np
+    from basis.evaluate import H, Hop, Hdiag, wave
+    from basis.iterative import davidson
+    potentials = _potentials(args)
+    kps = dict((name, V) for name, V in potentials.items() if _kp(V))
+    repeat = args["repeat"]
+    results = {}
+    def record(key, function):
+        results[key] = timeit(function, repeat)
+        msg.info("{0:<40} {1:.6f}", 2, args=(key, results[key]))
+
+    if "potential" in args["suites"]:
+        for name, V in potentials.items():
+            xi = min(r[0] for r in V.regions)
+            xf = max(r[1] for r in V.regions)
+            x = np.linspace(xi, xf, 10000, endpoint=False)
+            record("potential/{}/x=10000".format(name), lambda: V(x))
+
+    for name, V in kps.items():
+        for N in args["sizes"]:
+            if "H" in args["suites"]:
+                record("H/{}/N={}".format(name, N), lambda: H(V, N))
+            if "eigensolve" in args["suites"]:
+                if N <= args["maxdiag"]:
+                    Hm = H(V, N)
+                    record("eig/{}/N={}".format(name, N),
+                           lambda: np.linalg.eigh(Hm))
+                    del Hm
+                matvec, diag = Hop(V, N), Hdiag(V, N)
+                record("davidson/{}/N={}".format(name, N),
+                       lambda: davidson(matvec, diag, min(10, N)))
+            if "wave" in args["suites"]:
+                #Same grid as the wave function plots in `basis.solve`.
+                Cn = np.ones(N)/np.sqrt(N)
+                x = np.linspace(0, V.L, V.nb*25)
+                record("wave/{}/N={}".format(name, N), lambda: wave(V, Cn)(x))
+
+    if "nb" in args["suites"]:
+        for name, V in kps.items():
+            nb = V.nb
+            for n in args["nbs"]:
+                V.adjust(nb=n)
+                record("nb/{}/nb={}".format(name, n), lambda: H(V, 200))
+            V.adjust(nb=nb)
+
+    if "run" in args["suites"]:
+        _run(args, kps, record)
+    return results
+
+def _run(args, kps, record):
+    """Times complete runs of :func:`basis.solve.run` that save the solution
+    to a temporary directory.
+    """
+    from os import path
+    from shutil import rmtree
+    from tempfile import mkdtemp
+    from basis.solve import run, script_options as options
+    folder = mkdtemp()
+    try:
+        for name, V in kps.items():
+            for N in args["sizes"]:
+                if N > args["maxdiag"]:
+                    continue
+                sargs = dict((k[1:], o.get("default")) for k, o in options.items())
+                sargs.update(potential=V.filepath, N=N, action=["save"], plot=[],
+                             outfile=path.join(folder, name + "-{}.dat"))
+                record("run/{}/N={}".format(name, N), lambda: run(sargs))
+    finally:
+        rmtree(folder)
+
+def compare(results, baseline, threshold=0.25):
+    """Compares timings against a baseline.
+
+    Args:
+        results (dict): of timings from :func:`benchmark`.
+        baseline (dict): of earlier timings with the same keys.
+        threshold (float): relative slowdown that counts as a regression.
+
+    Returns:
+        list: of tuples `(key, ratio)` for the benchmarks that are slower than
+          the baseline by more than the threshold, sorted by key.
+    """
+    regressions = []
+    for key in sorted(results):
+        if key in baseline and baseline[key] > 0:
+            ratio = results[key]/baseline[key]
+            if ratio > 1. + threshold:
+                regressions.append((key, ratio))
+    return regressions
+
+def _parser_options():
+    """Parses the options and arguments from the command line."""
+    import argparse
+    from basis import base
+    pdescr = "Benchmarks for the basis expansion solver."
+    parser = argparse.ArgumentParser(parents=[base.bparser], description=pdescr)
+    for arg, options in script_options.items():
+        parser.add_argument(arg, **options)
+
+    args = base.exhandler(examples, parser)
+    if args is None:
+        return
+
+    return args
+
+def run(args):
+    """Runs the benchmarks, writes the timings and compares them to the
+    baseline if one is specified.
+
+    Returns:
+        list: of regressions from :func:`compare`.
+    """
+    import json
+    results = benchmark(args)
+    with open(args["output"], 'w') as f:
+        json.dump({"machine": machine(), "results": results}, f, indent=2,
+                  sort_keys=True)
+
+    if not args["baseline"]:
+        return []
+    with open(args["baseline"]) as f:
+        baseline = json.load(f)
+    if baseline["machine"]["node"] != machine()["node"]:
+        msg.warn("The baseline was recorded on a different machine ({}).",
+                 args=(baseline["machine"]["node"],))
+
+    regressions = compare(results, baseline["results"], args["threshold"])
+    for key, ratio in regressions:
+        msg.err("{0} is {1:.2f}x slower than the baseline.",
+                args=(key, ratio))
+    if len(regressions) == 0:
+        msg.okay("No regressions against the baseline.")
+    return regressions
+
+if __name__ == '__main__': # pragma: no cover
+    import sys
+    args = _parser_options()
+    if args is not None:
+        sys.exit(1 if len(run(args)) > 0 else 0)
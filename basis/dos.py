@@ -0,0 +1,130 @@
+"""Density of states for the basis expansion Hamiltonian using the
+kernel polynomial method (KPM, see [1]_). The Chebyshev moments of the
+spectrum are estimated stochastically from products of :math:`H` with
+random vectors, so no diagonalization is needed and the cost is
+:math:`O(N^2)` per moment for the dense matrix, or :math:`O(N \\log N)`
+for the matrix-free operator :func:`basis.evaluate.Hop`.
+
+.. [1] http://dx.doi.org/10.1103/RevModPhys.78.275
+"""
+import numpy as np
+def bounds(V, N):
+    """Returns bounds on the spectrum of the Hamiltonian. The kinetic
+    part has eigenvalues :math:`E_1^{(0)} \\ldots E_N^{(0)}` and the
+    potential part is a projection of the potential, so its eigenvalues
+    lie between the extrema of the potential.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+
+    Returns:
+        tuple: `(Emin, Emax)` with all eigenvalues of :math:`H` inside.
+    """
+    from basis.evaluate import _En0, _barriers
+    Vs = _barriers(V)[1]
+    Vmin, Vmax = min(0., np.min(Vs)), max(0., np.max(Vs))
+    return _En0(1, V.L) + Vmin, _En0(N, V.L) + Vmax
+
+def _jackson(M):
+    """Returns the Jackson kernel coefficients :math:`g_m` that damp the
+    Gibbs oscillations of a truncated Chebyshev series with `M` terms.
+    """
+    m = np.arange(M)
+    q = np.pi/(M+1)
+    return ((M - m + 1)*np.cos(q*m) + np.sin(q*m)/np.tan(q))/(M+1)
+
+def moments(V, N, nmoments=200, nvectors=10, matrixfree=False, seed=None):
+    """Estimates the Chebyshev moments :math:`\\mu_m = \\mathrm{Tr}[T_m(\\tilde{H})]/N`
+    of the rescaled Hamiltonian with a stochastic trace over random
+    vectors.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+        nmoments (int): number of moments to compute.
+        nvectors (int): number of random vectors in the stochastic trace;
+          the error in the moments decreases as :math:`1/\\sqrt{N R}`.
+        matrixfree (bool): when True, use :func:`basis.evaluate.Hop`
+          instead of forming the dense matrix.
+        seed (int): seed for the random vectors.
+
+    Returns:
+        tuple: `(mu, (Emin, Emax))` with the moments and the bounds used to
+          rescale the spectrum to :math:`[-1, 1]`.
+    """
+    if matrixfree:
+        from basis.evaluate import Hop
+        matvec = Hop(V, N)
+    else:
+        from basis.evaluate import H
+        matvec = H(V, N).dot
+
+    Emin, Emax = bounds(V, N)
+    #A small margin keeps the rescaled spectrum strictly inside [-1, 1],
+    #where the Chebyshev expansion is stable.
+    scale = (Emax - Emin)/(2. - 0.02)
+    shift = (Emax + Emin)/2.
+    Ht = lambda v: (matvec(v) - shift*v)/scale
+
+    #Rademacher vectors; the moments are computed in pairs using
+    #T_{2m} = 2 T_m^2 - T_0 and T_{2m+1} = 2 T_{m+1} T_m - T_1.
+    rng = np.random.RandomState(seed)
+    r = rng.choice([-1., 1.], size=(N, nvectors))
+    mu = np.zeros(nmoments + nmoments % 2)
+    a0, a1 = r, Ht(r)
+    mu0, mu1 = np.sum(r*a0), np.sum(r*a1)
+    mu[0:2] = mu0, mu1
+    for m in range(1, len(mu)//2):
+        a2 = 2*Ht(a1) - a0
+        mu[2*m] = 2*np.sum(a1*a1) - mu0
+        mu[2*m+1] = 2*np.sum(a2*a1) - mu1
+        a0, a1 = a1, a2
+    return mu[0:nmoments]/(N*nvectors), (Emin, Emax)
+
+def dos(V, N, energies=None, nmoments=200, nvectors=10, matrixfree=False,
+        seed=None):
+    """Returns the density of states and the integrated number of states
+    for the basis expansion Hamiltonian.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+        energies (numpy.ndarray): energies to evaluate at; defaults to 1000
+          points spanning the spectrum.
+        nmoments (int): number of Chebyshev moments; the energy resolution
+          is roughly :math:`\\pi (E_{max} - E_{min})/(2 M)`.
+        nvectors (int): number of random vectors in the stochastic trace.
+        matrixfree (bool): when True, use :func:`basis.evaluate.Hop`
+          instead of forming the dense matrix.
+        seed (int): seed for the random vectors.
+
+    Returns:
+        tuple: `(E, rho, count)` where `rho` is the number of states per
+          unit energy at each energy in `E` (it integrates to `N`) and
+          `count` is the number of states with energy below `E`.
+    """
+    mu, (Emin, Emax) = moments(V, N, nmoments, nvectors, matrixfree, seed)
+    scale = (Emax - Emin)/(2. - 0.02)
+    shift = (Emax + Emin)/2.
+    if energies is None:
+        energies = np.linspace(Emin, Emax, 1000)
+    energies = np.asarray(energies, dtype=float)
+
+    x = np.clip((energies - shift)/scale, -1., 1.)
+    theta = np.arccos(x)
+    m = np.arange(1, nmoments)
+    gmu = _jackson(nmoments)*mu
+
+    #T_m(cos(theta)) = cos(m theta); the count uses the integral of the
+    #Chebyshev weight function from -1 to x.
+    cosm = np.cos(np.outer(theta, m))
+    with np.errstate(divide="ignore"):
+        rho = (gmu[0] + 2*np.dot(cosm, gmu[1:]))/(np.pi*np.sqrt(1 - x**2))
+    rho = np.where(np.abs(x) < 1., rho, 0.)*N/scale
+    sinm = np.sin(np.outer(theta, m))
+    count = N*(gmu[0]*(1 - theta/np.pi) - 2*np.dot(sinm, gmu[1:]/m)/np.pi)
+    return energies, rho, count
@@ -35,7 +35,78 @@ def _En0(n, L):
     """
     return n**2*np.pi**2/L**2 #\hbar^2/2ma^2 with a the Bohr radius.
 
-def H(V, N):
+def _barriers(V):
+    """Returns the centers of the barriers in a K-P type potential and
+    the value of the potential at each of them.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+
+    Returns:
+        tuple: of (:class:`numpy.ndarray`, :class:`numpy.ndarray`) with
+          positions :math:`-a/2 + ra` and the potential values there.
+    """
+    s = np.array([-V.a/2 + r*V.a for r in range(1, V.nb+1)])
+    return s, np.array([V(si) for si in s], dtype=float)
+
+def _Sk(k, x, L):
+    """Returns :math:`\\sin(k \\pi x/L)/(\\pi k)` for an array of
+    integers `k`, with the limit :math:`x/L` for :math:`k=0`. Both cases
+    of :func:`_Fnm` are differences of two of these terms.
+    """
+    k = np.asarray(k)
+    ks = np.where(k == 0, 1, k)
+    return np.where(k == 0, x/L, np.sin(ks*np.pi*x/L)/(np.pi*ks))
+
+def _tk(V, K):
+    """Returns the potential part of the Hamiltonian matrix in
+    Toeplitz-minus-Hankel form. Since :math:`F_{nm}(x) = S_{m-n}(x) -
+    S_{m+n}(x)` (see :func:`_Sk`), the elements of the potential matrix
+    are :math:`t_{|n-m|} - t_{n+m}` where
+
+    .. math::
+
+       t_k = \\sum_r V(s_r) [S_k(s_r + b/2) - S_k(s_r - b/2)].
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        K (int): largest `k` to compute :math:`t_k` for.
+
+    Returns:
+        numpy.ndarray: with shape `(K+1,)`.
+    """
+    s, Vs = _barriers(V)
+    return np.dot(_hk(s, V.b, V.L, K), Vs)
+
+_hk_cache = {}
+"""dict: cached tables of the sine terms in :func:`_hk`; keys are the
+barrier positions, width, well width and number of terms.
+"""
+def _hk(s, b, L, K):
+    """Returns the table of :math:`S_k(s_r + b/2) - S_k(s_r - b/2)` for
+    :math:`k = 0 \\ldots K` and each barrier position :math:`s_r`. The
+    table only depends on the geometry, so it is cached for repeated
+    calls where only the strength of the potential changes.
+    """
+    key = (K, b, L, tuple(s))
+    if key not in _hk_cache:
+        if len(_hk_cache) > 16:
+            _hk_cache.clear()
+        k = np.arange(K+1)[:,np.newaxis]
+        _hk_cache[key] = _Sk(k, s+b/2, L) - _Sk(k, s-b/2, L)
+    return _hk_cache[key]
+
+def Hdiag(V, N):
+    """Returns the diagonal of the Hamiltonian matrix :func:`H` without
+    forming the matrix.
+    """
+    t = _tk(V, 2*N)
+    n = np.arange(1, N+1)
+    return _En0(n, V.L) + t[0] - t[2*n]
+
+def H(V, N, dtype=float):
     """Returns the Hamiltonian matrix for the specified potential so
     that it can be solved via basis expansion. Assumed K-P form of the
     potential.
@@ -44,6 +115,9 @@ def H(V, N):
         V (basis.potential.Potential): object for evaluating the
           potential.
         N (int): number of basis functions to use.
+        dtype (numpy.dtype): floating point type of the matrix;
+          `numpy.float32` halves the memory of the matrix (the elements are
+          still computed in double precision and then rounded).
 
     Returns:
         numpy.ndarray: with shape (N, N); and elements as specified in
@@ -51,15 +125,597 @@ def H(V, N):
     """
     #In equation (14), the :math:`E_n^{(0)}` refers the `n`-th energy
     #state of the infinite square well, which was the :math:`H_0` that
-    #they introduced in equation (8).
-    result = np.zeros((N, N))
-    for n in range(1, N+1):
-        for m in range(1, N+1):
-            dE = 0. if n != m else _En0(n, V.L)
-            result[n-1,m-1] = dE + sum([V(-V.a/2 + r*V.a) *
-                                        _hnm(n, m, -V.a/2 + r*V.a, V.b, V.L)
-                                        for r in range(1, V.nb+1)])
-    return result    
+    #they introduced in equation (8). The sums over barriers of the
+    #:math:`h_{nm}` are collected in :func:`_tk`, so each element is a
+    #lookup instead of a sum. The rows are filled in blocks so that the
+    #integer index arrays of :func:`_Hrows` stay small next to the matrix.
+    t = _tk(V, 2*N).astype(dtype)
+    result = np.empty((N, N), dtype=t.dtype)
+    rows = max(1, 2**18//N)
+    for start in range(0, N, rows):
+        stop = min(start + rows, N)
+        result[start:stop] = _Hrows(V, t, start, stop, N)
+    return result
+
+def _Hrows(V, t, start, stop, N):
+    """Returns the rows `start` to `stop` (zero-based, exclusive) of the
+    Hamiltonian matrix.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        t (numpy.ndarray): generator of the potential matrix from
+          :func:`_tk`, with at least `2N+1` entries.
+        start (int): first row.
+        stop (int): one past the last row.
+        N (int): number of basis functions (columns).
+    """
+    n = np.arange(start+1, stop+1)
+    m = np.arange(1, N+1)
+    result = t[np.abs(n[:,np.newaxis] - m)] - t[n[:,np.newaxis] + m]
+    result[n-1-start,n-1] += _En0(n, V.L).astype(t.dtype)
+    return result
+
+def Hmemmap(V, N, filename, rows=None):
+    """Assembles the Hamiltonian matrix :func:`H` directly into a
+    memory-mapped `.npy` file, one block of rows at a time, so that the
+    full matrix never has to fit in memory. The result is an
+    :class:`numpy.memmap`, which behaves like an ordinary array (e.g.
+    for the matrix-vector products of :func:`basis.iterative.davidson`)
+    while the operating system pages it in and out as needed.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+        filename (str): path to the `.npy` file to create; it can be
+          reopened later with `numpy.load(filename, mmap_mode="r")`.
+        rows (int): number of rows to assemble at a time; by default,
+          blocks of about 64 MB are used.
+
+    Returns:
+        numpy.memmap: with shape (N, N).
+    """
+    from numpy.lib.format import open_memmap
+    if rows is None:
+        rows = max(1, 2**23//N)
+    t = _tk(V, 2*N)
+    result = open_memmap(filename, mode="w+", dtype=float, shape=(N, N))
+    from basis.msg import progress
+    with progress(N, "H rows", 2) as report:
+        for start in range(0, N, rows):
+            stop = min(start + rows, N)
+            result[start:stop] = _Hrows(V, t, start, stop, N)
+            report.update(stop - start)
+    result.flush()
+    return result
+
+def Hmemmapop(Hm, rows=None):
+    """Returns an operator that applies a memory-mapped Hamiltonian from
+    :func:`Hmemmap` to vectors one block of rows at a time, so that each
+    product only needs one block of the matrix in memory at once.
+
+    Args:
+        Hm (numpy.memmap): Hamiltonian matrix with shape `(N, N)`.
+        rows (int): number of rows to multiply at a time; by default,
+          blocks of about 64 MB are used.
+
+    Returns:
+        function: that takes a :class:`numpy.ndarray` with shape `(N,)` or
+          `(N, p)` and returns the product with `Hm`.
+    """
+    N = Hm.shape[0]
+    if rows is None:
+        rows = max(1, 2**23//N)
+
+    def matvec(v):
+        v = np.asarray(v, dtype=float)
+        result = np.empty(v.shape)
+        for start in range(0, N, rows):
+            stop = min(start + rows, N)
+            result[start:stop] = np.dot(Hm[start:stop], v)
+        return result
+
+    return matvec
+
+def bandwidth(V, N, tol=1e-10):
+    """Estimates the bandwidth of the Hamiltonian matrix, beyond which
+    all elements are negligible. Both parts of the potential matrix
+    (see :func:`_tk`) decay with the index of :math:`t_k`, and every
+    element with :math:`|n-m| > w` only involves :math:`t_k` with
+    :math:`k > w`, so the bandwidth follows from the decay of
+    :math:`t_k` alone. Smooth potentials have a small bandwidth; sharp
+    barriers decay slowly.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+        tol (float): elements smaller than `tol` times the largest
+          :math:`|t_k|` are considered negligible.
+
+    Returns:
+        int: number of sub-diagonals `w` that have to be kept.
+    """
+    t = np.abs(_tk(V, 2*N))
+    big = np.nonzero(t > tol*np.max(t))[0] if np.max(t) > 0 else [0]
+    return int(min(max(big), N-1))
+
+def Hbanded(V, N, w=None, tol=1e-10):
+    """Returns the lower triangle of the Hamiltonian matrix in LAPACK
+    banded storage, truncated at the bandwidth. Only :math:`O(N w)`
+    elements are computed and stored.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+        w (int): number of sub-diagonals to keep; estimated with
+          :func:`bandwidth` if not specified.
+        tol (float): tolerance for estimating the bandwidth.
+
+    Returns:
+        numpy.ndarray: with shape `(w+1, N)` where element `[i, j]` is
+          :math:`H_{j+i, j}`, as expected by
+          :func:`scipy.linalg.eig_banded` with `lower=True`.
+    """
+    if w is None:
+        w = bandwidth(V, N, tol)
+    t = _tk(V, 2*N)
+    i = np.arange(w+1)[:,np.newaxis]
+    j = np.arange(N)
+    inside = i + j < N
+    result = np.where(inside, t[i] - t[np.where(inside, 2*j + i + 2, 0)], 0.)
+    result[0] += _En0(j+1, V.L)
+    return result
+
+def Hop(V, N):
+    """Returns a matrix-free operator that applies the Hamiltonian
+    matrix :func:`H` to vectors without ever forming it. The Toeplitz
+    and Hankel parts of the potential matrix (see :func:`_tk`) are
+    applied as convolutions using FFTs, so each product costs
+    :math:`O(N \\log N)` time and :math:`O(N)` memory.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+
+    Returns:
+        function: that takes a :class:`numpy.ndarray` with shape `(N,)` or
+          `(N, p)` and returns the product with :math:`H`.
+    """
+    t = _tk(V, 2*N)
+    En = _En0(np.arange(1, N+1), V.L)
+    #Row `i` of the Toeplitz part is the convolution of t[|q|] with `v`;
+    #the Hankel part is the convolution of t[2..2N] with reversed `v`.
+    toeplitz = np.concatenate((t[N-1:0:-1], t[0:N]))
+    hankel = t[2:2*N+1]
+    M = 3*N
+    ftoep = np.fft.rfft(toeplitz, M)
+    fhank = np.fft.rfft(hankel, M)
+
+    def matvec(v):
+        v = np.asarray(v, dtype=float)
+        f = v if v.ndim == 1 else v.T
+        conv = np.fft.irfft(ftoep*np.fft.rfft(f, M) -
+                            fhank*np.fft.rfft(f[...,::-1], M), M)
+        result = conv[...,N-1:2*N-1]
+        result = result if v.ndim == 1 else result.T
+        return result + (En*v.T).T
+
+    return matvec
+
+def _planewaves(N):
+    """Returns the indices :math:`m` of the `N` plane waves
+    :math:`e^{i(k + 2\\pi m/a)x}` in the basis, centered on zero.
+    """
+    return np.arange(N) - N//2
+
+def _nsample(N, nsample=None):
+    """Returns the number of points to sample the potential at in a cell.
+    Unless `nsample` is given, this is at least `2N` (so that the products
+    of the plane waves are not aliased) and 16384, rounded up to a power of
+    two for the FFTs. The steps of barrier potentials are only located to
+    within one sampling interval, so their energies converge as
+    :math:`1/P`.
+
+    Raises:
+        ValueError: if `nsample` is less than `2N`.
+    """
+    if nsample is None:
+        return int(2**np.ceil(np.log2(max(2*N, 16384))))
+    if nsample < 2*N:
+        raise ValueError("At least {} samples are needed for {} plane "
+                         "waves.".format(2*N, N))
+    return nsample
+
+def Vplane(V, cell, P, x0=0.):
+    """Returns the Fourier coefficients :math:`\\hat{V}_q = \\frac{1}{a}
+    \\int_{x_0}^{x_0+a} V(x) e^{-2\\pi i q x/a} dx` of the potential over a
+    periodic cell from one FFT of its values at `P` equally spaced points.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        cell (float): length :math:`a` of the periodic cell.
+        P (int): number of points to sample at.
+        x0 (float): start of the cell.
+
+    Returns:
+        numpy.ndarray: with shape `(P,)`; coefficient `q` is at index `q`
+          modulo `P`.
+    """
+    j = np.arange(P)
+    Vx = V(x0 + cell*j/P)
+    q = np.fft.fftfreq(P, 1./P)
+    return np.exp(-2j*np.pi*q*x0/cell)*np.fft.fft(Vx)/P
+
+def Hplane(V, N, cell, k=0., x0=0., nsample=None, dtype=complex):
+    """Returns the Hamiltonian matrix in the basis of `N` plane waves
+    :math:`e^{i(k + G_m)x}/\\sqrt{a}` with :math:`G_m = 2\\pi m/a` on a
+    periodic cell. The potential matrix is circulant,
+    :math:`V_{mn} = \\hat{V}_{m-n}` (see :func:`Vplane`), so a single FFT
+    gives all of its elements.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+        cell (float): length :math:`a` of the periodic cell.
+        k (float): Bloch wave vector.
+        x0 (float): start of the cell.
+        nsample (int): number of points to sample the potential at; see
+          :func:`_nsample`.
+        dtype (numpy.dtype): complex floating point type of the matrix.
+
+    Returns:
+        numpy.ndarray: Hermitian matrix with shape (N, N).
+    """
+    P = _nsample(N, nsample)
+    Vq = Vplane(V, cell, P, x0)
+    m = _planewaves(N)
+    result = Vq[np.subtract.outer(m, m) % P]
+    result[np.diag_indices(N)] += (k + 2*np.pi*m/cell)**2
+    return result.astype(dtype)
+
+def Hplanediag(V, N, cell, k=0., x0=0., nsample=None):
+    """Returns the diagonal of the Hamiltonian matrix :func:`Hplane`
+    without forming the matrix.
+    """
+    P = _nsample(N, nsample)
+    Vq = Vplane(V, cell, P, x0)
+    return (k + 2*np.pi*_planewaves(N)/cell)**2 + Vq[0].real
+
+def Hplaneop(V, N, cell, k=0., x0=0., nsample=None):
+    """Returns a matrix-free operator that applies the Hamiltonian
+    matrix :func:`Hplane` to vectors. The wave functions are transformed
+    to the sampling points in real space, multiplied by the potential and
+    transformed back, so each product costs :math:`O(P \\log P)` time and
+    :math:`O(P)` memory for `P` sampling points.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+        cell (float): length :math:`a` of the periodic cell.
+        k (float): Bloch wave vector.
+        x0 (float): start of the cell.
+        nsample (int): number of points to sample the potential at; see
+          :func:`_nsample`.
+
+    Returns:
+        function: that takes a :class:`numpy.ndarray` with shape `(N,)` or
+          `(N, p)` and returns the product with :math:`H`.
+    """
+    P = _nsample(N, nsample)
+    m = _planewaves(N)
+    Vx = V(x0 + cell*np.arange(P)/P)
+    T = (k + 2*np.pi*m/cell)**2
+    #The phases shift the plane waves from the start of the cell to the
+    #origin; `index` places each plane wave at its FFT frequency.
+    phase = np.exp(2j*np.pi*m*x0/cell)
+    index = m % P
+
+    def matvec(v):
+        v = np.asarray(v, dtype=complex)
+        f = v if v.ndim == 1 else v.T
+        spectrum = np.zeros(f.shape[:-1] + (P,), dtype=complex)
+        spectrum[...,index] = f*phase
+        psi = np.fft.ifft(spectrum)*P
+        result = np.fft.fft(Vx*psi)[...,index]*phase.conj()/P
+        result = result if v.ndim == 1 else result.T
+        return result + (T*v.T).T
+
+    return matvec
+
+_geometry = ("a", "b", "nb", "l")
+"""tuple: parameters that the Hamiltonian reads directly for the positions
+of the barriers and the size of the well, so they can never enter it
+linearly.
+"""
+def linear_params(V):
+    """Returns the parameters that the Hamiltonian depends on linearly: those
+    of :meth:`basis.potential.Potential.linear_params` that are not part of
+    the barrier geometry.
+    """
+    return [p for p in V.linear_params() if p not in _geometry]
+
+def Hlinear(V, N, params=None):
+    """Splits the Hamiltonian into :math:`H = H_c + \\sum_i \\theta_i H_i`
+    for the parameters :math:`\\theta_i` that the potential provably
+    depends on linearly (see
+    :meth:`basis.potential.Potential.linear_params`).
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential; it is restored to its original parameters afterwards.
+        N (int): number of basis functions to use.
+        params (list): of `str` names of the parameters to split off;
+          defaults to all the linear parameters.
+
+    Returns:
+        tuple: `(Hc, parts)` where `Hc` is the Hamiltonian with the `params`
+          set to zero and `parts` is a `dict` of the matrices :math:`H_i`
+          keyed by parameter name.
+
+    Raises:
+        ValueError: if any of the `params` does not enter linearly.
+    """
+    linear = linear_params(V)
+    if params is None:
+        params = linear
+    nonlinear = [p for p in params if p not in linear]
+    if len(nonlinear) > 0:
+        raise ValueError("The Hamiltonian is not linear in {}.".format(nonlinear))
+
+    values = dict((p, V.params[p]) for p in params)
+    adjusted = [p for p in params if p in V.adjusted]
+    V.adjust(**dict((p, 0.) for p in params))
+    Hc = H(V, N)
+    parts = {}
+    for p in params:
+        V.adjust(**{p: 1.})
+        parts[p] = H(V, N) - Hc
+        V.adjust(**{p: 0.})
+
+    V.adjust(**values)
+    for p in params:
+        if p not in adjusted:
+            del V.adjusted[p]
+    return Hc, parts
+
+class LinearH(object):
+    """Hamiltonian of a potential stored as the parts from
+    :func:`Hlinear`, so that changing only the linear parameters (such as
+    the strength `v0` of the barriers) gives the new matrix by a few
+    matrix additions instead of a full assembly.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+
+    Attributes:
+        N (int): number of basis functions.
+        constant (numpy.ndarray): part that does not depend on the linear
+          parameters.
+        parts (dict): of the matrices multiplying each linear parameter.
+        fixed (dict): values of the other parameters when the parts were
+          computed; if any of them changes, the parts are recomputed.
+
+    Examples:
+        >>> from basis.potential import Potential
+        >>> V = Potential("paper.cfg")
+        >>> HL = LinearH(V, 400)
+        >>> V.adjust(v0=50.)
+        >>> Hm = HL(V)
+    """
+    def __init__(self, V, N):
+        self.N = N
+        self._build(V)
+
+    def _build(self, V):
+        """Computes the parts of the Hamiltonian for the current parameters
+        of the potential.
+        """
+        self.constant, self.parts = Hlinear(V, self.N)
+        self.fixed = dict((k, v) for k, v in V.params.items()
+                          if k in V.parser.options("parameters")
+                          and k not in self.parts)
+
+    def __call__(self, V):
+        """Returns the Hamiltonian matrix for the current parameters of the
+        potential.
+        """
+        if any(V.params[k] != v for k, v in self.fixed.items()):
+            self._build(V)
+        result = self.constant.copy()
+        for p, part in self.parts.items():
+            result += V.params[p]*part
+        return result
+
+def perturbative(Hm, states=True):
+    """Solves the eigensystem of the Hamiltonian matrix with
+    Rayleigh-Schroedinger perturbation theory around its diagonal, which
+    already contains the first-order corrections. This is accurate when
+    the potential is weak compared to the spacing of the infinite well
+    energies and costs :math:`O(N^2)` instead of :math:`O(N^3)`.
+
+    Args:
+        Hm (numpy.ndarray): Hamiltonian matrix from :func:`H`.
+        states (bool): when True, also compute the states to first order;
+          otherwise the unperturbed basis vectors are returned.
+
+    Returns:
+        tuple: `(E, C, indicator)` with the second-order energies, the
+          normalized states in the columns of `C`, and the largest mixing
+          ratio :math:`|H_{mn}/(H_{nn} - H_{mm})|`. The expansion is only
+          trustworthy when the indicator is small compared to 1; it is
+          `inf` when an element couples two degenerate basis vectors (like
+          the plane waves :math:`\\pm m` at :math:`k=0`), and the energies
+          and states are then not finite either.
+    """
+    d = np.diag(Hm)
+    gaps = d - d[:,np.newaxis]
+    np.fill_diagonal(gaps, 1.)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = Hm/gaps
+        #Degenerate basis vectors that are not coupled need no correction.
+        ratio[(gaps == 0) & (Hm == 0)] = 0.
+        np.fill_diagonal(ratio, 0.)
+        indicator = np.max(np.abs(ratio)) if len(d) > 1 else 0.
+
+        #The second-order correction is sum_m |H_mn|^2/(E_n - E_m); the
+        #first-order state mixes in each basis vector m with
+        #H_mn/(E_n - E_m).
+        E = np.real(d + np.sum(Hm.conj()*ratio, axis=0))
+        if states:
+            C = ratio
+            C[np.diag_indices_from(C)] = 1.
+            C /= np.linalg.norm(C, axis=0)
+        else:
+            C = np.eye(len(d))
+    return E, C, indicator
+
+def _shape(V):
+    """Returns the quantities that the matrix elements of :func:`H` depend
+    on: the lattice parameter, the barrier width, the size of the well and
+    the barrier heights.
+    """
+    return np.append([V.a, V.b, V.L], _barriers(V)[1])
+
+def _dparts(V, N, param, step=1e-6):
+    """Returns the derivatives of the diagonal energies and of the
+    Toeplitz-minus-Hankel generator :func:`_tk` with respect to a
+    parameter of the potential. Only vectors of length :math:`O(N)` are
+    computed, never the full matrix.
+
+    The closed-form elements are differentiated analytically. With
+    :math:`x_r^\\pm = s_r \\pm b/2` and :math:`s_r = (r - 1/2)a`,
+
+    .. math::
+
+       \\frac{dt_k}{d\\theta} = \\sum_r \\frac{dV_r}{d\\theta} [S_k(x_r^+) -
+       S_k(x_r^-)] + V_r [C_k(x_r^+) (\\frac{dx_r^+}{d\\theta} -
+       \\frac{x_r^+}{L}\\frac{dL}{d\\theta}) - C_k(x_r^-)
+       (\\frac{dx_r^-}{d\\theta} - \\frac{x_r^-}{L}\\frac{dL}{d\\theta})]
+
+    where :math:`C_k(x) = \\cos(k \\pi x/L)/L` and :math:`V_r` are the
+    barrier heights. The parameter reaches :math:`a`, :math:`b`, :math:`L`
+    and :math:`V_r` through the expressions of the config file, which can
+    be arbitrary, so only the derivatives of these :math:`n_b + 3` numbers
+    are taken by central differences.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential. It is restored to its original parameters afterwards.
+        N (int): number of basis functions to use.
+        param (str): name of the parameter in :attr:`Potential.params`.
+        step (float): relative step size for the central difference of the
+          geometry and the barrier heights.
+
+    Returns:
+        tuple: `(dEn, dt)` with shapes `(N,)` and `(2N+1,)`.
+
+    Raises:
+        ValueError: if the parameter is not defined or is an integer (such
+          as the number of barriers), which cannot be differentiated.
+    """
+    param = param.lower()
+    if param not in V.params:
+        raise ValueError("'{}' is not a parameter of '{}'.".format(param, V.filepath))
+    value = V.params[param]
+    if isinstance(value, (bool, int)) or not isinstance(value, (float, np.floating)):
+        raise ValueError("Cannot differentiate with respect to '{}' because "
+                         "it is not a float.".format(param))
+
+    wasadjusted = param in V.adjusted
+    h = step*max(abs(value), 1.)
+    shapes = []
+    for x in (value + h, value - h):
+        V.adjust(**{param: x})
+        shapes.append(_shape(V))
+    V.adjust(**{param: value})
+    if not wasadjusted:
+        del V.adjusted[param]
+    da, db, dL = (shapes[0] - shapes[1])[0:3]/(2*h)
+    dVs = (shapes[0] - shapes[1])[3:]/(2*h)
+
+    s, Vs = _barriers(V)
+    b, L = V.b, V.L
+    n = np.arange(1, N+1)
+    k = np.arange(2*N+1)[:,np.newaxis]
+    ds = (np.arange(1, len(s)+1) - 0.5)*da
+    dterm = 0.
+    for sign in (1., -1.):
+        x = s + sign*b/2
+        dterm = dterm + sign*np.cos(k*np.pi*x/L)/L*(ds + sign*db/2 - x*dL/L)
+    dt = np.dot(_hk(s, b, L, 2*N), dVs) + np.dot(dterm, Vs)
+    return -2*_En0(n, L)*dL/L, dt
+
+def dH(V, N, param, step=1e-6):
+    """Returns the derivative of the Hamiltonian matrix :func:`H` with
+    respect to a parameter of the potential.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        N (int): number of basis functions to use.
+        param (str): name of the parameter in :attr:`Potential.params`.
+        step (float): relative step size; see :func:`_dparts`.
+
+    Returns:
+        numpy.ndarray: with shape (N, N).
+    """
+    dEn, dt = _dparts(V, N, param, step)
+    n = np.arange(1, N+1)
+    result = dt[np.abs(n[:,np.newaxis] - n)] - dt[n[:,np.newaxis] + n]
+    result[n-1,n-1] += dEn
+    return result
+
+def sensitivity(V, C, params, step=1e-6):
+    """Returns the derivatives of the eigenvalues with respect to
+    parameters of the potential using the Hellmann-Feynman theorem,
+    :math:`dE_i/d\\theta = \\langle\\psi_i|\\partial
+    H/\\partial\\theta|\\psi_i\\rangle`. No further diagonalization
+    is needed; because the potential matrix has Toeplitz-minus-Hankel
+    form, each expectation value is computed with FFTs in
+    :math:`O(N \\log N)`.
+
+    Args:
+        V (basis.potential.Potential): object for evaluating the
+          potential.
+        C (numpy.ndarray): with shape `(N, nev)`; normalized eigenvectors
+          in the columns.
+        params (list): of `str` parameter names to differentiate with
+          respect to.
+        step (float): relative step size for the derivatives of the geometry
+          and barrier heights; see :func:`_dparts`.
+
+    Returns:
+        dict: keys are parameter names; values are
+          :class:`numpy.ndarray` with :math:`dE_i/d\\theta` for each
+          eigenvector.
+    """
+    C = np.asarray(C, dtype=float)
+    if C.ndim == 1:
+        C = C[:,np.newaxis]
+    N = C.shape[0]
+    #For c^T T c we need the autocorrelation of c; for the Hankel part
+    #the self-convolution (sums over n + m).
+    fC = np.fft.rfft(C, 2*N, axis=0)
+    auto = np.fft.irfft(np.abs(fC)**2, 2*N, axis=0)[0:N]
+    conv = np.fft.irfft(fC**2, 2*N, axis=0)[0:2*N-1]
+    weights = np.full(N, 2.)
+    weights[0] = 1.
+
+    result = {}
+    for param in params:
+        dEn, dt = _dparts(V, N, param, step)
+        result[param] = (np.dot(dEn, C**2) + np.dot(weights*dt[0:N], auto) -
+                         np.dot(dt[2:2*N+1], conv))
+    return result
 
 def _hnm(n, m, s, b, L):
     """Evaluates a single element in the Hamiltonian basis
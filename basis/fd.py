@@ -0,0 +1,176 @@
+"""Finite-difference solver for cross-checking the basis expansion. The
+second-order discretization of :math:`-d^2/dx^2 + V(x)` on a grid with
+hard walls at the ends of the regions is a symmetric tridiagonal matrix,
+whose lowest `nev` eigenpairs cost :math:`O(M \\cdot nev)` for `M` grid
+points. The energies of grids with halved spacings are combined by
+Richardson extrapolation, which removes the :math:`h^2, h^4, \\ldots`
+errors.
+
+The potential enters as its average over the cell around each grid point
+rather than its value there. For smooth potentials both give errors in even
+powers of the spacing; for potentials with steps (like the barriers of
+`kp.cfg` and `paper.cfg`) the point values give a first-order error that
+depends on where each step falls between the points, which the
+extrapolation cannot remove.
+"""
+import numpy as np
+from basis import msg
+def domain(V):
+    """Returns the interval covered by the regions of the potential, which
+    has hard walls at its ends like the infinite square well of the sine
+    basis.
+    """
+    from basis.bases import _extent
+    return _extent(V)
+
+def grid(V, M):
+    """Returns the interior points of a grid on :func:`domain`.
+
+    Args:
+        V (basis.potential.Potential): potential to discretize.
+        M (int): number of interior grid points.
+
+    Returns:
+        tuple: `(x, h)` with the grid points and their spacing.
+    """
+    xi, xf = domain(V)
+    h = (xf - xi)/(M + 1.)
+    return xi + h*np.arange(1, M+1), h
+
+def averages(V, M, tol=1e-8):
+    """Returns the averages of the potential over the cells
+    :math:`[x_i - h/2, x_i + h/2]` of the grid points.
+
+    Each cell is split in four and integrated with Simpson's rule; intervals
+    whose midpoint value is far from the mean of their ends are bisected
+    until it is not, so steps in the potential are located to within
+    rounding instead of the grid spacing.
+
+    Args:
+        V (basis.potential.Potential): potential to discretize.
+        M (int): number of interior grid points.
+        tol (float): largest deviation of the midpoint value, relative to
+          the range of the potential, for which an interval is accepted.
+
+    Returns:
+        numpy.ndarray: with shape `(M,)`.
+    """
+    x, h = grid(V, M)
+    xi, xf = domain(V)
+    parts = 4
+    index = np.repeat(np.arange(M), parts)
+    lower = (x - h/2)[index] + h/parts*np.tile(np.arange(parts), M)
+    upper = lower + h/parts
+    fl, fm, fu = V(lower), V((lower + upper)/2), V(upper)
+    tol = tol*(np.ptp(np.concatenate((fl, fm, fu))) + 1.)
+    minwidth = 1e-14*(xf - xi)
+
+    total = np.zeros(M)
+    while len(index) > 0:
+        width = upper - lower
+        done = (np.abs(fm - (fl + fu)/2) <= tol) | (width < minwidth)
+        np.add.at(total, index[done], width[done]*(fl + 4*fm + fu)[done]/6)
+        if np.all(done):
+            break
+
+        keep = ~done
+        index = np.tile(index[keep], 2)
+        middle = (lower + upper)[keep]/2
+        lower = np.concatenate((lower[keep], middle))
+        upper = np.concatenate((middle, upper[keep]))
+        fl, fu = (np.concatenate((fl[keep], fm[keep])),
+                  np.concatenate((fm[keep], fu[keep])))
+        fm = V((lower + upper)/2)
+    return total/h
+
+def tridiagonal(V, M):
+    """Returns the finite-difference Hamiltonian on a grid.
+
+    Args:
+        V (basis.potential.Potential): potential to discretize.
+        M (int): number of interior grid points.
+
+    Returns:
+        tuple: `(d, e)` with the diagonal and the off-diagonal of the
+          matrix.
+    """
+    x, h = grid(V, M)
+    d = 2./h**2 + averages(V, M)
+    e = np.full(M-1, -1./h**2)
+    return d, e
+
+def eigensolve(V, M, nev):
+    """Returns the lowest eigenpairs of the finite-difference Hamiltonian
+    with :func:`scipy.linalg.eigh_tridiagonal`.
+
+    Args:
+        V (basis.potential.Potential): potential to discretize.
+        M (int): number of interior grid points.
+        nev (int): number of levels to compute.
+
+    Returns:
+        tuple: `(E, U)` with the energies and the wave functions at the grid
+          points in the columns of `U`, normalized so that
+          :math:`\\sum_i |U_i|^2 h = 1`.
+    """
+    from scipy.linalg import eigh_tridiagonal
+    d, e = tridiagonal(V, M)
+    nev = min(nev, M)
+    E, U = eigh_tridiagonal(d, e, select='i', select_range=(0, nev-1))
+    h = grid(V, M)[1]
+    return E, U/np.sqrt(h)
+
+def richardson(V, M, nev, levels=3):
+    """Solves on `levels` grids, each with half the spacing of the one
+    before, and extrapolates the energies to zero spacing with a Romberg
+    table.
+
+    Args:
+        V (basis.potential.Potential): potential to discretize.
+        M (int): number of interior points of the coarsest grid; the finest
+          has :math:`(M+1) 2^{levels-1} - 1`.
+        nev (int): number of levels to compute.
+        levels (int): number of grids.
+
+    Returns:
+        tuple: `(E, C, error)` with the extrapolated energies, the wave
+          functions of the finest grid at the points of the coarsest in the
+          columns of `C` (normalized like eigenvectors), and the estimated
+          error of each energy from the last two extrapolations.
+
+    Notes:
+        The extrapolation assumes that the error is a series in even
+        powers of the spacing, which the cell averages of :func:`averages`
+        provide for potentials with steps as well as smooth ones.
+    """
+    table = []
+    for level in range(levels):
+        Ml = (M + 1)*2**level - 1
+        E, U = eigensolve(V, Ml, nev)
+        row = [E]
+        for j in range(1, level+1):
+            row.append(row[j-1] + (row[j-1] - table[-1][j-1])/(4.**j - 1))
+        table.append(row)
+        msg.info("Solved {} levels on {} grid points.", 2, args=(len(E), Ml))
+
+    E = table[-1][-1]
+    error = np.abs(E - table[-1][-2]) if levels > 1 else np.full(len(E), np.nan)
+    #The coarse grid points are every `2**(levels-1)`-th point of the finest.
+    step = 2**(levels-1)
+    C = U[step-1::step]*np.sqrt(grid(V, M)[1])
+    return E, C, error
+
+def wave(V, Cn, prob=False):
+    """Returns the wave function for a column of :func:`richardson`,
+    interpolated linearly between the grid points and the walls.
+
+    Returns:
+        function: that can be evaluated for array-valued arguments.
+    """
+    x, h = grid(V, len(Cn))
+    xi, xf = domain(V)
+    xs = np.concatenate(([xi], x, [xf]))
+    psi = np.concatenate(([0.], Cn, [0.]))/np.sqrt(h)
+    if prob:
+        psi = np.abs(psi)**2
+    return lambda xv: np.interp(xv, xs, psi)
@@ -0,0 +1,91 @@
+"""Inverse design of potentials: adjusts the parameters of a
+:class:`basis.potential.Potential` so that its lowest energy levels
+match a target spectrum. The fit uses a Levenberg-Marquardt iteration
+with the analytic eigenvalue gradients from
+:func:`basis.evaluate.sensitivity`; every eigensolve is a Davidson
+iteration warm-started from the eigenvectors of the previous step.
+"""
+import numpy as np
+from basis import msg
+def _lowest(V, N, nev, X=None):
+    """Returns the `nev` lowest eigenpairs of the Hamiltonian using the
+    matrix-free operator, starting from the eigenvectors `X`.
+    """
+    from basis.evaluate import Hop, Hdiag
+    from basis.iterative import davidson
+    E, C, niter = davidson(Hop(V, N), Hdiag(V, N), nev, X=X, tol=1e-10)
+    return E, C
+
+def fit(V, N, targets, params, levels=None, tol=1e-8, maxiter=50):
+    """Fits parameters of the potential so that the energy levels match
+    the targets in the least squares sense.
+
+    Args:
+        V (basis.potential.Potential): potential to fit; it is adjusted in
+          place and holds the fitted parameters afterwards.
+        N (int): number of basis functions to use.
+        targets (list): of target energies.
+        params (list): of `str` names of the parameters to vary; these have
+          to be floats.
+        levels (list): of `int` indices of the levels (sorted by energy,
+          starting at 0) to match to the `targets`. Defaults to the lowest
+          `len(targets)` levels.
+        tol (float): relative tolerance on the parameter steps.
+        maxiter (int): maximum number of iterations.
+
+    Returns:
+        tuple: `(fitted, E)` where `fitted` is a `dict` of the fitted
+          parameter values and `E` are the energies of the fitted levels.
+
+    Examples:
+        >>> from basis.potential import Potential
+        >>> V = Potential("paper.cfg")
+        >>> fitted, E = fit(V, 100, [8., 31.], ["v0", "b"])
+    """
+    from basis.evaluate import sensitivity
+    targets = np.asarray(targets, dtype=float)
+    if levels is None:
+        levels = list(range(len(targets)))
+    if len(levels) != len(targets):
+        raise ValueError("Each target energy needs one level index.")
+    nev = max(levels) + 1
+    params = [p.lower() for p in params]
+
+    theta = np.array([V.params[p] for p in params], dtype=float)
+    E, C = _lowest(V, N, nev)
+    r = E[levels] - targets
+    cost = np.dot(r, r)
+    lam = 1e-3
+    for it in range(maxiter):
+        dE = sensitivity(V, C[:,levels], params)
+        J = np.column_stack([dE[p] for p in params])
+        A, g = np.dot(J.T, J), np.dot(J.T, r)
+
+        #Increase the damping until the step reduces the mismatch; each
+        #trial solve starts from the last accepted eigenvectors.
+        accepted = False
+        while lam < 1e10:
+            damped = A + lam*np.diag(np.diag(A) + 1e-12)
+            delta = np.linalg.solve(damped, -g)
+            V.adjust(**dict(zip(params, theta + delta)))
+            Et, Ct = _lowest(V, N, nev, C)
+            rt = Et[levels] - targets
+            if np.dot(rt, rt) < cost:
+                accepted = True
+                break
+            lam *= 4.
+
+        if not accepted:
+            V.adjust(**dict(zip(params, theta)))
+            break
+
+        theta, E, C, r = theta + delta, Et, Ct, rt
+        cost = np.dot(r, r)
+        lam = max(lam/3., 1e-12)
+        msg.info("Fit iteration {}: cost {:.6g}.", 2, args=(it, cost))
+        if np.all(np.abs(delta) <= tol*(np.abs(theta) + tol)):
+            break
+    else:
+        msg.warn("Fit did not converge in {} iterations.", args=(maxiter,))
+
+    return dict(zip(params, theta)), E[levels]
@@ -0,0 +1,174 @@
+"""Per-stage timing and memory instrumentation. The solver wraps its
+stages (parsing the potential, assembling and diagonalizing the
+Hamiltonian, saving and plotting) in :func:`stage` context managers.
+When profiling is disabled, :func:`stage` returns a shared context
+manager that does nothing, so the instrumentation costs only a function
+call.
+
+Examples:
+    >>> from basis import instrument
+    >>> instrument.enable()
+    >>> with instrument.stage("assemble H"):
+    ...     Hm = H(V, 400)
+    >>> instrument.report()
+    >>> instrument.disable()
+"""
+from basis import msg
+_active = None
+"""list: of `dict` records of the stages in the order they started while
+profiling is enabled (`None` for stages still running), or `None` when
+it is disabled.
+"""
+_stack = []
+"""list: of the :class:`_Stage` instances that are currently running,
+innermost last.
+"""
+class _Null(object):
+    """Context manager that does nothing, for when profiling is disabled.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_null = _Null()
+
+_tracing = False
+"""bool: whether :func:`enable` started tracing memory allocations, so that
+:func:`disable` does not stop tracing that the caller started.
+"""
+
+def _maxrss():
+    """Returns the peak resident set size of the process in MB, or `None` if
+    the platform does not report it.
+    """
+    try:
+        import resource
+    except ImportError: # pragma: no cover
+        return None
+    import sys
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #Linux reports kilobytes, macOS bytes.
+    return rss/(1024.**2 if sys.platform == "darwin" else 1024.)
+
+def _tracer():
+    """Returns the :mod:`tracemalloc` module, or `None` if the interpreter
+    does not have it (before Python 3.4).
+    """
+    try:
+        import tracemalloc
+    except ImportError: # pragma: no cover
+        return None
+    return tracemalloc
+
+class _Stage(object):
+    """Times a stage and tracks the peak memory allocated while it runs,
+    including nested stages.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.peak = 0
+
+    def __enter__(self):
+        from time import time
+        tracemalloc = _tracer()
+        if tracemalloc is not None and len(_stack) > 0:
+            #Resetting the peak for this stage would lose the peak that the
+            #enclosing stage reached so far, so keep it there.
+            parent = _stack[-1]
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+        if hasattr(tracemalloc, "reset_peak"):
+            #Before Python 3.9 the peak cannot be reset, so it is the peak
+            #since profiling was enabled.
+            tracemalloc.reset_peak()
+        self.depth = len(_stack)
+        self.index = len(_active)
+        _active.append(None)
+        _stack.append(self)
+        self.start = time()
+        return self
+
+    def __exit__(self, *args):
+        from time import time
+        seconds = time() - self.start
+        tracemalloc = _tracer()
+        if tracemalloc is not None:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        _stack.pop()
+        if len(_stack) > 0:
+            _stack[-1].peak = max(_stack[-1].peak, self.peak)
+        if _active is not None:
+            _active[self.index] = {"stage": self.name, "depth": self.depth,
+                                   "seconds": seconds,
+                                   "peak_MB": (None if tracemalloc is None
+                                               else self.peak/1024.**2),
+                                   "maxrss_MB": _maxrss()}
+        return False
+
+def stage(name):
+    """Returns a context manager that profiles the code it wraps as the
+    stage `name`, if profiling is enabled.
+    """
+    if _active is None:
+        return _null
+    return _Stage(name)
+
+def enable():
+    """Enables profiling and starts tracing memory allocations.
+    """
+    global _active, _tracing
+    _active = []
+    tracemalloc = _tracer()
+    if tracemalloc is not None and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _tracing = True
+
+def disable():
+    """Disables profiling and stops tracing memory allocations if
+    :func:`enable` started it.
+    """
+    global _active, _tracing
+    _active = None
+    del _stack[:]
+    if _tracing:
+        _tracer().stop()
+        _tracing = False
+
+def records():
+    """Returns the records of the stages that finished since profiling was
+    enabled, in the order they started.
+
+    Returns:
+        list: of `dict` with keys `stage`, `depth` (nesting level), `seconds`,
+          `peak_MB` (peak memory allocated by python and numpy while the
+          stage ran; since profiling was enabled before Python 3.9, and
+          `None` without :mod:`tracemalloc`) and `maxrss_MB` (peak resident
+          set size of the process so far).
+    """
+    if _active is None:
+        return []
+    return [record for record in _active if record is not None]
+
+def report(filename=None):
+    """Prints the profile as a table, or writes it as JSON.
+
+    Args:
+        filename (str): if specified, the records from :func:`records` are
+          written to this JSON file instead of printed.
+    """
+    if filename:
+        import json
+        with open(filename, 'w') as f:
+            json.dump(records(), f, indent=2)
+        return
+
+    msg.info("{0:<30} {1:>10} {2:>10} {3:>10}",
+             args=("Stage", "Seconds", "Peak MB", "RSS MB"))
+    for record in records():
+        name = "  "*record["depth"] + record["stage"]
+        peak, rss = record["peak_MB"], record["maxrss_MB"]
+        msg.std("{0:<30} {1:>10.4f} {2:>10} {3:>10}",
+                args=(name, record["seconds"],
+                      "-" if peak is None else "{:.2f}".format(peak),
+                      "-" if rss is None else "{:.1f}".format(rss)))
@@ -0,0 +1,102 @@
+"""Iterative eigensolvers for the lowest eigenpairs of the Hamiltonian
+that only need matrix-vector products. They can be started from the
+eigenvectors of a nearby problem, which makes repeated solves along
+parameter sweeps or fits much cheaper than diagonalizing from scratch.
+"""
+import numpy as np
+def _orthonormalize(V, X=None):
+    """Orthonormalizes the columns of `X` against `V` (assumed
+    orthonormal) and against each other, dropping columns that are
+    linearly dependent.
+
+    Returns:
+        numpy.ndarray: new orthonormal columns.
+    """
+    if X is None:
+        X, V = V, None
+    X = X/np.maximum(np.linalg.norm(X, axis=0), 1e-300)
+    for i in range(2):
+        if V is not None:
+            X = X - np.dot(V, np.dot(V.conj().T, X))
+        if X.shape[1] == 0:
+            break
+        Q, R = np.linalg.qr(X)
+        X = Q[:,np.abs(np.diag(R)) > 1e-8]
+    return X
+
+def davidson(matvec, diag, nev, X=None, tol=1e-8, maxiter=200, nextra=4):
+    """Finds the lowest eigenpairs of a symmetric (or Hermitian) matrix with
+    the block Davidson method, using the diagonal as preconditioner. This works
+    well for the basis expansion Hamiltonians because they are dominated
+    by the diagonal infinite-well energies.
+
+    Args:
+        matvec (function): applies the matrix to a block of vectors with
+          shape `(N, p)`, e.g. :func:`basis.evaluate.Hop`.
+        diag (numpy.ndarray): diagonal of the matrix.
+        nev (int): number of eigenpairs to find.
+        X (numpy.ndarray): with shape `(N, p)`; starting guess for the
+          eigenvectors, usually the eigenvectors of a nearby problem. If not
+          specified, the lowest eigenvectors in the space of unit vectors
+          for the smallest diagonal elements are used.
+        tol (float): convergence tolerance on the residual norms, relative
+          to the magnitude of each eigenvalue.
+        maxiter (int): maximum number of iterations.
+        nextra (int): number of extra vectors in the block, which speeds up
+          convergence when eigenvalues are clustered.
+
+    Returns:
+        tuple: `(E, C, niter)` with the `nev` lowest eigenvalues, the
+          eigenvectors in the columns of `C` and the number of iterations
+          that were needed.
+
+    Raises:
+        ValueError: if the iteration does not converge within `maxiter`.
+    """
+    N = len(diag)
+    nblock = min(nev + nextra, N)
+    if X is None:
+        #Rayleigh-Ritz on the unit vectors of the smallest diagonal
+        #elements. A larger space than the block is used because the
+        #matrix can decouple into sectors (e.g. by symmetry) that the
+        #iteration would never reach from a starting block without them.
+        m = min(N, max(3*nblock, 60))
+        U = np.zeros((N, m))
+        U[np.argsort(diag)[0:m], np.arange(m)] = 1.
+        S = np.linalg.eigh(np.dot(U.T, matvec(U)))[1]
+        X = np.dot(U, S[:,0:nblock])
+    elif X.shape[1] < nblock:
+        #Pad the guess with unit vectors for diagonal elements that are not
+        #yet well represented.
+        extra = np.zeros((N, nblock - X.shape[1]))
+        order = [i for i in np.argsort(diag) if np.max(np.abs(X[i])) < 0.5]
+        extra[order[0:extra.shape[1]], np.arange(extra.shape[1])] = 1.
+        X = np.hstack((X, extra))
+
+    V = _orthonormalize(np.array(X[:,0:nblock], dtype=np.result_type(X, float)))
+    AV = matvec(V)
+    maxsize = max(4*nblock, 20)
+    for niter in range(1, maxiter+1):
+        E, S = np.linalg.eigh(np.dot(V.conj().T, AV))
+        C = np.dot(V, S[:,0:nblock])
+        AC = np.dot(AV, S[:,0:nblock])
+        R = AC - C*E[0:nblock]
+        rnorm = np.linalg.norm(R, axis=0)
+        if np.all(rnorm[0:nev] < tol*np.maximum(1., np.abs(E[0:nev]))):
+            return E[0:nev], C[:,0:nev], niter
+
+        #Restart from the current Ritz vectors when the subspace gets too
+        #large; their products with the matrix are already known.
+        if V.shape[1] + nblock > maxsize:
+            V, AV = C, AC
+
+        denom = E[0:nblock] - diag[:,np.newaxis]
+        denom = np.where(np.abs(denom) < 1e-8, 1e-8, denom)
+        D = _orthonormalize(V, R/denom)
+        if D.shape[1] == 0: # pragma: no cover
+            break
+        V = np.hstack((V, D))
+        AV = np.hstack((AV, matvec(D)))
+
+    raise ValueError("Davidson iteration did not converge in {} "
+                     "iterations.".format(maxiter))
@@ -0,0 +1,191 @@
+"""Batch runner for many solves in one interpreter. A job file lists the
+potentials to solve with their adjustments, basis sizes and outputs;
+the jobs for the same potential run together on one
+:class:`basis.solver.Solver`, so the parsed potential and the cached
+Hamiltonian are reused between them.
+
+The job file is JSON or YAML (for `.yaml` or `.yml` files, which needs
+`PyYAML`). It is either a list of jobs, or a dictionary with the list
+under `jobs` and optionally `defaults` shared by all jobs and the path of
+the `manifest` to write:
+
+.. code-block:: json
+
+    {"defaults": {"N": 200, "nev": 10},
+     "manifest": "manifest.json",
+     "jobs": [{"potential": "kp.cfg", "adjust": {"v0": 50.0},
+               "outfile": "kp-50-{}.dat"},
+              {"potential": "kp.cfg", "N": 400}]}
+
+Each job accepts the options of :mod:`basis.solve` by name (without the
+dash) plus `adjust`, a dictionary of potential parameters to change.
+Relative `potential` paths are resolved against the directory of the job
+file. Jobs without an `outfile` (in the job or in `defaults`) write to
+`job-<index>-{}.dat`.
+"""
+from basis import msg
+def load(filename):
+    """Loads a job file.
+
+    Args:
+        filename (str): path to the JSON or YAML job file.
+
+    Returns:
+        dict: with keys `jobs` (list of `dict`), `defaults` (`dict`) and
+          `manifest` (`str`). The `potential` paths are absolute.
+
+    Raises:
+        ValueError: if the file is YAML and `PyYAML` is not installed, or if
+          a job does not specify a potential.
+    """
+    from os import path
+    with open(filename) as f:
+        if path.splitext(filename)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Reading YAML job files needs PyYAML.")
+            spec = yaml.safe_load(f)
+        else:
+            import json
+            spec = json.load(f)
+
+    if isinstance(spec, list):
+        spec = {"jobs": spec}
+    spec.setdefault("defaults", {})
+    spec.setdefault("manifest", "manifest.json")
+    for i, job in enumerate(spec["jobs"]):
+        if "potential" not in job and "potential" not in spec["defaults"]:
+            raise ValueError("Job {} does not specify a potential.".format(i))
+
+    root = path.dirname(path.abspath(filename))
+    for entry in [spec["defaults"]] + spec["jobs"]:
+        if "potential" in entry:
+            entry["potential"] = path.join(root, entry["potential"])
+    return spec
+
+def schedule(jobs, defaults):
+    """Groups the jobs by potential and orders them largest first.
+
+    Args:
+        jobs (list): of `dict` job specifications.
+        defaults (dict): values for the options that a job does not specify.
+
+    Returns:
+        list: of groups, each a list of `(index, args)` tuples with the full
+          arguments of each job. The groups are sorted by their largest basis
+          and the jobs in each group by decreasing basis size, so that the
+          most expensive work starts first.
+    """
+    from os import path
+    groups = {}
+    for i, job in enumerate(jobs):
+        args = dict(defaults)
+        args.update(job)
+        args.setdefault("adjust", {})
+        args.setdefault("outfile", "job-{}-{{}}.dat".format(i))
+        key = path.abspath(args["potential"])
+        groups.setdefault(key, []).append((i, args))
+
+    result = []
+    for group in groups.values():
+        result.append(sorted(group, key=lambda item: -item[1]["N"]))
+    return sorted(result, key=lambda group: -group[0][1]["N"])
+
+def run_group(group):
+    """Runs the jobs for a single potential, reusing the solver (and so the
+    parsed potential and cached Hamiltonian) between them.
+
+    Args:
+        group (list): of `(index, args)` tuples from :func:`schedule`.
+
+    Returns:
+        list: of `dict` manifest entries for the jobs.
+    """
+    from time import time
+    import numpy as np
+    from basis.solver import Solver
+    solvers = {}
+    entries = []
+    for index, args in group:
+        start = time()
+        entry = {"index": index, "potential": args["potential"], "N": args["N"],
+                 "nev": args["nev"], "adjust": args["adjust"]}
+        try:
+            key = (args["method"], args["precision"], args["memmap"],
+                   args["pttol"], args["bandtol"], args.get("basis", "sine"),
+                   args.get("cell"), args.get("k"), args.get("levels"))
+            if key not in solvers:
+                solvers[key] = (Solver.from_args(args), {})
+            solver, original = solvers[key]
+
+            #Adjustments of earlier jobs in the group are undone, so each job
+            #only sees its own.
+            for param in args["adjust"]:
+                original.setdefault(param, solver.V.params[param])
+            target = dict(original)
+            target.update(args["adjust"])
+            solver.grow(args["N"])
+            solver.update(**target)
+            E, C = solver.solve(args["nev"])
+            nev = min(args["nev"], len(E))
+
+            files = [args["outfile"].format("E"), args["outfile"].format("C")]
+            np.savetxt(files[0], E[0:nev])
+            np.savetxt(files[1], C[:,0:nev])
+            entry.update(status="ok", files=files, E=E[0:nev].tolist())
+        except Exception as e:
+            #A failing job is recorded in the manifest instead of aborting
+            #the whole batch.
+            entry.update(status="error", message=str(e))
+        entry["seconds"] = time() - start
+        entries.append(entry)
+    return entries
+
+def run(filename, args):
+    """Runs all the jobs in a job file and writes the manifest.
+
+    Args:
+        filename (str): path to the job file.
+        args (dict): parsed command-line arguments of :mod:`basis.solve`;
+          these are the defaults for options that the job file does not
+          specify, except for `outfile`. `args["processes"]` sets the number
+          of worker processes.
+
+    Returns:
+        list: of `dict` manifest entries, in the order of the jobs in the file.
+    """
+    import json
+    spec = load(filename)
+    #The command line always has an `outfile`, which would send every job to
+    #the same files; jobs only share one if the job file asks for it.
+    defaults = dict((k, v) for k, v in args.items() if k != "outfile")
+    defaults.update(spec["defaults"])
+    groups = schedule(spec["jobs"], defaults)
+
+    entries = []
+    if args["processes"] > 1:
+        from multiprocessing import Pool
+        pool = Pool(args["processes"])
+        try:
+            for result in pool.imap_unordered(run_group, groups):
+                entries.extend(result)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for group in groups:
+            entries.extend(run_group(group))
+
+    entries = sorted(entries, key=lambda entry: entry["index"])
+    for entry in entries:
+        if entry["status"] == "ok":
+            msg.okay("Job {}: {} with N={} in {:.3g}s.",
+                     args=(entry["index"], entry["potential"], entry["N"],
+                           entry["seconds"]))
+        else:
+            msg.err("Job {}: {}", args=(entry["index"], entry["message"]))
+
+    with open(spec["manifest"], 'w') as f:
+        json.dump(entries, f, indent=2)
+    return entries
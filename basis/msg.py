@@ -1,7 +1,6 @@
 """This module handles writing to the terminal or a log file with support
 for coloring for warnings, errors, etc."""
 from __future__ import print_function
-from termcolor import cprint
 verbosity = None
 """The verbosity level of messages being printed by the module."""
 quiet = None
@@ -24,6 +23,13 @@ nocolor = False
 """When true, the colored outputs all use the regular print() instead 
 so that the stdout looks ordinary.
 """
+def cprint(text, color=None, **kwargs):
+    """Prints colored text with :func:`termcolor.cprint`; `termcolor` is only
+    imported the first time colored output is needed.
+    """
+    from termcolor import cprint as _cprint
+    _cprint(text, color, **kwargs)
+
 def example(script, explain, contents, requirements, output, outputfmt, details):
     """Prints the example help for the script."""
     blank()
@@ -64,10 +70,7 @@ def printer(text, color=None, **kwargs):
         # sys.stdout.flush()
         print(text, **kwargs)
     else:
-        if color is None:
-            cprint(text, **kwargs)
-        else:
-            cprint(text, color, **kwargs)
+        cprint(text, color, **kwargs)
 
 def arb(text, cols, split):
     """Prints a line of text in arbitrary colors specified by the numeric
@@ -110,34 +113,75 @@ def will_print(level=1):
         return ((isinstance(verbosity, int) and level <= verbosity) or
                 (isinstance(verbosity, bool) and verbosity == True))
     
-def warn(msg, level=0, prefix=True):
+def _text(msg, args):
+    """Returns the text of a message, formatting it with `args` or calling
+    it if it is a function. This only happens once the message is known to
+    be printed.
+    """
+    if args is not None:
+        return msg.format(*args)
+    if hasattr(msg, "__call__"):
+        return msg()
+    return msg
+
+def _emit(kind, msg, level, args, color=None, prefix=""):
+    """Prints a message to the terminal and writes it to the sink if their
+    verbosity settings allow it.
+    """
+    #This is the same test as `will_print`, inlined since it runs for every
+    #message, including the many that are never printed.
+    if level == 1:
+        terminal = not quiet
+    else:
+        terminal = (verbosity is True or
+                    (isinstance(verbosity, int) and level <= verbosity))
+    terminal = terminal or (kind == "error" and verbosity is None)
+    logged = sink is not None and (sink_level is None or level <= sink_level)
+    if not (terminal or logged):
+        return
+    text = _text(msg, args)
+    if terminal:
+        if color is None:
+            print(prefix + text)
+        else:
+            printer(prefix + text, color)
+    if logged:
+        record(kind, message=text, level=level)
+
+def warn(msg, level=0, prefix=True, args=None):
     """Prints the specified message as a warning; prepends "WARNING" to
     the message, so that can be left off.
     """
-    if will_print(level):
-        printer(("WARNING: " if prefix else "") + msg, "yellow")
+    _emit("warning", msg, level, args, "yellow", "WARNING: " if prefix else "")
 
-def err(msg, level=-1, prefix=True):
+def err(msg, level=-1, prefix=True, args=None):
     """Prints the specified message as an error; prepends "ERROR" to
     the message, so that can be left off.
     """
-    if will_print(level) or verbosity is None:
-        printer(("ERROR: " if prefix else "") + msg, "red")
+    _emit("error", msg, level, args, "red", "ERROR: " if prefix else "")
 
-def info(msg, level=1):
-    """Prints the specified message as information."""
-    if will_print(level):
-        printer(msg, "cyan")
+def info(msg, level=1, args=None):
+    """Prints the specified message as information.
+
+    Args:
+        msg (str): message to print; if `args` is given, it is a format
+          string, and if it is a function, its return value is printed.
+          Either way, the text is only built if the message is printed.
+        level (int): verbosity level of the message.
+        args (tuple): positional arguments for `msg.format`.
 
-def okay(msg, level=1):
+    Examples:
+        >>> info("Assembled {} rows in {:.2f}s.", 2, args=(N, elapsed))
+    """
+    _emit("info", msg, level, args, "cyan")
+
+def okay(msg, level=1, args=None):
     """Prints the specified message as textual progress update."""
-    if will_print(level):
-        printer(msg, "green")
+    _emit("okay", msg, level, args, "green")
 
-def gen(msg, level=1):
+def gen(msg, level=1, args=None):
     """Prints the message as generic output to terminal."""
-    if will_print(level):
-        printer(msg, "blue")
+    _emit("generic", msg, level, args, "blue")
 
 def blank(n=1, level=2):
     """Prints a blank line to the terminal."""
@@ -145,7 +189,128 @@ def blank(n=1, level=2):
         for i in range(n):
             print("")
 
-def std(msg, level=1):
+def std(msg, level=1, args=None):
     """Prints using the standard print() function."""
-    if will_print(level):
-        print(msg)
+    _emit("std", msg, level, args)
+
+sink = None
+"""file: open file that receives every message as a line of JSON, or
+`None` if there is no sink.
+"""
+sink_level = None
+"""int: highest verbosity level of the messages written to the sink; if
+`None`, all messages are written.
+"""
+_owned = False
+"""bool: True if the sink was opened by :func:`set_sink` and has to be
+closed when it is replaced.
+"""
+def set_sink(target, level=None):
+    """Sets a JSON-lines sink that receives messages and progress updates
+    for machine consumption, independently of the terminal verbosity.
+
+    Args:
+        target (str or file): path of the file to append to, or an open file;
+          `None` closes and removes the current sink.
+        level (int): highest verbosity level of the messages to write; by
+          default, all messages are written.
+    """
+    global sink, sink_level, _owned
+    if sink is not None and _owned:
+        sink.close()
+    _owned = not (target is None or hasattr(target, "write"))
+    sink = open(target, 'a') if _owned else target
+    sink_level = level
+
+def record(kind, **fields):
+    """Writes a record to the JSON-lines sink, if there is one.
+
+    Args:
+        kind (str): type of the record, e.g. "info" or "progress".
+        fields (dict): additional JSON-serializable values for the record.
+    """
+    if sink is None:
+        return
+    import json
+    from time import time
+    fields.update(kind=kind, time=time())
+    sink.write(json.dumps(fields) + "\n")
+    sink.flush()
+
+class progress(object):
+    """Rate-limited progress reporter with an estimate of the remaining
+    time. Calls to :meth:`update` are cheap enough for hot loops: when
+    neither the terminal nor the sink would show the progress, they only
+    increment a counter, and otherwise at most one report is printed per
+    `interval` seconds.
+
+    Args:
+        total (int): number of steps to completion.
+        label (str): description of the steps, e.g. "H rows".
+        level (int): verbosity level of the reports.
+        interval (float): minimum number of seconds between reports.
+
+    Examples:
+        >>> with progress(len(values), "sweep points") as p:
+        ...     for value in values:
+        ...         solve(value)
+        ...         p.update()
+    """
+    def __init__(self, total, label="", level=1, interval=0.5):
+        from time import time
+        self.total = total
+        self.label = label
+        self.level = level
+        self.interval = interval
+        self.count = 0
+        self.start = time()
+        self._last = self.start
+        self.terminal = will_print(level)
+        self.logged = sink is not None and (sink_level is None or
+                                            level <= sink_level)
+        self.enabled = self.terminal or self.logged
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.finish()
+        return False
+
+    def update(self, n=1):
+        """Advances the progress by `n` steps, reporting it if the last
+        report is older than the interval.
+        """
+        self.count += n
+        if not self.enabled:
+            return
+        from time import time
+        now = time()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._report(now)
+
+    def finish(self):
+        """Reports the final progress and ends the progress line.
+        """
+        if self.enabled:
+            from time import time
+            self._report(time(), True)
+
+    def _report(self, now, final=False):
+        """Prints the progress and writes it to the sink.
+        """
+        elapsed = now - self.start
+        eta = None
+        if 0 < self.count < self.total:
+            eta = elapsed*(self.total - self.count)/self.count
+        if self.terminal:
+            text = "{}: {}/{} ({:.0%}) {:.1f}s".format(
+                self.label, self.count, self.total,
+                float(self.count)/max(self.total, 1), elapsed)
+            if eta is not None:
+                text += ", ETA {:.1f}s".format(eta)
+            print(text, end="\n" if final else "\r")
+        if self.logged:
+            record("progress", label=self.label, count=self.count,
+                   total=self.total, elapsed=elapsed, eta=eta, level=self.level)
@@ -2,6 +2,46 @@
 """
 import numpy as np
 from basis import msg
+def _degree(node, names):
+    """Returns the polynomial degree of an expression in the variables
+    `names`, if it is at most 1.
+
+    Args:
+        node (ast.AST): parsed expression.
+        names (set): of variable names.
+
+    Returns:
+        int: 0 if the expression does not depend on `names`, 1 if it is
+          affine in them, or `None` otherwise (or if that cannot be proven).
+    """
+    import ast
+    if not any(isinstance(n, ast.Name) and n.id in names for n in ast.walk(node)):
+        return 0
+    if isinstance(node, ast.Name):
+        return 1
+    if isinstance(node, (ast.Expression, ast.Lambda)):
+        return _degree(node.body, names)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        return _degree(node.operand, names)
+    if isinstance(node, ast.IfExp):
+        #The condition must not switch with the variables, but each branch
+        #may be affine.
+        branches = [_degree(node.body, names), _degree(node.orelse, names)]
+        if _degree(node.test, names) != 0 or None in branches:
+            return None
+        return max(branches)
+    if isinstance(node, ast.BinOp):
+        left, right = _degree(node.left, names), _degree(node.right, names)
+        if left is None or right is None:
+            return None
+        if isinstance(node.op, (ast.Add, ast.Sub)):
+            return max(left, right)
+        if isinstance(node.op, ast.Mult) and left + right <= 1:
+            return left + right
+        if isinstance(node.op, ast.Div) and right == 0:
+            return left
+    return None
+
 class Potential(object):
     """Represents a 1D quantum potential.
 
@@ -20,6 +60,9 @@ class Potential(object):
             region.
         parser (ConfigParser): parses the potential configuration
           file.
+        adjusted (dict): parameters that were overwritten using
+          :meth:`adjust`; these keep their values when the other
+          parameters are re-evaluated.
 
     Examples:
         >>> from basis.potential import Potential
@@ -35,6 +78,7 @@ class Potential(object):
         self.params = {}
         self.regions = {}
         self.parser = None
+        self.adjusted = {}
         
         self._parse_config()
 
@@ -58,7 +102,7 @@ class Potential(object):
             ValueError: if the argument is not an `int` or `float`.
         """
         if isinstance(value, list) or isinstance(value, np.ndarray):
-            return np.array(list(map(self, value)))
+            return self._evaluate(np.asarray(value, dtype=float))
 
         if not isinstance(value, (int, float)):
             raise ValueError("Only `int` and `float` values can be "
@@ -74,6 +118,29 @@ class Potential(object):
         else:
             return 0.    
 
+    def _evaluate(self, x):
+        """Evaluates the potential for an array of values, calling each
+        region's function once on all the values in its domain. Functions
+        that cannot take arrays (e.g. those with `if` expressions) are
+        called for one value at a time.
+        """
+        result = np.zeros(x.shape)
+        done = np.zeros(x.shape, dtype=bool)
+        for (xi, xf), function in self.regions.items():
+            #Like the scalar evaluation, the first matching region wins.
+            mask = (x >= xi) & (x < xf) & ~done
+            if not np.any(mask):
+                continue
+            done |= mask
+            if not hasattr(function, "__call__"):
+                result[mask] = function
+                continue
+            try:
+                result[mask] = function(x[mask])
+            except (ValueError, TypeError):
+                result[mask] = [function(xv) for xv in x[mask]]
+        return result
+
     def __mul__(self, value): # pragma: no cover
         """Increases the strength of the potential by `value`.
         
@@ -138,16 +205,55 @@ class Potential(object):
                     self.params[k] = eval(v, self.params)
                 else:
                     self.params[k] = v
+                self.adjusted[k] = self.params[k]
             else:
                 wmsg = "'{}' is not a valid parameter for '{}'."
                 msg.warn(wmsg.format(k, self.filepath))
 
         #If any of the other parameters depend on updated values, we
-        #need to re-evaluate those.
-        self._parse_params(list(kwargs.keys()))
+        #need to re-evaluate those. Parameters from earlier adjustments
+        #must keep their values.
+        self._parse_params(list(self.adjusted.keys()))
                 
         self._parse_regions()
 
+    def linear_params(self):
+        """Returns the parameters that the potential depends on linearly,
+        found by inspecting the expressions in the config file. A set of
+        parameters qualifies if every region value is affine in them
+        jointly (e.g. `v0` in `lambda x: v0 if x < a else 0.`), while
+        none of them appears in a region domain, a condition, or the
+        expression of another parameter.
+
+        Returns:
+            list: of `str` parameter names, in config file order.
+        """
+        import ast
+        raw = list(self.parser.items("parameters")) if self.parser.has_section("parameters") else []
+        domains, values = [], []
+        for i, spec in self.parser.items("regions"):
+            domain, sfunc = spec.split('|')
+            domains.append(ast.parse(domain.strip(), mode="eval"))
+            values.append(ast.parse(sfunc.strip(), mode="eval"))
+
+        def names(tree):
+            return set(n.id for n in ast.walk(tree) if isinstance(n, ast.Name))
+
+        dependents = set()
+        for param, svalue in raw:
+            dependents |= names(ast.parse(svalue.strip(), mode="eval")) - set([param])
+        fixed = dependents.union(*[names(d) for d in domains])
+        used = set().union(*[names(v) for v in values])
+
+        result = []
+        for param, svalue in raw:
+            if param in fixed or param not in used:
+                continue
+            trial = set(result + [param])
+            if all(_degree(v, trial) is not None for v in values):
+                result.append(param)
+        return result
+
     def _parse_regions(self):
         """Parses the potential's region specifications from config.
         """
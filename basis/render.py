@@ -0,0 +1,187 @@
+"""Headless rendering of many plots, e.g. the wave functions at every
+point of a parameter sweep. The figures are drawn on the
+non-interactive Agg canvas (without :mod:`matplotlib.pyplot`, so the
+configured backend does not matter) across a pool of worker processes; each
+worker keeps a single figure whose lines are updated for every frame
+instead of building a new figure, and dense curves are decimated to the
+points that the pixel resolution can show.
+"""
+import numpy as np
+def decimate(x, y, width):
+    """Reduces a dense curve to the minimum and maximum of each of `width`
+    pixel columns, which draws the same image as the full curve.
+
+    Args:
+        x (numpy.ndarray): sorted abscissas of the curve.
+        y (numpy.ndarray): ordinates of the curve.
+        width (int): number of pixel columns the curve spans.
+
+    Returns:
+        tuple: `(x, y)` with at most `2*width` points, in the original order.
+    """
+    n = len(x)
+    if n <= 2*width:
+        return x, y
+    #Split the points into `width` contiguous columns; the first `extra`
+    #columns have one point more than the rest.
+    size, extra = divmod(n, width)
+    starts = np.arange(width)*size + np.minimum(np.arange(width), extra)
+    vmin = np.minimum.reduceat(y, starts)
+    vmax = np.maximum.reduceat(y, starts)
+
+    #Locate the extrema within their columns so the output keeps the order
+    #of the original points.
+    column = np.repeat(np.arange(width), np.diff(np.append(starts, n)))
+    index = np.arange(n)
+    first = np.full(width, n)
+    last = np.full(width, -1)
+    ismin = y == vmin[column]
+    ismax = y == vmax[column]
+    np.minimum.at(first, column[ismin], index[ismin])
+    np.maximum.at(last, column[ismax], index[ismax])
+    keep = np.unique(np.concatenate((first, last)))
+    return x[keep], y[keep]
+
+def synthesize(L, C, x, prob=False, chunk=4096):
+    """Evaluates wave functions from their expansion coefficients in the
+    sine basis, like :func:`basis.evaluate.wave` but for several wave
+    functions at once and in chunks of points, so that very dense grids
+    do not need an `(npoints, N)` table in memory.
+
+    Args:
+        L (float): width of the well.
+        C (numpy.ndarray): with shape `(N, k)`; coefficients of `k` wave
+          functions in the columns.
+        x (numpy.ndarray): points to evaluate at.
+        prob (bool): when True, return the magnitude squared.
+        chunk (int): number of points to evaluate at a time.
+
+    Returns:
+        numpy.ndarray: with shape `(len(x), k)`.
+    """
+    k = np.arange(1, C.shape[0]+1)*np.pi/L
+    result = np.empty((len(x), C.shape[1]))
+    for start in range(0, len(x), chunk):
+        xs = x[start:start+chunk]
+        result[start:start+chunk] = np.dot(np.sin(np.outer(xs, k)), C)
+    return np.abs(result)**2 if prob else result
+
+def figure(figsize=(8, 6), dpi=100):
+    """Returns a figure on the Agg canvas and its axes, without going
+    through :mod:`matplotlib.pyplot`.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    result = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(result)
+    return result, result.add_subplot(111)
+
+class Renderer(object):
+    """Draws frames of line plots into a single reused Agg figure.
+
+    Args:
+        figsize (tuple): size of the figure in inches.
+        dpi (int): resolution of the saved images.
+
+    Attributes:
+        figure (matplotlib.figure.Figure): the reused figure.
+        axes (matplotlib.axes.Axes): the reused axes.
+        lines (list): of :class:`matplotlib.lines.Line2D` objects, which are
+          updated for each frame and created only when a frame has more
+          curves than any before it.
+    """
+    def __init__(self, figsize=(8, 6), dpi=100):
+        self.figure, self.axes = figure(figsize, dpi)
+        self.lines = []
+
+    @property
+    def width(self):
+        """Returns the width of the axes in pixels.
+        """
+        bbox = self.axes.get_window_extent()
+        return max(1, int(np.ceil(bbox.width)))
+
+    def render(self, filename, curves, title="", xlabel="", ylabel="",
+               ylim=None):
+        """Draws a frame and saves it.
+
+        Args:
+            filename (str): path of the image; the format follows from the
+              extension.
+            curves (list): of tuples `(x, y, color)` to plot.
+            title (str): title of the plot.
+            xlabel (str): label of the x axis.
+            ylabel (str): label of the y axis.
+            ylim (tuple): limits of the y axis; by default the axes are scaled
+              to the data.
+        """
+        width = self.width
+        for i, (x, y, color) in enumerate(curves):
+            xd, yd = decimate(x, y, width)
+            if i < len(self.lines):
+                self.lines[i].set_data(xd, yd)
+                self.lines[i].set_color(color)
+                self.lines[i].set_visible(True)
+            else:
+                self.lines.extend(self.axes.plot(xd, yd, color=color))
+        for line in self.lines[len(curves):]:
+            line.set_visible(False)
+
+        self.axes.set_title(title)
+        self.axes.set_xlabel(xlabel)
+        self.axes.set_ylabel(ylabel)
+        self.axes.relim(visible_only=True)
+        self.axes.autoscale_view()
+        if ylim is not None:
+            self.axes.set_ylim(ylim)
+        self.figure.savefig(filename)
+
+_renderer = None
+"""Renderer: in worker processes of :func:`render_waves`, the figure that
+is reused for every frame.
+"""
+def _frame(task):
+    """Renders the wave functions of a single frame in a worker process.
+    """
+    global _renderer
+    if _renderer is None:
+        _renderer = Renderer()
+    filename, L, C, prob, title, resolution = task
+    from basis.utility import colorspace
+    x = np.linspace(0, L, resolution)
+    Y = synthesize(L, C, x, prob)
+    colors = colorspace(C.shape[1])
+    curves = [(x, Y[:,i], next(colors)) for i in range(C.shape[1])]
+    _renderer.render(filename, curves, title, "x",
+                     "|psi(x)|^2" if prob else "psi(x)")
+    return filename
+
+def render_waves(frames, L, prob=False, resolution=100000, processes=None):
+    """Renders the wave functions for many frames to image files across a
+    pool of worker processes.
+
+    Args:
+        frames (list): of tuples `(filename, C, title)` where `C` has the
+          expansion coefficients of the wave functions to draw in its columns.
+        L (float): width of the well.
+        prob (bool): when True, plot the magnitude squared.
+        resolution (int): number of points to evaluate each wave function at,
+          before decimating to the pixel resolution.
+        processes (int): number of worker processes; defaults to the number
+          of CPUs. With 1, the frames are rendered in this process.
+
+    Returns:
+        list: of the file names that were written.
+    """
+    tasks = [(filename, L, C, prob, title, resolution)
+             for filename, C, title in frames]
+    if processes == 1:
+        return [_frame(task) for task in tasks]
+
+    from multiprocessing import Pool
+    pool = Pool(processes)
+    try:
+        return pool.map(_frame, tasks)
+    finally:
+        pool.terminate()
+        pool.join()
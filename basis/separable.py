@@ -0,0 +1,188 @@
+"""Solver for 2D potentials :math:`V(x, y) = V_x(x) + V_y(y) + W(x, y)`
+made of two 1D potentials and an optional weak coupling `W`.
+
+Without coupling, the Hamiltonian is the Kronecker sum
+:math:`H_x \\otimes I + I \\otimes H_y`, so its eigenstates are products
+:math:`\\phi_i(x) \\chi_j(y)` of the 1D eigenstates with energies
+:math:`E^x_i + E^y_j`. Each direction is solved with a
+:class:`basis.solver.Solver` and the lowest sums are merged, without ever
+forming the :math:`N^2 \\times N^2` product Hamiltonian.
+
+With a coupling, the Hamiltonian is expanded in the products of the
+lowest `nkeep` 1D states of each direction. The coupling is applied
+matrix-free by transforming the coefficients to a grid, multiplying by
+`W` and transforming back, and the lowest levels are found with
+:func:`basis.iterative.davidson` starting from the uncoupled states.
+"""
+import numpy as np
+from basis import msg
+def lowest_sums(Ex, Ey, nev):
+    """Returns the `nev` lowest sums :math:`E^x_i + E^y_j` of two sorted
+    arrays by merging with a heap, in :math:`O(nev \\log nev)`.
+
+    Args:
+        Ex (numpy.ndarray): energies in ascending order.
+        Ey (numpy.ndarray): energies in ascending order.
+        nev (int): number of sums to return.
+
+    Returns:
+        tuple: `(E, pairs)` with the sums in ascending order and the indices
+          `(i, j)` of each in the rows of `pairs`.
+    """
+    from heapq import heappush, heappop
+    nev = min(nev, len(Ex)*len(Ey))
+    heap = [(Ex[0] + Ey[0], 0, 0)]
+    seen = set([(0, 0)])
+    E, pairs = [], []
+    while len(E) < nev:
+        e, i, j = heappop(heap)
+        E.append(e)
+        pairs.append((i, j))
+        for k, l in ((i+1, j), (i, j+1)):
+            if k < len(Ex) and l < len(Ey) and (k, l) not in seen:
+                seen.add((k, l))
+                heappush(heap, (Ex[k] + Ey[l], k, l))
+    return np.array(E), np.array(pairs, dtype=int)
+
+def _wave(solver, Cn):
+    """Returns the domain and the wave function of a 1D solution.
+    """
+    if solver.method == "fd":
+        from basis import fd
+        return fd.domain(solver.V), fd.wave(solver.V, Cn)
+    basis = solver.get_basis()
+    return basis.domain, basis.wave(Cn)
+
+def coupling(expression):
+    """Returns the coupling function for an expression in `x` and `y`,
+    e.g. `"0.1*x*y"`, which may use `numpy` (also as `np`).
+    """
+    namespace = {"numpy": np, "np": np}
+    return eval("lambda x, y: " + expression, namespace)
+
+class Separable(object):
+    """Solves a separable 2D potential with a 1D solver for each direction.
+
+    Args:
+        solvers (tuple): of the :class:`basis.solver.Solver` objects for the
+          `x` and `y` directions.
+        W (function): coupling :math:`W(x, y)` for arrays of `x` (in the
+          rows) and `y` (in the columns) values; if `None`, the problem is
+          exactly separable.
+        nkeep (int): number of 1D states of each direction in the product
+          basis for the coupled problem; defaults to `2*nev`.
+        npoints (int): number of grid points in each direction for
+          applying the coupling.
+
+    Attributes:
+        E (list): of the 1D energies of the last solve for each direction.
+        C (list): of the 1D eigenvectors of the last solve in the columns,
+          for each direction.
+
+    Examples:
+        >>> from basis.solver import Solver
+        >>> lattice = Solver("potentials/paper.cfg", 200)
+        >>> well = Solver("well.cfg", 30, basis="harmonic")
+        >>> E, X = Separable((lattice, well)).solve(10)
+    """
+    def __init__(self, solvers, W=None, nkeep=None, npoints=200):
+        self.solvers = solvers
+        self.W = W
+        self.nkeep = nkeep
+        self.npoints = npoints
+        self.E = None
+        self.C = None
+
+    def solve(self, nev=10):
+        """Returns the lowest 2D levels.
+
+        Args:
+            nev (int): number of levels to compute.
+
+        Returns:
+            tuple: `(E, X)` with the energies in ascending order and the
+              states in the columns of `X`, as coefficients of the products
+              :math:`\\phi_i(x) \\chi_j(y)` of the 1D eigenvectors in
+              :attr:`C`, at row :math:`i n_y + j`.
+        """
+        nkeep = nev if self.W is None else (self.nkeep or 2*nev)
+        self.E, self.C = [], []
+        for solver in self.solvers:
+            E, C = solver.solve(nkeep)
+            self.E.append(E[0:nkeep])
+            self.C.append(C[:,0:nkeep])
+        nx, ny = len(self.E[0]), len(self.E[1])
+
+        E, pairs = lowest_sums(self.E[0], self.E[1], nev)
+        X = np.zeros((nx*ny, len(E)))
+        X[pairs[:,0]*ny + pairs[:,1], np.arange(len(E))] = 1.
+        if self.W is None:
+            return E, X
+
+        from basis.iterative import davidson
+        matvec, diag = self.operator()
+        E, X, niter = davidson(matvec, diag, len(E), X=X)
+        msg.info("Coupled levels converged in {} iterations.", 2,
+                 args=(niter,))
+        return E, X
+
+    def _grids(self):
+        """Returns the grid points of each direction and the 1D states at
+        them, normalized on the grid so that the grid sums approximate the
+        overlap integrals. The wave functions of the bases need not be
+        normalized over their domain (the sine basis lacks the
+        :math:`\\sqrt{2/L}` factor, and the plane waves are normalized over a
+        single cell but span all of the regions).
+        """
+        grids, Phi = [], []
+        for solver, C in zip(self.solvers, self.C):
+            xi, xf = _wave(solver, C[:,0])[0]
+            h = (xf - xi)/float(self.npoints)
+            x = xi + h*(np.arange(self.npoints) + 0.5)
+            values = np.array([_wave(solver, C[:,i])[1](x)
+                               for i in range(C.shape[1])])
+            norms = np.sqrt(np.sum(np.abs(values)**2, axis=1))
+            grids.append(x)
+            Phi.append(values/norms[:,np.newaxis])
+        return grids, Phi
+
+    def operator(self):
+        """Returns the matrix-free Hamiltonian in the product basis of the
+        last 1D solves and its diagonal.
+
+        Returns:
+            tuple: `(matvec, diag)` for :func:`basis.iterative.davidson`.
+        """
+        (x, y), (Px, Py) = self._grids()
+        Wxy = self.W(x[:,np.newaxis], y[np.newaxis,:])*np.ones((len(x), len(y)))
+        nx, ny = Px.shape[0], Py.shape[0]
+        H0 = np.add.outer(self.E[0], self.E[1]).ravel()
+        diag = H0 + np.dot(np.dot(np.abs(Px)**2, Wxy), (np.abs(Py)**2).T).ravel()
+
+        def matvec(v):
+            V = v.reshape((nx, ny, -1))
+            result = np.empty(V.shape, dtype=np.result_type(V, Px, Py))
+            for k in range(V.shape[2]):
+                psi = np.dot(np.dot(Px.T, V[:,:,k]), Py)
+                result[:,:,k] = np.dot(np.dot(Px.conj(), Wxy*psi), Py.conj().T)
+            return result.reshape(v.shape) + (H0*v.T).T
+
+        return matvec, diag
+
+    def wave(self, Xn):
+        """Returns the 2D wave function for a column of the states from
+        :meth:`solve`.
+
+        Returns:
+            function: of `(x, y)` arrays that broadcast against each other.
+        """
+        nx, ny = self.C[0].shape[1], self.C[1].shape[1]
+        X = Xn.reshape((nx, ny))
+        waves = [[_wave(solver, C[:,i])[1] for i in range(C.shape[1])]
+                 for solver, C in zip(self.solvers, self.C)]
+        def evaluate(x, y):
+            fx = [f(x) for f in waves[0]]
+            fy = [f(y) for f in waves[1]]
+            return sum(X[i, j]*fx[i]*fy[j] for i in range(nx)
+                       for j in range(ny) if X[i, j] != 0)
+        return evaluate
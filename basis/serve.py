@@ -0,0 +1,295 @@
+#!/usr/bin/python
+"""Persistent solve server and its client. The server keeps the parsed
+potentials, the sine tables and the solved Hamiltonians in memory, so
+repeated requests skip the interpreter startup, the imports and the
+assembly that a fresh `solve.py` pays every time.
+
+The protocol is one request per connection: the client sends a single
+line of JSON `{"job": ..., "args": ...}` where `args` are the parsed
+`solve.py` options; the server answers with a line of JSON
+`{"status": ..., "size": ...}` followed by `size` bytes of a `.npz`
+archive with the result arrays.
+"""
+from basis import msg
+def examples():
+    """Prints examples of using the script to the console using colored output.
+    """
+    script = "BASIS: persistent solve server"
+    explain = ("Keeps potentials and solutions warm in memory so that "
+               "repeated solves from shell pipelines return in milliseconds. "
+               "The client accepts all the options of `solve.py`.")
+    contents = [(("Start a server on a Unix socket."),
+                 "serve.py -listen /tmp/basis.sock", ""),
+                (("Solve `kp.cfg` with 200 basis functions on the server."),
+                 "serve.py -connect /tmp/basis.sock -N 200 -potential kp.cfg",
+                 "The energies are printed; use `-action save` to write them "
+                 "to the output files like `solve.py` does."),
+                (("Start a server on a localhost port and stop it again."),
+                 "serve.py -listen 8765",
+                 "serve.py -connect 8765 -shutdown")]
+    required = ("REQUIRED: one of `-listen` or `-connect`.")
+    output = ("RETURNS: energies printed or saved by the client.")
+    details = ("Plotting and sensitivity options are ignored by the client.")
+    outputfmt = ("")
+
+    msg.example(script, explain, contents, required, output, outputfmt, details)
+
+script_options = {
+    "-listen": dict(help=("Run the server on this Unix socket path, or on a "
+                          "localhost port if it is a number or "
+                          "`127.0.0.1:port`. Other hosts are rejected since "
+                          "the server has no authentication.")),
+    "-connect": dict(help=("Send the job to the server at this Unix socket "
+                           "path or port.")),
+    "-shutdown": dict(action="store_true",
+                      help="Stop the server at `-connect`.")
+    }
+"""dict: default command-line arguments and their
+    :meth:`argparse.ArgumentParser.add_argument` keyword arguments, in
+    addition to those of :mod:`basis.solve`.
+"""
+
+_loopback = ("127.0.0.1", "localhost")
+"""tuple: the only hosts that the server binds to; it reads config files
+and writes memory maps at paths chosen by the client, so it must never be
+reachable from the network.
+"""
+def _address(spec):
+    """Returns the socket address for a `-listen` or `-connect` value.
+
+    Returns:
+        str or tuple: the path of a Unix socket, or a `(host, port)` tuple.
+
+    Raises:
+        ValueError: for a `host:port` with a host other than localhost.
+    """
+    if spec.isdigit():
+        return ("127.0.0.1", int(spec))
+    host, sep, port = spec.rpartition(':')
+    if sep and port.isdigit():
+        if host not in _loopback:
+            raise ValueError("The server only runs on localhost, not "
+                             "'{}'.".format(host))
+        return ("127.0.0.1", int(port))
+    return spec
+
+def _pack(arrays):
+    """Returns the bytes of a `.npz` archive with the `arrays`.
+    """
+    from io import BytesIO
+    import numpy as np
+    buf = BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+maxsolvers = 8
+"""int: number of solvers the server keeps; the least recently used one is
+dropped (with its Hamiltonian) when a new one is needed.
+"""
+def _solver(server, args):
+    """Returns the cached solver and its lock for the potential and
+    options in `args`, creating them if needed.
+    """
+    import threading
+    from os import path
+    from basis.solver import Solver
+    potential = path.abspath(args["potential"])
+    key = (potential, path.getmtime(potential), args["N"], args["method"],
+           args["precision"], args["memmap"], args["pttol"], args["bandtol"],
+           args.get("basis", "sine"), args.get("cell"), args.get("k"),
+           args.get("levels"))
+    with server.lock:
+        if key not in server.solvers:
+            msg.info("Caching solver for {} with N={}.", 2,
+                     args=(potential, args["N"]))
+            server.solvers[key] = (Solver.from_args(args), threading.Lock())
+            while len(server.solvers) > maxsolvers:
+                server.solvers.popitem(last=False)
+        else:
+            server.solvers.move_to_end(key)
+        return server.solvers[key]
+
+def _job(server, request):
+    """Runs a single job on the server.
+
+    Returns:
+        dict: of the :class:`numpy.ndarray` results keyed by name.
+
+    Raises:
+        ValueError: for unknown jobs.
+    """
+    import threading
+    job, args = request["job"], request.get("args", {})
+    if job == "ping":
+        return {}
+    if job == "shutdown":
+        threading.Thread(target=server.shutdown).start()
+        return {}
+    if job == "sweep":
+        from basis.solve import _sweep_table
+        return {"table": _sweep_table(args)}
+    if job == "solve":
+        solver, lock = _solver(server, args)
+        with lock:
+            E, C = solver.solve(args["nev"])
+        return {"E": E, "C": C}
+    raise ValueError("Unknown job '{}'.".format(job))
+
+def _handler():
+    """Returns the request handler class for the server.
+    """
+    import json
+    import socketserver
+    class Handler(socketserver.StreamRequestHandler):
+        """Reads one JSON request and writes the header and the binary
+        result.
+        """
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline().decode("utf-8"))
+                payload = _pack(_job(self.server, request))
+                header = {"status": "ok", "size": len(payload)}
+            except Exception as e:
+                #Any failure of a job is reported to the client instead of
+                #taking down the server.
+                header = {"status": "error", "message": str(e), "size": 0}
+                payload = b""
+            self.wfile.write((json.dumps(header) + "\n").encode("utf-8"))
+            self.wfile.write(payload)
+    return Handler
+
+def server(address):
+    """Returns a threaded solve server; call its `serve_forever` method to
+    start handling requests.
+
+    Args:
+        address (str or tuple): Unix socket path or `(host, port)` with a
+          localhost `host`.
+
+    Raises:
+        ValueError: if `host` is not localhost.
+    """
+    import socketserver
+    import threading
+    from collections import OrderedDict
+    if isinstance(address, tuple):
+        if address[0] not in _loopback:
+            raise ValueError("The server only runs on localhost, not "
+                             "'{}'.".format(address[0]))
+        cls = type("Server", (socketserver.ThreadingTCPServer,),
+                   {"allow_reuse_address": True})
+    else:
+        from os import path, remove
+        if path.exists(address):
+            remove(address)
+        cls = socketserver.ThreadingUnixStreamServer
+    result = cls(address, _handler())
+    result.daemon_threads = True
+    result.solvers = OrderedDict()
+    result.lock = threading.Lock()
+    return result
+
+def request(address, job, args=None):
+    """Sends a job to a running server and waits for the result.
+
+    Args:
+        address (str or tuple): Unix socket path or `(host, port)`.
+        job (str): one of "solve", "sweep", "ping" or "shutdown".
+        args (dict): parsed `solve.py` arguments for the job.
+
+    Returns:
+        dict: of the :class:`numpy.ndarray` results keyed by name.
+
+    Raises:
+        ValueError: if the server could not run the job.
+    """
+    import json
+    import socket
+    from io import BytesIO
+    import numpy as np
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+        line = json.dumps({"job": job, "args": args or {}}) + "\n"
+        sock.sendall(line.encode("utf-8"))
+        stream = sock.makefile("rb")
+        header = json.loads(stream.readline().decode("utf-8"))
+        payload = stream.read(header["size"])
+        stream.close()
+    finally:
+        sock.close()
+
+    if header["status"] != "ok":
+        raise ValueError(header["message"])
+    if header["size"] == 0:
+        return {}
+    with np.load(BytesIO(payload)) as archive:
+        return dict((key, archive[key]) for key in archive.files)
+
+def _parser_options():
+    """Parses the options and arguments from the command line."""
+    import argparse
+    from basis import base
+    from basis.solve import script_options as solve_options
+    pdescr = "1D Quantum Potential Solve Server."
+    parser = argparse.ArgumentParser(parents=[base.bparser], description=pdescr)
+    for arg, options in list(solve_options.items()) + list(script_options.items()):
+        parser.add_argument(arg, **options)
+
+    args = base.exhandler(examples, parser)
+    if args is None:
+        return
+
+    return args
+
+def run(args):
+    """Runs the server if `-listen` is specified; otherwise, sends the job
+    in the arguments to the server at `-connect`.
+
+    Returns:
+        dict: of the result arrays for a client request.
+    """
+    if args["listen"]:
+        address = _address(args["listen"])
+        msg.okay("Serving basis solves on {}.", args=(address,))
+        instance = server(address)
+        try:
+            instance.serve_forever()
+        finally:
+            instance.server_close()
+        return
+
+    if not args["connect"]:
+        msg.err("Specify the server address with `-listen` or `-connect`.")
+        return
+
+    address = _address(args["connect"])
+    if args["shutdown"]:
+        return request(address, "shutdown")
+
+    from os import path
+    from basis.solve import _sweep
+    jobargs = dict((k, v) for k, v in args.items()
+                   if "-" + k not in script_options)
+    #The server resolves paths against its own working directory.
+    for key in ("potential", "memmap"):
+        if jobargs.get(key):
+            jobargs[key] = path.abspath(jobargs[key])
+    if args["sweep"]:
+        result = request(address, "sweep", jobargs)
+        _sweep(args, result["table"])
+        return result
+
+    result = request(address, "solve", jobargs)
+    if "save" in args["action"]:
+        from numpy import savetxt
+        savetxt(args["outfile"].format("E"), result["E"])
+        savetxt(args["outfile"].format("C"), result["C"])
+    if "print" in args["action"]:
+        for e in result["E"]:
+            msg.std("{:.10g}", args=(e,))
+    return result
+
+if __name__ == '__main__': # pragma: no cover
+    run(_parser_options())
@@ -1,6 +1,6 @@
 #!/usr/bin/python
 from basis import msg
-from basis.base import testmode
+from basis import base
 def examples():
     """Prints examples of using the script to the console using colored output.
     """
@@ -54,7 +54,105 @@ script_options = {
     "-potplot": dict(action="store_true",
                      help="Plot the potential."),
     "-nbconv": dict(action="store_true",
-                     help="Plot covergence of bands vs. number of barriers.")
+                     help="Plot covergence of bands vs. number of barriers."),
+    "-method": dict(choices=["diag", "perturbative", "banded", "davidson",
+                             "fd"],
+                    default="diag",
+                    help=("Choose how to solve the eigensystem: full "
+                          "diagonalization, second-order perturbation "
+                          "theory for weak potentials, the lowest `-nev` "
+                          "levels of the banded, truncated matrix, the "
+                          "lowest `-nev` levels with the matrix-free "
+                          "Hamiltonian, or a finite-difference cross-check on "
+                          "`-N` grid points.")),
+    "-levels": dict(type=int, default=3,
+                    help=("Number of grids, each with half the spacing of "
+                          "the one before, for the Richardson extrapolation "
+                          "of `-method fd`.")),
+    "-basis": dict(choices=["sine", "harmonic", "plane"], default="sine",
+                   help=("Basis to expand the wave functions in: the infinite "
+                         "square well functions, harmonic oscillator "
+                         "functions for smooth potentials whose states decay "
+                         "well inside their regions (it converges slowly when "
+                         "the regions cut the states off, as in `sho.cfg`), "
+                         "or plane waves for periodic potentials; see "
+                         ":mod:`basis.bases`.")),
+    "-cell": dict(type=float,
+                  help=("Length of the periodic cell for the plane wave "
+                        "basis; defaults to the parameter `a` of the "
+                        "potential or the extent of its regions.")),
+    "-k": dict(type=float, default=0.,
+               help="Bloch wave vector for the plane wave basis."),
+    "-precision": dict(choices=["64", "32", "mixed"], default="64",
+                       help=("Floating point precision for building and "
+                             "diagonalizing the Hamiltonian. 'mixed' solves in "
+                             "single precision and then refines the lowest "
+                             "`-nev` levels to double precision. Only the "
+                             "'diag' method without `-memmap` supports "
+                             "reduced precision.")),
+    "-memmap": dict(help=("Assemble the Hamiltonian into this memory-mapped "
+                          "`.npy` file instead of memory and find the lowest "
+                          "`-nev` levels iteratively; for very large `-N`. "
+                          "It replaces `-method` and cannot be combined with "
+                          "any other than `diag`.")),
+    "-bandtol": dict(type=float, default=1e-10,
+                     help=("Relative size of the matrix elements that are "
+                           "dropped by the banded method.")),
+    "-pttol": dict(type=float, default=0.05,
+                   help=("Largest mixing ratio |H_mn/(H_nn - H_mm)| for which "
+                         "the perturbative solution is trusted; above it, the "
+                         "full diagonalization is used instead.")),
+    "-sweep": dict(nargs=4, metavar=("PARAM", "START", "STOP", "NUM"),
+                   help=("Solve for the lowest `-nev` levels at NUM evenly "
+                         "spaced values of the potential parameter PARAM.")),
+    "-nev": dict(type=int, default=10,
+                 help=("Number of energy levels to compute in a sweep, "
+                       "with the banded method, with `-memmap` or to refine "
+                       "with `-precision mixed`.")),
+    "-processes": dict(type=int, default=1,
+                       help=("Number of worker processes for a sweep over a "
+                             "parameter that enters the Hamiltonian linearly "
+                             "(such as `v0`; sweeps over other parameters run "
+                             "in a single process) and for `-render`.")),
+    "-track": dict(action="store_true",
+                   help=("Order the levels in a sweep by following each state "
+                         "from the previous point instead of by energy; "
+                         "the sweep then runs in a single process.")),
+    "-render": dict(help=("With `-sweep`, render the wave functions of the "
+                          "levels in `-plot` at each point to image files "
+                          "named by this pattern, e.g. `wave-{:04d}.png`, "
+                          "using `-processes` workers. Without `-plot` only "
+                          "the lowest level is rendered; `-plot` without "
+                          "indices renders all `-nev` levels.")),
+    "-resolution": dict(type=int, default=100000,
+                        help=("Number of points to evaluate each rendered wave "
+                              "function at before decimating it to the pixel "
+                              "resolution.")),
+    "-profile": dict(nargs="?", const="",
+                     help=("Time each stage of the run and track its peak "
+                           "memory; the table is printed, or written as JSON "
+                           "to the file if one is given.")),
+    "-jobs": dict(help=("Run all the jobs in this JSON or YAML job file in "
+                        "one process, using `-processes` workers; see "
+                        ":mod:`basis.jobs` for the format.")),
+    "-ypotential": dict(help=("Potential config file for the `y` direction; "
+                              "the 2D potential V(x) + V(y) is then solved "
+                              "from the two 1D problems, see "
+                              ":mod:`basis.separable`.")),
+    "-yN": dict(type=int,
+                help="Number of basis functions for `y`; defaults to `-N`."),
+    "-ybasis": dict(choices=["sine", "harmonic", "plane"],
+                    help="Basis for `y`; defaults to `-basis`."),
+    "-coupling": dict(help=("Expression in `x` and `y` for a weak coupling "
+                            "W(x, y) added to the 2D potential, e.g. "
+                            "'0.1*x*y'.")),
+    "-nkeep": dict(type=int,
+                   help=("Number of 1D states of each direction to expand the "
+                         "coupled 2D states in; defaults to twice `-nev`.")),
+    "-sensitivity": dict(nargs="+",
+                         help=("Compute the derivatives of the energies with "
+                               "respect to these potential parameters using "
+                               "the Hellmann-Feynman theorem."))
     }
 """dict: default command-line arguments and their
     :meth:`argparse.ArgumentParser.add_argument` keyword arguments.
@@ -64,7 +162,6 @@ def _parser_options():
     """Parses the options and arguments from the command line."""
     #We have two options: get some of the details from the config file,
     import argparse
-    from basis import base
     pdescr = "1D Quantum Potential Solver."
     parser = argparse.ArgumentParser(parents=[base.bparser], description=pdescr)
     for arg, options in script_options.items():
@@ -82,19 +179,36 @@ def _eigsolve(args, **adjustment):
     produce the wavefunctions and energy levels.
 
     Returns:
-        (tuple): of eigenvalues and eigenvectors
+        (tuple): of the potential, eigenvalues and eigenvectors
           (:class:`numpy.ndarray`).
     """
-    from basis.evaluate import H
-    from basis.potential import Potential
-    V = Potential(args["potential"])
+    from basis.solver import Solver
+    solver = Solver.from_args(args)
     if len(adjustment) > 0:
-        V.adjust(**adjustment)
-        
-    _H = H(V, args["N"])
+        solver.update(**adjustment)
+    E, C = solver.solve(args["nev"])
+    return solver.V, E, C
 
-    from numpy.linalg import eig
-    return (V, ) + eig(_H)
+def _figure(args):
+    """Returns a new figure and its axes for the plots: a headless Agg
+    figure (see :mod:`basis.render`) when the plot is saved, and a
+    :mod:`matplotlib.pyplot` figure when it is shown.
+    """
+    if "save" in args["action"]:
+        from basis.render import figure
+        return figure()
+    import matplotlib.pyplot as plt
+    result = plt.figure()
+    return result, result.add_subplot(111)
+
+def _finish(figure, args):
+    """Saves the figure to `args["plotfile"]` or shows it.
+    """
+    if "save" in args["action"]:
+        figure.savefig(args["plotfile"])
+    elif not base.testmode: # pragma: no cover
+        import matplotlib.pyplot as plt
+        plt.show()
 
 def _plotwaves(V, EC, args):
     """Plots the wave functions for the solutions with the specified indices.
@@ -105,35 +219,40 @@ def _plotwaves(V, EC, args):
         args (dict): parsed command-line arguments.
         indices (list): 
     """
-    import matplotlib.pyplot as plt
     import numpy as np
     #We use the parameters from the potential to decide what the x-values will
     #look like. Then we evaluate the basis functions for the y-values.
-    from basis.evaluate import wave
+    from basis.bases import get, arguments
     from basis.utility import colorspace
-    
-    x = np.linspace(0, V.L, V.nb*25)
+
+    name = args.get("basis", "sine")
+    if args.get("method") == "fd":
+        #The finite-difference solutions are wave functions on a grid.
+        from basis import fd
+        domain, wave = fd.domain(V), lambda C, prob: fd.wave(V, C, prob)
+    else:
+        basis = get(name, V, len(EC[0][1]), **arguments(name, args))
+        domain, wave = basis.domain, basis.wave
+    npoints = V.nb*25 if "nb" in V.params else 1000
+    x = np.linspace(domain[0], domain[1], npoints)
     cycols = colorspace(len(args["plot"]))
+    figure, axes = _figure(args)
     for n in args["plot"]:
-        wavefun = wave(V, EC[n][1], args["prob"])
+        wavefun = wave(EC[n][1], args["prob"])
         col = next(cycols)
-        plt.plot(x, wavefun(x), color=col)
-        if args["envelope"]:
+        axes.plot(x, np.real(wavefun(x)), color=col)
+        if args["envelope"] and name == "sine":
             env = np.sin((n+1)*np.pi*x/V.L)
             if args["prob"]:
                 env = abs(env)
-            plt.plot(x, env, color=col, linestyle="dashed")
-
-    if "save" in args["action"]:
-        plt.savefig(args["plotfile"])
-    elif not testmode: # pragma: no cover
-        plt.show()
+            axes.plot(x, env, color=col, linestyle="dashed")
+    _finish(figure, args)
 
 def _plot_nbconv(args):
     """Plots the energies as we increase the number of barriers in the
     model. Reproduces figure 4 in the paper.
     """
-    import matplotlib.pyplot as plt    
+    figure, axes = _figure(args)
     for nb in range(1, 11):
         V, E, C = _eigsolve(args, nb=nb)
         xs = [nb for i in range(3*nb)]
@@ -142,72 +261,260 @@ def _plot_nbconv(args):
             #This is just a sanity check for the plotting library. It doesn't
             #ever fire.
             xs = xs[0:len(Es)]
-        plt.scatter(xs, Es[0:len(xs)], marker='s')
+        axes.scatter(xs, Es[0:len(xs)], marker='s')
 
-    plt.xlabel("Number of barriers (cells)")
-    plt.ylabel("Energy")
-    plt.xlim((0,11))
-    plt.ylim((0,100))
-        
-    if "save" in args["action"]:
-        plt.savefig(args["plotfile"])
-    elif not testmode: # pragma: no cover
-        plt.show()
+    axes.set_xlabel("Number of barriers (cells)")
+    axes.set_ylabel("Energy")
+    axes.set_xlim((0,11))
+    axes.set_ylim((0,100))
+    _finish(figure, args)
         
 def _plot_bands(V, EC, args):
     """Plots the first few bands for the potential as a function of :math:`k`.
     """
-    import matplotlib.pyplot as plt
     import numpy as np
     from operator import itemgetter
     NB=30
     k = np.linspace(0, NB//V.nb, NB)
     E = np.array(list(map(itemgetter(0), EC)))
-    plt.figure()
-    plt.scatter(k[0:NB-1], E[0:NB-1]/np.pi**2, c='k', marker='o', label="Matrix method")
-    for i in range(1, 4):
-        analytic = np.loadtxt("analytic/KP.bands.{}".format(i))
-        plt.plot(analytic[:,0], analytic[:,1],
-                 c='r', label="Analytic Solution" if i== 0 else None)
-    plt.plot(k, k**2, 'b--', label="Infinite square well")
-    plt.xlabel("$k/\pi$")
-    plt.ylabel("$E_n/\pi^2$")
-    plt.title("Kronig-Penney Band Plot")
-    plt.legend(loc=2)
-    plt.xlim((-0.1, NB//V.nb))
-    plt.ylim((0., NB/2))
+    figure, axes = _figure(args)
+    axes.scatter(k[0:NB-1], E[0:NB-1]/np.pi**2, c='k', marker='o',
+                 label="Matrix method")
+    from basis.analytic import kp_bands, extended_zone
+    nbands = NB//V.nb
+    ka, Ea = kp_bands(V.v0, V.a, V.b, nbands)
+    kx = extended_zone(ka, V.a, nbands)*V.a/np.pi
+    for i in range(nbands):
+        axes.plot(kx[i], Ea[i]/np.pi**2,
+                  c='r', label="Analytic Solution" if i == 0 else None)
+    axes.plot(k, k**2, 'b--', label="Infinite square well")
+    axes.set_xlabel("$k/\\pi$")
+    axes.set_ylabel("$E_n/\\pi^2$")
+    axes.set_title("Kronig-Penney Band Plot")
+    axes.legend(loc=2)
+    axes.set_xlim((-0.1, NB//V.nb))
+    axes.set_ylim((0., NB/2))
+    _finish(figure, args)
+        
+def _sensitivity(V, EC, args):
+    """Computes the derivatives of the energies with respect to the
+    potential parameters in `args["sensitivity"]` from the eigenvectors
+    of a single diagonalization.
 
+    Args:
+        EC (list): of tuples (En, Cn) where `En` is the eigenvalue and `Cn` is
+          the corresponding eigenvector (:class:`numpy.ndarray`).
+        args (dict): parsed command-line arguments.
+
+    Returns:
+        numpy.ndarray: table with the energies in the first column and one
+          column of derivatives for each parameter.
+    """
+    import numpy as np
+    from basis.evaluate import sensitivity
+    params = args["sensitivity"]
+    E = np.array([e for e, c in EC])
+    C = np.array([c for e, c in EC]).T
+    dE = sensitivity(V, C, params)
+    table = np.column_stack([E] + [dE[p] for p in params])
+
+    header = "E " + " ".join("dE/d{}".format(p) for p in params)
     if "save" in args["action"]:
-        plt.savefig(args["plotfile"])
-    elif not testmode: # pragma: no cover
-        plt.show()
-        
+        np.savetxt(args["outfile"].format("dE"), table, header=header)
+    if "print" in args["action"]:
+        msg.info(header)
+        for row in table:
+            msg.std(" ".join(["{:.8g}"]*len(row)), args=row)
+    return table
+
+def _sweep_table(args, states=None):
+    """Solves the potential for each point of the parameter sweep in
+    `args["sweep"]`, warm-starting each point from the previous one.
+
+    Args:
+        args (dict): parsed command-line arguments.
+        states (list): if specified, the eigenvectors of each point are
+          appended to it.
+
+    Returns:
+        numpy.ndarray: table with the parameter values in the first column
+          and the `nev` energies in the rest.
+
+    Notes:
+        The points are only distributed over `processes` workers for a
+        parameter that enters the Hamiltonian linearly and without `track`,
+        which follows the states from point to point; otherwise the sweep
+        runs in a single process.
+    """
+    import numpy as np
+    from basis.potential import Potential
+    from basis.sweep import sweep, parallel_sweep
+    from basis.evaluate import linear_params
+    param, start, stop, num = args["sweep"]
+    values = np.linspace(float(start), float(stop), int(num))
+    V = Potential(args["potential"])
+    parallel = args["processes"] > 1 and not args["track"]
+    if parallel and param not in linear_params(V):
+        #The workers only share the parts of linear Hamiltonians; the
+        #processes are still used to render the frames.
+        msg.warn("The Hamiltonian is not linear in '{}'; sweeping in a "
+                 "single process.", args=(param,))
+        parallel = False
+    elif args["processes"] > 1 and args["track"]:
+        msg.warn("Tracking the levels follows the states from point to "
+                 "point; sweeping in a single process.")
+    if parallel:
+        points = parallel_sweep(V, args["N"], param, values, args["nev"],
+                                args["processes"])
+    else:
+        points = sweep(V, args["N"], param, values, args["nev"], args["track"])
+    table = []
+    with msg.progress(len(values), "sweep points", 2) as report:
+        for value, E, C in points:
+            table.append(np.append(value, E))
+            if states is not None:
+                states.append(C)
+            report.update()
+    return np.array(table)
+
+def _sweep(args, table=None):
+    """Solves the parameter sweep in `args["sweep"]` (unless the `table`
+    from :func:`_sweep_table` is given) and saves or prints it.
+
+    Returns:
+        numpy.ndarray: table with the parameter values in the first column
+          and the `nev` energies in the rest.
+    """
+    import numpy as np
+    param = args["sweep"][0]
+    if table is None:
+        states = [] if args["render"] else None
+        table = _sweep_table(args, states)
+        if args["render"]:
+            _render(args, table, states)
+
+    if "save" in args["action"]:
+        np.savetxt(args["outfile"].format("sweep"), table,
+                   header="{} E0...E{}".format(param, args["nev"]-1))
+    if "print" in args["action"]:
+        for row in table:
+            msg.std(" ".join(["{:.8g}"]*len(row)), args=row)
+    return table
+
+def _render(args, table, states):
+    """Renders the wave functions at each point of a sweep to the image
+    files in `args["render"]`.
+
+    Raises:
+        ValueError: if a level in `args["plot"]` was not solved for.
+    """
+    from basis.potential import Potential
+    from basis.render import render_waves
+    levels = args["plot"] or list(range(args["nev"]))
+    if max(levels) >= args["nev"]:
+        raise ValueError("Only the lowest {} levels are solved in the sweep; "
+                         "cannot render level {}.".format(args["nev"],
+                                                          max(levels)))
+    param = args["sweep"][0]
+    frames = []
+    for i, (row, C) in enumerate(zip(table, states)):
+        title = "{} = {:.6g}".format(param, row[0])
+        frames.append((args["render"].format(i), C[:,levels], title))
+    L = Potential(args["potential"]).L
+    return render_waves(frames, L, args["prob"], args["resolution"],
+                        args["processes"])
+
+def _separable(args):
+    """Solves the 2D potential made of `args["potential"]` along `x` and
+    `args["ypotential"]` along `y`, and saves or prints the levels.
+
+    Returns:
+        tuple: `(E, X)` from :meth:`basis.separable.Separable.solve`.
+    """
+    import numpy as np
+    from basis.solver import Solver
+    from basis.separable import Separable, coupling
+    yargs = dict(args, potential=args["ypotential"],
+                 N=args["yN"] or args["N"],
+                 basis=args["ybasis"] or args.get("basis", "sine"))
+    solvers = (Solver.from_args(args), Solver.from_args(yargs))
+    W = coupling(args["coupling"]) if args["coupling"] else None
+    problem = Separable(solvers, W, args["nkeep"])
+    E, X = problem.solve(args["nev"])
+
+    if "save" in args["action"]:
+        np.savetxt(args["outfile"].format("E"), E)
+        np.savetxt(args["outfile"].format("C"), X)
+        np.savetxt(args["outfile"].format("Cx"), problem.C[0])
+        np.savetxt(args["outfile"].format("Cy"), problem.C[1])
+    if "print" in args["action"]:
+        for e in E:
+            msg.std("{:.8g}", args=(e,))
+    return E, X
+
 def run(args):
     """Runs the basis expansion solver for the specified potential.
     """
+    if args["profile"] is None:
+        return _run(args)
+
+    from basis import instrument
+    instrument.enable()
+    try:
+        return _run(args)
+    finally:
+        instrument.report(args["profile"])
+        instrument.disable()
+
+def _run(args):
+    """Runs the solver, sweep or batch jobs requested in the arguments.
+    """
+    from basis.instrument import stage
+    if args["jobs"]:
+        from basis.jobs import run as run_jobs
+        return run_jobs(args["jobs"], args)
+    if (args.get("basis", "sine") != "sine" or args["method"] == "fd") and (
+            args["sweep"] or args["sensitivity"] or args["bands"] or
+            args["nbconv"]):
+        raise ValueError("Sweeps, sensitivities and band plots need the sine "
+                         "basis.")
+    if args["sweep"]:
+        with stage("sweep"):
+            return _sweep(args)
+    if args.get("ypotential"):
+        with stage("separable"):
+            return _separable(args)
+
     V, E, C = _eigsolve(args)
     #We need to sort the eigenvalues and vectors to get the lowest energy ones
     #first.
     from operator import itemgetter
-    EC = list(sorted(zip(E, C.T), key=itemgetter(0)))
+    with stage("sort"):
+        EC = list(sorted(zip(E, C.T), key=itemgetter(0)))
     if ("save" in args["action"] and not
         (args["potplot"] or args["bands"] or args["nbconv"])):
         #Write the eigenvalues and vectors to file; for this project,
         #`numpy.savetxt` is probably the most useful for
         #cross-compatibility with Mathematica, etc.
         from numpy import savetxt
-        savetxt(args["outfile"].format("E"), E)
-        savetxt(args["outfile"].format("C"), C)
-
-    if args["potplot"]:
-        V.plot(0, V.L, 1000)
-    elif (args["plot"] and not
-          (args["bands"] or args["nbconv"])):
-        _plotwaves(V, EC, args)
-    elif args["bands"]:
-        _plot_bands(V, EC, args)
-    elif args["nbconv"]:
-        _plot_nbconv(args)
+        with stage("save"):
+            savetxt(args["outfile"].format("E"), E)
+            savetxt(args["outfile"].format("C"), C)
+
+    if args["sensitivity"]:
+        with stage("sensitivity"):
+            _sensitivity(V, EC, args)
+
+    with stage("plot"):
+        if args["potplot"]:
+            V.plot(0, V.L, 1000)
+        elif (args["plot"] and not
+              (args["bands"] or args["nbconv"])):
+            _plotwaves(V, EC, args)
+        elif args["bands"]:
+            _plot_bands(V, EC, args)
+        elif args["nbconv"]:
+            _plot_nbconv(args)
         
 if __name__ == '__main__': # pragma: no cover
     run(_parser_options())
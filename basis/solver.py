@@ -0,0 +1,314 @@
+"""Reusable solver for the basis expansion of a potential. A
+:class:`Solver` keeps the potential, the assembled Hamiltonian and the
+last eigenpairs between calls, so that repeated solves after small
+changes (new parameter values or a larger basis) only redo the work that
+the change invalidates.
+"""
+import numpy as np
+from basis import msg
+from basis.instrument import stage
+class Solver(object):
+    """Solves the eigensystem of the basis expansion Hamiltonian for a
+    potential and caches the intermediate results.
+
+    Args:
+        V (basis.potential.Potential): potential to solve, or the path to
+          its config file.
+        N (int): number of basis functions to use.
+        method (str): one of "diag" (full diagonalization),
+          "perturbative" (second-order perturbation theory, falling back to
+          full diagonalization when the mixing ratio exceeds `pttol`),
+          "banded" (lowest levels of the truncated banded matrix) or
+          "davidson" (lowest levels with the matrix-free Hamiltonian of the
+          basis) or "fd" (lowest levels of a finite-difference
+          discretization on `N` grid points with Richardson extrapolation;
+          see :mod:`basis.fd`).
+        precision (str): one of "64", "32" or "mixed"; see the `-precision`
+          option of :mod:`basis.solve`. Only the "diag" method without
+          `memmap` supports reduced precision.
+        memmap (str): if specified, the Hamiltonian is assembled into this
+          memory-mapped `.npy` file and the lowest levels are found
+          iteratively; only valid with the "diag" method, which it replaces.
+        pttol (float): largest mixing ratio for which the perturbative
+          solution is trusted.
+        bandtol (float): relative size of the matrix elements that the
+          banded method drops.
+        basis (str): name of the basis to expand in; see
+          :data:`basis.bases.bases`. Bases other than "sine" support the
+          "diag" and "perturbative" methods in "64" or "32" precision, and
+          "davidson" if they have a matrix-free Hamiltonian.
+        basisargs (dict): additional arguments for the basis, e.g. the Bloch
+          wave vector `k` of the plane wave basis.
+        levels (int): number of grids for the Richardson extrapolation of
+          the "fd" method.
+
+    Raises:
+        ValueError: if the basis does not support the method, precision or
+          memory map, if the memory map is combined with a method other than
+          "diag", or if the precision conflicts with the method or the
+          memory map.
+
+    Attributes:
+        V (basis.potential.Potential): potential being solved.
+        N (int): number of basis functions.
+        E (numpy.ndarray): cached energies sorted in ascending order, or
+          `None` if the cache was invalidated.
+        C (numpy.ndarray): cached eigenvectors in the columns, matching `E`.
+
+    Examples:
+        >>> solver = Solver("potentials/paper.cfg", 200)
+        >>> E, C = solver.solve()
+        >>> solver.update(v0=50.)
+        >>> E, C = solver.solve()
+        >>> solver.grow(400)
+        >>> E, C = solver.solve(nev=10)
+    """
+    def __init__(self, V, N, method="diag", precision="64", memmap=None,
+                 pttol=0.05, bandtol=1e-10, basis="sine", basisargs=None,
+                 levels=3):
+        if not hasattr(V, "adjust"):
+            from basis.potential import Potential
+            with stage("parse potential"):
+                V = Potential(V)
+        self.V = V
+        self.N = N
+        self.method = method
+        self.precision = precision
+        self.memmap = memmap
+        self.pttol = pttol
+        self.bandtol = bandtol
+        self.basis = basis
+        self.basisargs = {} if basisargs is None else basisargs
+        self.levels = levels
+        from basis.bases import bases
+        if basis != "sine" and (method == "banded" or memmap is not None or
+                                precision == "mixed"):
+            emsg = ("The {} basis does not support the banded method, "
+                    "`memmap` or mixed precision.")
+            raise ValueError(emsg.format(basis))
+        if method == "fd" and (basis != "sine" or memmap is not None or
+                               precision != "64"):
+            raise ValueError("The finite-difference method does not use a "
+                             "basis, `memmap` or reduced precision.")
+        if memmap is not None and method != "diag":
+            #The memory map always finds the lowest levels iteratively, so
+            #any other method would be silently ignored.
+            raise ValueError("`memmap` replaces the solution method and "
+                             "cannot be combined with the '{}' method."
+                             .format(method))
+        if precision != "64" and (method != "diag" or memmap is not None):
+            #The other methods and the memory map never use the single
+            #precision matrix, so the option would be silently ignored.
+            raise ValueError("Reduced precision is only supported by the "
+                             "'diag' method without `memmap`.")
+        if method == "davidson" and not hasattr(bases.get(basis), "op"):
+            emsg = "The {} basis does not have a matrix-free Hamiltonian."
+            raise ValueError(emsg.format(basis))
+        self.E = None
+        self.C = None
+
+        self._H = None
+        self._linear = None
+        self._nev = None
+        self._guess = None
+
+    @staticmethod
+    def from_args(args):
+        """Returns a solver for the parsed command-line arguments of
+        :mod:`basis.solve`.
+        """
+        from basis.bases import arguments
+        basis = args.get("basis", "sine")
+        return Solver(args["potential"], args["N"], args["method"],
+                      args["precision"], args["memmap"], args["pttol"],
+                      args["bandtol"], basis, arguments(basis, args),
+                      args.get("levels", 3))
+
+    def get_basis(self):
+        """Returns the basis for the current potential and size.
+        """
+        from basis.bases import get
+        return get(self.basis, self.V, self.N, **self.basisargs)
+
+    @property
+    def H(self):
+        """Returns the dense Hamiltonian matrix for the current parameters,
+        assembling it only if it is not cached.
+        """
+        if self._H is None:
+            with stage("assemble H"):
+                if self._linear is not None:
+                    self._H = self._linear(self.V)
+                elif self.basis != "sine":
+                    self._H = self.get_basis().H()
+                else:
+                    from basis.evaluate import H
+                    self._H = H(self.V, self.N)
+        return self._H
+
+    def _invalidate(self):
+        """Clears the cached eigenpairs, keeping the eigenvectors as the
+        starting guess for iterative solves.
+        """
+        if self.C is not None:
+            self._guess = self.C[:,0:self._nev]
+        self.E, self.C, self._nev = None, None, None
+
+    def update(self, **params):
+        """Adjusts parameters of the potential. If all the changed
+        parameters enter the Hamiltonian linearly, it is rebuilt from
+        cached parts by matrix additions; otherwise it is assembled again
+        on the next solve.
+
+        Args:
+            params (dict): new values for the potential parameters; see
+              :meth:`basis.potential.Potential.adjust`.
+        """
+        changed = [k for k, v in params.items()
+                   if k not in self.V.params or self.V.params[k] != v]
+        if len(changed) == 0:
+            return
+
+        linear = self.V.linear_params()
+        islinear = (self._H is not None and self.precision == "64" and
+                    self.basis == "sine" and
+                    self.memmap is None and self.method != "banded" and
+                    all(k in linear for k in changed))
+        if islinear and self._linear is None:
+            from basis.evaluate import LinearH
+            self._linear = LinearH(self.V, self.N)
+
+        self.V.adjust(**params)
+        self._H = None
+        if not islinear:
+            self._linear = None
+        self._invalidate()
+
+    def grow(self, N):
+        """Changes the number of basis functions. The current eigenvectors
+        are kept (padded with zeros) as the starting guess for iterative
+        solves.
+
+        Args:
+            N (int): new number of basis functions.
+        """
+        if N == self.N:
+            return
+        self._invalidate()
+        if self.basis == "plane":
+            #The plane waves are ordered from the center, so the old
+            #coefficients do not carry over by padding; the sine and Hermite
+            #functions are ordered by their number of nodes.
+            self._guess = None
+        if self._guess is not None:
+            guess = np.zeros((N, self._guess.shape[1]))
+            n = min(N, self._guess.shape[0])
+            guess[0:n] = self._guess[0:n]
+            self._guess = guess
+        self.N = N
+        self._H = None
+        self._linear = None
+
+    def solve(self, nev=None):
+        """Returns the lowest eigenpairs of the Hamiltonian, solving only if
+        the cached ones are out of date.
+
+        Args:
+            nev (int): minimum number of levels needed. The banded,
+              memory-mapped and mixed precision solves compute only these
+              (defaults to 10); the other methods always compute all `N`.
+
+        Returns:
+            tuple: `(E, C)` with all the cached energies sorted in ascending
+              order and the eigenvectors in the columns of `C`.
+        """
+        if nev is None or not self.iterative:
+            nev = 10 if self.iterative else self.N
+        nev = min(nev, self.N)
+        if self.E is None or self._nev < nev:
+            with stage("eigensolve"):
+                E, C = self._solve(nev)
+            with stage("sort eigenpairs"):
+                order = np.argsort(E)
+                self.E, self.C = E[order], C[:,order]
+            self._nev = len(self.E)
+            self._guess = None
+        return self.E, self.C
+
+    @property
+    def iterative(self):
+        """Returns True if the solution method finds only the lowest levels.
+        """
+        return (self.method in ("banded", "davidson", "fd") or
+                self.memmap is not None or self.precision == "mixed")
+
+    def _solve(self, nev):
+        """Solves the eigensystem with the configured method.
+        """
+        from basis.evaluate import Hdiag
+        from basis.iterative import davidson
+        V, N = self.V, self.N
+        if self.method == "banded":
+            from basis.evaluate import Hbanded
+            from scipy.linalg import eig_banded
+            with stage("assemble H"):
+                ab = Hbanded(V, N, tol=self.bandtol)
+            msg.info("Using {} sub-diagonals.", 2, args=(len(ab)-1,))
+            return eig_banded(ab, lower=True, select='i',
+                              select_range=(0, nev-1))
+
+        if self.method == "fd":
+            from basis.fd import richardson
+            E, C, error = richardson(V, N, nev, self.levels)
+            msg.info("Estimated error of the extrapolated energies: {:.3g}.",
+                     2, args=(np.max(error),))
+            return E, C
+
+        if self.method == "davidson":
+            basis = self.get_basis()
+            E, C, niter = davidson(basis.op(), basis.diag(), nev, X=self._guess)
+            msg.info("Converged {} levels in {} iterations.", 2,
+                     args=(nev, niter))
+            return E, C
+
+        if self.memmap is not None:
+            from basis.evaluate import Hmemmap, Hmemmapop
+            with stage("assemble H"):
+                _H = Hmemmap(V, N, self.memmap)
+            E, C, niter = davidson(Hmemmapop(_H), Hdiag(V, N), nev,
+                                   X=self._guess)
+            return E, C
+
+        if self.precision != "64":
+            with stage("assemble H"):
+                _H = self.get_basis().H(dtype=np.float32)
+            E, C = np.linalg.eigh(_H)
+            del _H
+            if self.precision == "32":
+                return E, C
+
+            #The single precision eigenvectors are an excellent starting block
+            #for a few double precision Davidson iterations with the
+            #matrix-free operator, which needs no double precision matrix.
+            from basis.evaluate import Hop
+            X = C[:,0:min(nev+4, N)].astype(float)
+            E, C, niter = davidson(Hop(V, N), Hdiag(V, N), nev, X=X, tol=1e-12)
+            msg.info("Refined {} levels in {} iterations.", 2, args=(nev, niter))
+            return E, C
+
+        if self.method == "perturbative":
+            from basis.evaluate import perturbative
+            E, C, indicator = perturbative(self.H)
+            if indicator <= self.pttol:
+                imsg = ("Perturbation theory mixing ratio {0:.3g} is within "
+                        "{1:.3g}.")
+                msg.info(imsg, 2, args=(indicator, self.pttol))
+                return E, C
+            imsg = ("Perturbation theory mixing ratio {0:.3g} exceeds {1:.3g}; "
+                    "using full diagonalization.")
+            msg.info(imsg, 2, args=(indicator, self.pttol))
+
+        from numpy.linalg import eig, eigh
+        if np.iscomplexobj(self.H):
+            return eigh(self.H)
+        return eig(self.H)
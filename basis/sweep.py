@@ -0,0 +1,191 @@
+"""Parameter sweeps of the lowest energy levels. Between neighboring
+points of a smooth sweep the eigenvectors change very little, so each
+point is solved with the block Davidson iteration from
+:mod:`basis.iterative`, starting from the eigenvectors of the previous
+point instead of diagonalizing from scratch.
+"""
+import numpy as np
+def _track(Cprev, C):
+    """Returns the permutation of the columns of `C` that best matches
+    the states in `Cprev`, by the magnitude of their overlaps.
+    """
+    from basis.bands import match
+    return match(-np.abs(np.dot(Cprev.T, C)))
+
+def sweep(V, N, param, values, nev=10, track=False, tol=1e-10):
+    """Solves for the lowest energy levels as a parameter of the
+    potential varies.
+
+    Args:
+        V (basis.potential.Potential): potential to sweep; it is adjusted in
+          place and is left at the last value.
+        N (int): number of basis functions to use.
+        param (str): name of the parameter to vary.
+        values (list): of values for the parameter, in sweep order.
+        nev (int): number of energy levels to compute at each point.
+        track (bool): when True (continuation mode), the states are ordered
+          by their overlap with the states at the previous point, so that
+          level `i` follows the same state through crossings. Otherwise the
+          levels are sorted by energy.
+        tol (float): convergence tolerance for the eigensolver.
+
+    Returns:
+        generator: yielding tuples `(value, E, C)` for each point with the
+          energies and the eigenvectors in the columns of `C`.
+
+    Examples:
+        >>> from basis.potential import Potential
+        >>> V = Potential("paper.cfg")
+        >>> for v0, E, C in sweep(V, 400, "v0", np.linspace(0, 100, 101)):
+        ...     print(v0, E[0])
+    """
+    from basis.evaluate import Hop, Hdiag
+    from basis.iterative import davidson
+    C = None
+    for value in values:
+        V.adjust(**{param: value})
+        Enew, Cnew, niter = davidson(Hop(V, N), Hdiag(V, N), nev, X=C, tol=tol)
+        if track and C is not None:
+            order = _track(C, Cnew)
+            Enew, Cnew = Enew[order], Cnew[:,order]
+        if C is not None:
+            #Keep the phases consistent so the eigenvectors vary smoothly.
+            signs = np.sign(np.sum(C*Cnew, axis=0))
+            Cnew = Cnew*np.where(signs == 0, 1., signs)
+        E, C = Enew, Cnew
+        yield value, E, C
+
+_shared = {}
+"""dict: in worker processes of :func:`parallel_sweep`, the shared
+memory blocks and the array views of the Hamiltonian parts.
+"""
+def _open(name):
+    """Attaches to an existing shared memory block without registering it
+    with the resource tracker, which would otherwise unlink the block when
+    the worker exits (or warn about it as leaked) before the parent is done
+    with it. Before Python 3.13, :class:`SharedMemory` always registers, so
+    the registration is suppressed while attaching; the tracker is shared
+    with the parent, which still owns the block.
+    """
+    import sys
+    from multiprocessing import resource_tracker, shared_memory
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+def _attach(names, N):
+    """Initializes a worker process by attaching to the shared memory
+    blocks that hold the parts of the Hamiltonian; they are closed again by
+    :func:`_detach` when the worker exits.
+    """
+    from multiprocessing.util import Finalize
+    for key, name in names.items():
+        shm = _open(name)
+        _shared[key] = (shm, np.ndarray((N, N), dtype=float, buffer=shm.buf))
+    Finalize(None, _detach, exitpriority=10)
+
+def _detach():
+    """Releases the array views and closes the shared memory blocks
+    attached by :func:`_attach`.
+    """
+    while _shared:
+        key, (shm, view) = _shared.popitem()
+        #The block cannot be closed while a view still exports its buffer.
+        del view
+        shm.close()
+
+def _solve_linear(task):
+    """Solves for the lowest levels of :math:`H_0 + \\theta G` in a worker
+    process, using the shared parts of the Hamiltonian.
+    """
+    from scipy.linalg import eigh
+    value, nev = task
+    H = _shared["H0"][1] + value*_shared["G"][1]
+    E, C = eigh(H, subset_by_index=[0, nev-1])
+    return value, E, C
+
+def linear_parts(V, N, param):
+    """Splits the Hamiltonian into :math:`H = H_0 + \\theta G` for a
+    parameter :math:`\\theta` of the potential, if it provably enters
+    linearly (see :func:`basis.evaluate.Hlinear`).
+
+    Args:
+        V (basis.potential.Potential): potential to split; it is restored
+          to its original parameters afterwards.
+        N (int): number of basis functions to use.
+        param (str): name of the parameter.
+
+    Returns:
+        tuple: `(H0, G)` of :class:`numpy.ndarray`, or `None` if the
+          Hamiltonian is not linear in the parameter.
+    """
+    from basis.evaluate import Hlinear
+    try:
+        H0, parts = Hlinear(V, N, [param])
+    except ValueError:
+        return None
+    return H0, parts[param]
+
+def parallel_sweep(V, N, param, values, nev=10, processes=None):
+    """Solves for the lowest energy levels at each value of a parameter
+    that enters the Hamiltonian linearly (such as the strength `v0` of
+    the barriers), distributing the points over worker processes.
+
+    The geometric parts :math:`H = H_0 + \\theta G` are computed once
+    and published through :mod:`multiprocessing.shared_memory`, so the
+    workers neither recompute nor receive copies of them.
+
+    Args:
+        V (basis.potential.Potential): potential to sweep.
+        N (int): number of basis functions to use.
+        param (str): name of the parameter to vary.
+        values (list): of values for the parameter.
+        nev (int): number of energy levels to compute at each point.
+        processes (int): number of worker processes; defaults to the number
+          of CPUs.
+
+    Returns:
+        generator: yielding tuples `(value, E, C)` in the order of `values`.
+
+    Raises:
+        ValueError: if the Hamiltonian is not linear in the parameter.
+    """
+    from multiprocessing import Pool, shared_memory
+    parts = linear_parts(V, N, param)
+    if parts is None:
+        raise ValueError("The Hamiltonian is not linear in '{}'.".format(param))
+
+    blocks = {}
+    try:
+        for key, part in zip(("H0", "G"), parts):
+            shm = shared_memory.SharedMemory(create=True, size=part.nbytes)
+            np.ndarray(part.shape, dtype=float, buffer=shm.buf)[:] = part
+            blocks[key] = shm
+        del parts
+
+        names = dict((key, shm.name) for key, shm in blocks.items())
+        pool = Pool(processes, initializer=_attach, initargs=(names, N))
+        finished = False
+        try:
+            tasks = [(value, nev) for value in values]
+            for result in pool.imap(_solve_linear, tasks):
+                yield result
+            finished = True
+        finally:
+            #Workers that exit normally run their finalizers, which close
+            #the blocks; if the sweep is abandoned they are killed instead.
+            if finished:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+    finally:
+        for shm in blocks.values():
+            shm.close()
+            shm.unlink()
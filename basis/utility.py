@@ -22,6 +22,12 @@ def _get_reporoot():
     codepath = path.abspath(basis.__file__)
     return path.dirname(path.dirname(codepath))
 
-reporoot = _get_reporoot()
-"""The absolute path to the repo root on the local machine.
-"""
+def __getattr__(name):
+    """Computes `reporoot`, the absolute path to the repo root on the local
+    machine, on first access.
+    """
+    if name == "reporoot":
+        global reporoot
+        reporoot = _get_reporoot()
+        return reporoot
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
@@ -31,10 +31,12 @@ setup(name='basis',
           "argparse",
           "termcolor",
           "numpy",
+          "scipy",
           "matplotlib"
       ],
+      python_requires='>=3.8',
       packages=['basis'],
-      scripts=['basis/solve.py'],
+      scripts=['basis/solve.py', 'basis/serve.py'],
       package_data={'basis': []},
       include_package_data=True,
       classifiers=[
@@ -43,9 +45,7 @@ setup(name='basis',
           'Natural Language :: English',
           'Operating System :: MacOS',
           'Programming Language :: Python',
-          'Programming Language :: Python :: 2',
-          'Programming Language :: Python :: 2.7',
           'Programming Language :: Python :: 3',
-          'Programming Language :: Python :: 3.5',
+          'Programming Language :: Python :: 3.8',
       ],
      )
@@ -18,6 +18,45 @@ def kp(request):
     from basis.potential import Potential
     return Potential("potentials/paper.cfg")
 
+def _config(tmpdir_factory, name, contents):
+    """Writes a potential config file to a temporary directory and returns
+    its path.
+    """
+    filename = str(tmpdir_factory.mktemp("potentials").join(name))
+    with open(filename, 'w') as f:
+        f.write(contents)
+    return filename
+
+@pytest.fixture(scope="session")
+def harmonic(tmpdir_factory):
+    """Returns the path to a harmonic potential with walls far beyond the
+    low-lying states.
+    """
+    return _config(tmpdir_factory, "harmonic.cfg",
+                   "[parameters]\nv0=4.\nshift=0.5\na=10.\n\n"
+                   "[regions]\n1=-a,a | lambda x: v0*(x-shift)**2\n")
+
+@pytest.fixture(scope="session")
+def well(tmpdir_factory):
+    """Returns the path to a harmonic well centered on zero.
+    """
+    return _config(tmpdir_factory, "well.cfg",
+                   "[parameters]\nv0=4.\na=8.\n\n"
+                   "[regions]\n1=-a,a | lambda x: v0*x**2\n")
+
+@pytest.fixture
+def get_sargs():
+    """Returns a function that parses a list of arguments as `sys.argv`
+    with the parser of a script module in :mod:`basis` (by default
+    `solve`).
+    """
+    import sys
+    from importlib import import_module
+    def parse(args, script="solve"):
+        sys.argv = args
+        return import_module("basis." + script)._parser_options()
+    return parse
+
 def assert_float_equal(a, b, tol=1e-10):
     """Asserts equality for floating point numbers. We could have used
     :module:`nose.tools` to do this, but we only need one thing, so it
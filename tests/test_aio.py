@@ -0,0 +1,59 @@
+"""Tests the asyncio entry points for solves and sweeps.
+"""
+import pytest
+import asyncio
+import numpy as np
+
+def test_solve_async():
+    """Tests that concurrent identical requests share one solve and that
+    the results match a synchronous solve.
+    """
+    from basis import aio
+    from basis.solver import Solver
+    calls = []
+    solve = aio._solve
+    def counted(*args):
+        calls.append(args)
+        return solve(*args)
+
+    async def main():
+        aio._solve = counted
+        try:
+            return await asyncio.gather(
+                aio.solve_async("potentials/paper.cfg", 60, 5, v0=50.),
+                aio.solve_async("potentials/paper.cfg", 60, 5, v0=50.))
+        finally:
+            aio._solve = solve
+
+    (E1, C1), (E2, C2) = asyncio.run(main())
+    assert len(calls) == 1 and E1 is E2
+    solver = Solver("potentials/paper.cfg", 60)
+    solver.update(v0=50.)
+    assert np.allclose(E1, solver.solve()[0][0:5])
+    assert len(aio._inflight) == 0
+
+def test_sweep_async():
+    """Tests the asynchronous sweep iterator and its cancellation.
+    """
+    from basis.aio import sweep_async
+    values = [10., 20., 30.]
+    async def main():
+        results = {}
+        async for value, E, C in sweep_async("potentials/paper.cfg", 40, "v0",
+                                             values, nev=3):
+            results[value] = E
+        return results
+
+    results = asyncio.run(main())
+    assert sorted(results.keys()) == values
+    assert results[10.][0] < results[30.][0]
+
+    async def cancelled():
+        sweep = sweep_async("potentials/paper.cfg", 40, "v0", values, nev=3)
+        first = await sweep.__anext__()
+        sweep.cancel()
+        with pytest.raises(StopAsyncIteration):
+            await sweep.__anext__()
+        return first
+
+    assert asyncio.run(cancelled())[0] in values
@@ -0,0 +1,38 @@
+"""Tests the analytic Kronig-Penney band solution against the basis
+expansion.
+"""
+import pytest
+import numpy as np
+
+def test_dispersion(kp):
+    """Tests that the band energies satisfy the dispersion relation and
+    are ordered by band.
+    """
+    from basis.analytic import kp_bands, kp_dispersion
+    k, E = kp_bands(kp.v0, kp.a, kp.b, 5, nk=31)
+    assert E.shape == (5, 31)
+    assert np.allclose(kp_dispersion(E, kp.v0, kp.a, kp.b), np.cos(k*kp.a))
+    assert np.all(np.diff(E, axis=0) > 0)
+
+def test_free(kp):
+    """Tests the free-particle limit, where every gap closes.
+    """
+    from basis.analytic import kp_bands, extended_zone
+    k, E = kp_bands(0., kp.a, kp.b, 4)
+    kx = extended_zone(k, kp.a, 4)
+    assert np.allclose(E, kx**2, atol=1e-5)
+
+def test_matrix(kp):
+    """Tests that the energies of the finite lattice from the basis
+    expansion lie inside the analytic bands (and not in the gaps).
+    """
+    from basis.analytic import kp_bands
+    from basis.evaluate import H
+    k, E = kp_bands(kp.v0, kp.a, kp.b, 3)
+    Em = np.sort(np.linalg.eigvalsh(H(kp, 100)))
+    Em = Em[Em < E[2].max()]
+    inband = np.zeros(len(Em), dtype=bool)
+    for i in range(3):
+        inband |= (Em > E[i].min() - 0.1) & (Em < E[i].max() + 0.1)
+    assert np.all(inband)
+    assert len(Em) > 2*kp.nb
@@ -0,0 +1,36 @@
+"""Tests interpolation of band structures from coarse grids of wave
+numbers.
+"""
+import pytest
+import numpy as np
+
+def test_order():
+    """Tests that crossing bands are followed instead of sorted.
+    """
+    from basis.bands import order_bands
+    k = np.linspace(0, np.pi, 21)
+    model = np.vstack([k, np.pi-k, 0.5+0*k])
+    ordered = order_bands(np.sort(model, axis=0))
+    for band in ordered:
+        assert min(np.abs(band - m).max() for m in model) < 1e-12
+
+def test_interpolate(kp):
+    """Tests the interpolation of the analytic Kronig-Penney bands and
+    the error estimate at verification points.
+    """
+    from basis.analytic import kp_bands
+    from basis.bands import BandInterpolator
+    k, E = kp_bands(kp.v0, kp.a, kp.b, 3, nk=17)
+    bands = BandInterpolator(k, E, kp.a)
+    assert np.allclose(bands(k), E)
+    assert bands.errors is None
+
+    kv = np.linspace(0.05, 3.1, 7)
+    kv, Ev = kp_bands(kp.v0, kp.a, kp.b, 3, k=kv)
+    errors = bands.verify(kv, Ev)
+    assert np.all(errors < 1e-5)
+    assert np.allclose(bands(kv), Ev, atol=1e-5)
+    assert bands(np.linspace(0, np.pi, 10000)).shape == (3, 10000)
+
+    with pytest.raises(ValueError):
+        BandInterpolator(k, E, kp.a, nterms=20)
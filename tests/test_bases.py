@@ -0,0 +1,153 @@
+"""Tests the basis sets for the expansion and their use by the solver.
+"""
+import pytest
+import numpy as np
+
+def test_vectorized(kp):
+    """Tests that evaluating the potential on an array matches evaluating
+    it for each value, including outside of the regions.
+    """
+    from basis.potential import Potential
+    for V in (kp, Potential("potentials/sho.cfg")):
+        x = np.linspace(-3, V.L if "L" in V.params else 3, 501)
+        assert np.allclose(V(x), [V(float(xv)) for xv in x])
+
+def test_hermite(harmonic):
+    """Tests that the Hermite functions are orthonormal.
+    """
+    from basis.potential import Potential
+    from basis.bases import HarmonicBasis
+    basis = HarmonicBasis(Potential(harmonic), 30)
+    #The functions decay beyond the domain, but are not zero yet.
+    width = basis.domain[1] - basis.center
+    x = np.linspace(basis.center - 2*width, basis.center + 2*width, 40001)
+    psi = basis._hermite((x - basis.center)/basis.scale)/np.sqrt(basis.scale)
+    S = np.dot(psi, psi.T)*(x[1] - x[0])
+    assert np.allclose(S, np.eye(30), atol=1e-8)
+
+def test_harmonic(harmonic):
+    """Tests that the harmonic basis gives the exact levels
+    :math:`\\sqrt{v_0}(2n+1)` of a harmonic potential with a few functions,
+    and wave functions that match the Hermite functions.
+    """
+    from basis.potential import Potential
+    from basis.bases import get
+    V = Potential(harmonic)
+    basis = get("harmonic", V, 20)
+    assert basis.center == pytest.approx(0.5, abs=0.01)
+    E, C = np.linalg.eigh(basis.H())
+    assert np.allclose(E[0:10], 2.*(2*np.arange(10) + 1))
+
+    x = np.linspace(-1., 2., 7)
+    psi0 = np.exp(-(x - basis.center)**2/basis.scale**2)/np.sqrt(np.pi)/basis.scale
+    assert np.allclose(basis.wave(C[:,0], True)(x), psi0)
+
+def test_sho():
+    """Tests that the harmonic basis stays inside the tight regions of
+    `sho.cfg` and converges (as :math:`1/N`) to the finite-difference
+    levels.
+    """
+    from basis.potential import Potential
+    from basis.bases import get, _extent
+    from basis.fd import richardson
+    V = Potential("potentials/sho.cfg")
+    exact = richardson(V, 999, 3)[0]
+    E = []
+    for N in (40, 160):
+        basis = get("harmonic", V, N)
+        xi, xf = _extent(V)
+        assert basis.domain[0] >= xi - 1e-12 and basis.domain[1] <= xf + 1e-12
+        E.append(np.linalg.eigvalsh(basis.H())[0:3])
+    assert np.allclose(E[1], exact, rtol=5e-3)
+    assert np.all(np.abs(E[1] - exact) < np.abs(E[0] - exact))
+
+def test_sine(kp):
+    """Tests that the sine basis matches the Hamiltonian of
+    :mod:`basis.evaluate`.
+    """
+    from basis.bases import get
+    from basis.evaluate import H
+    basis = get("sine", kp, 40)
+    assert np.allclose(basis.H(), H(kp, 40))
+    assert basis.domain == (0., kp.L)
+    with pytest.raises(ValueError):
+        get("unknown", kp, 40)
+
+def test_solver(harmonic):
+    """Tests the solver with the harmonic basis and its unsupported
+    options.
+    """
+    from basis.solver import Solver
+    solver = Solver(harmonic, 20, basis="harmonic")
+    E, C = solver.solve()
+    assert np.allclose(E[0:5], 2.*(2*np.arange(5) + 1))
+
+    solver.update(v0=9.)
+    assert solver._linear is None
+    assert np.allclose(solver.solve()[0][0:5], 3.*(2*np.arange(5) + 1))
+    #The Hermite functions are ordered by n, so the eigenvectors are padded
+    #as the starting guess.
+    solver.grow(30)
+    assert solver._guess.shape == (30, 20)
+    assert np.allclose(solver.solve()[0][0:5], 3.*(2*np.arange(5) + 1))
+
+    single = Solver(harmonic, 20, precision="32", basis="harmonic")
+    assert np.allclose(single.solve()[0][0:5], E[0:5], rtol=1e-5)
+    with pytest.raises(ValueError):
+        Solver(harmonic, 20, method="banded", basis="harmonic")
+
+def test_plane(kp):
+    """Tests the plane wave basis on a supercell against a single cell at
+    the Bloch wave vectors that the supercell contains, and its matrix-free
+    solve.
+    """
+    from basis.bases import get
+    from basis.solver import Solver
+    cell = get("plane", kp, 21, nsample=2**14)
+    assert cell.cell == kp.a and cell.domain == (0., kp.L)
+    E0 = np.linalg.eigvalsh(cell.H())[0]
+    #The supercell samples the potential at the same points.
+    supercell = get("plane", kp, 201, cell=kp.L, nsample=10*2**14)
+    E, C = np.linalg.eigh(supercell.H())
+    assert np.isclose(E[0], E0)
+
+    #The wave functions are normalized over the cell.
+    psi = supercell.wave(C[:,0], True)
+    x = np.linspace(0, kp.L, 4000, endpoint=False)
+    assert np.isclose(np.sum(psi(x))*(x[1] - x[0]), 1.)
+
+    solver = Solver(kp.filepath, 21, method="davidson", basis="plane",
+                    basisargs={"k": 1.3})
+    E, C = solver.solve(3)
+    assert np.allclose(E, np.linalg.eigvalsh(get("plane", kp, 21, k=1.3).H())[0:3])
+    solver.grow(31)
+    assert solver._guess is None
+    with pytest.raises(ValueError):
+        Solver(kp.filepath, 21, method="davidson", basis="harmonic")
+
+def test_run(harmonic, tmpdir):
+    """Tests solving and plotting with the harmonic basis from the command
+    line.
+    """
+    import sys
+    from basis.solve import _parser_options, run
+    outfile = str(tmpdir.join("output-{}.dat"))
+    plotfile = str(tmpdir.join("plots.pdf"))
+    sys.argv = ["py.test", "-potential", harmonic, "-N", "20", "-basis",
+                "harmonic", "-action", "save", "-outfile", outfile,
+                "-plotfile", plotfile, "-plot", "0", "1"]
+    run(_parser_options())
+    E = np.loadtxt(outfile.format("E"))
+    assert np.allclose(np.sort(E)[0:5], 2.*(2*np.arange(5) + 1))
+    assert tmpdir.join("plots.pdf").check()
+
+    sys.argv = ["py.test", "-potential", "potentials/paper.cfg", "-N", "21",
+                "-basis", "plane", "-k", "1.3", "-action", "save", "-outfile",
+                outfile, "-plotfile", plotfile, "-plot", "0", "-prob"]
+    run(_parser_options())
+    assert np.loadtxt(outfile.format("E")).shape == (21,)
+
+    sys.argv = ["py.test", "-potential", harmonic, "-basis", "harmonic",
+                "-sweep", "v0", "1", "2", "3"]
+    with pytest.raises(ValueError):
+        run(_parser_options())
@@ -0,0 +1,36 @@
+"""Tests the benchmark suite on tiny problem sizes.
+"""
+import pytest
+import json
+def test_compare():
+    """Tests the detection of regressions against a baseline.
+    """
+    from basis.benchmark import compare
+    baseline = {"H/paper/N=50": 1., "wave/paper/N=50": 1., "old": 1.}
+    results = {"H/paper/N=50": 1.2, "wave/paper/N=50": 2., "new": 5.}
+    assert compare(results, baseline) == [("wave/paper/N=50", 2.)]
+    assert compare(results, baseline, 0.1)[0][0] == "H/paper/N=50"
+
+def test_run(tmpdir, get_sargs):
+    """Tests running all the suites, saving the timings and comparing a
+    second run against the first.
+    """
+    from basis.benchmark import run
+    output = str(tmpdir.join("baseline.json"))
+    argv = ["py.test", "-sizes", "20", "40", "-nbs", "1", "3", "-repeat", "1",
+            "-output", output]
+    assert run(get_sargs(argv, "benchmark")) == []
+    with open(output) as f:
+        timings = json.load(f)
+    assert "numpy" in timings["machine"]
+    for key in ["H/paper/N=20", "eig/paper/N=40", "davidson/dimer/N=40",
+                "wave/paper/N=20", "nb/paper/nb=3", "run/paper/N=40",
+                "potential/sho/x=10000"]:
+        assert key in timings["results"]
+    assert not any(key.startswith("potential/wrong") for key in timings["results"])
+
+    argv = ["py.test", "-suites", "H", "-sizes", "20", "-repeat", "1",
+            "-output", str(tmpdir.join("new.json")), "-baseline", output,
+            "-threshold", "1000"]
+    assert run(get_sargs(argv, "benchmark")) == []
+    assert get_sargs(["py.test", "-examples"], "benchmark") is None
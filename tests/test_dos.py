@@ -0,0 +1,30 @@
+"""Tests the kernel polynomial estimate of the density of states.
+"""
+import pytest
+import numpy as np
+
+def test_bounds(kp):
+    """Tests that the spectral bounds contain the whole spectrum.
+    """
+    from basis.dos import bounds
+    from basis.evaluate import H
+    E = np.linalg.eigvalsh(H(kp, 100))
+    Emin, Emax = bounds(kp, 100)
+    assert Emin <= E.min()
+    assert Emax >= E.max()
+
+@pytest.mark.parametrize("matrixfree", [False, True])
+def test_count(kp, matrixfree):
+    """Tests the integrated number of states against the exact count
+    from diagonalization.
+    """
+    from basis.dos import dos
+    from basis.evaluate import H
+    N = 200
+    E = np.linalg.eigvalsh(H(kp, N))
+    energies = np.linspace(0, 1500, 7)
+    Es, rho, count = dos(kp, N, energies, nmoments=300, nvectors=20,
+                         matrixfree=matrixfree, seed=0)
+    exact = np.array([np.sum(E < e) for e in energies])
+    assert np.all(np.abs(count - exact) < 2.)
+    assert np.all(rho >= -1e-8)
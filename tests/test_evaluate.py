@@ -49,3 +49,196 @@ def test_H(kp):
     print(len(Hans), Hans[1,:])
     assert allclose(Hans, model)
     
+
+def test_Hop(kp):
+    """Tests the matrix-free Hamiltonian against the dense matrix for
+    single vectors and blocks of vectors.
+    """
+    from basis.evaluate import H, Hop
+    import numpy as np
+    Hans = H(kp, 100)
+    matvec = Hop(kp, 100)
+    v = np.random.rand(100)
+    assert np.allclose(matvec(v), Hans.dot(v))
+    X = np.random.rand(100, 3)
+    assert np.allclose(matvec(X), Hans.dot(X))
+
+def test_Hplane(kp):
+    """Tests the plane wave Hamiltonian on one cell against the analytic
+    Kronig-Penney bands, and its matrix-free operator against the dense
+    matrix.
+    """
+    from basis.evaluate import Hplane, Hplaneop, Hplanediag
+    from basis.analytic import kp_bands
+    import numpy as np
+    k, E = kp_bands(kp.v0, kp.a, kp.b, 3, k=np.array([0., 1.3]))
+    for i, ki in enumerate(k):
+        Hans = Hplane(kp, 41, kp.a, ki)
+        assert np.allclose(Hans, Hans.conj().T)
+        assert np.allclose(np.linalg.eigvalsh(Hans)[0:3], E[:,i], rtol=1e-3)
+
+    Hans = Hplane(kp, 40, kp.a, 1.3, x0=0.2)
+    matvec = Hplaneop(kp, 40, kp.a, 1.3, x0=0.2)
+    X = np.random.rand(40, 3) + 1j*np.random.rand(40, 3)
+    assert np.allclose(matvec(X), Hans.dot(X))
+    assert np.allclose(matvec(X[:,0]), Hans.dot(X[:,0]))
+    assert np.allclose(Hplanediag(kp, 40, kp.a, 1.3, x0=0.2), np.diag(Hans).real)
+
+def test_Hlinear():
+    """Tests the splitting of the Hamiltonian into the parts that depend
+    linearly on the parameters.
+    """
+    from basis.evaluate import H, Hlinear, LinearH
+    from basis.potential import Potential
+    import numpy as np
+    #The potential is adjusted below, so the shared fixture is not used.
+    V = Potential("potentials/paper.cfg")
+    v0 = V.v0
+    Hc, parts = Hlinear(V, 50)
+    assert list(parts.keys()) == ["v0"]
+    assert np.allclose(Hc + v0*parts["v0"], H(V, 50))
+    assert V.v0 == v0 and "v0" not in V.adjusted
+    with pytest.raises(ValueError):
+        Hlinear(V, 50, ["b"])
+
+    HL = LinearH(V, 50)
+    V.adjust(v0=2*v0)
+    assert np.allclose(HL(V), H(V, 50))
+    V.adjust(b=V.b/2)
+    assert np.allclose(HL(V), H(V, 50))
+
+def test_sensitivity():
+    """Tests the Hellmann-Feynman derivatives of the energies against
+    finite differences of the eigenvalues, and the analytic derivative of
+    the Hamiltonian against finite differences of the matrix.
+    """
+    from basis.evaluate import H, dH, sensitivity
+    from basis.potential import Potential
+    import numpy as np
+    #The potential is adjusted below, so the shared fixture is not used.
+    V = Potential("potentials/paper.cfg")
+    N = 60
+    E, C = np.linalg.eigh(H(V, N))
+    params = ["v0", "b", "a"]
+    dE = sensitivity(V, C[:,0:5], params)
+    assert V.adjusted == {}
+    for param in params:
+        value = V.params[param]
+        h = 1e-5
+        V.adjust(**{param: value+h})
+        Hp = H(V, N)
+        V.adjust(**{param: value-h})
+        Hm = H(V, N)
+        V.adjust(**{param: value})
+        Ep, Em = np.linalg.eigvalsh(Hp)[0:5], np.linalg.eigvalsh(Hm)[0:5]
+        assert np.allclose(dE[param], (Ep-Em)/(2*h), rtol=1e-6, atol=1e-6)
+
+        dense = dH(V, N, param)
+        assert np.allclose(dense, (Hp - Hm)/(2*h), atol=1e-5)
+        projected = np.einsum("ni,nm,mi->i", C[:,0:5], dense, C[:,0:5])
+        assert np.allclose(dE[param], projected)
+
+    with pytest.raises(ValueError):
+        sensitivity(V, C, ["nb"])
+    with pytest.raises(ValueError):
+        sensitivity(V, C, ["dummy"])
+
+def test_perturbative():
+    """Tests the perturbative solution for a weak potential against full
+    diagonalization.
+    """
+    from basis.evaluate import H, perturbative
+    from basis.potential import Potential
+    import numpy as np
+    V = Potential("potentials/paper.cfg")
+    V.adjust(v0=1.)
+    Hans = H(V, 100)
+    E, C, indicator = perturbative(Hans)
+    exact, U = np.linalg.eigh(Hans)
+    assert indicator < 0.05
+    assert np.allclose(np.sort(E), exact, atol=1e-4)
+    overlap = np.abs(np.sum(C[:,0:10]*U[:,0:10], axis=0))
+    assert np.all(overlap > 1-1e-6)
+
+    E, C, indicator = perturbative(Hans, states=False)
+    assert np.allclose(C, np.eye(100))
+
+def test_degenerate(kp):
+    """Tests the perturbative indicator for degenerate basis vectors, without
+    any warnings for the zero gaps.
+    """
+    import warnings
+    import numpy as np
+    from basis.bases import get
+    from basis.evaluate import perturbative
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        #The plane waves +m and -m are degenerate at k=0 and coupled.
+        E, C, indicator = perturbative(get("plane", kp, 21).H())
+        assert indicator == np.inf
+
+        Hd = np.array([[1., 0., 0.1], [0., 1., 0.], [0.1, 0., 2.]])
+        E, C, indicator = perturbative(Hd)
+        assert indicator == pytest.approx(0.1)
+        assert np.allclose(E, [0.99, 1., 2.01])
+
+def test_Hbanded(kp):
+    """Tests the banded storage of the Hamiltonian and the bandwidth
+    estimate.
+    """
+    from basis.evaluate import H, Hbanded, bandwidth
+    import numpy as np
+    Hans = H(kp, 50)
+    ab = Hbanded(kp, 50, w=49)
+    for i in range(50):
+        assert np.allclose(ab[i,0:50-i], np.diag(Hans, -i))
+        assert np.all(ab[i,50-i:] == 0.)
+
+    #The sharp barriers of the K-P potential decay slowly, so only a very
+    #loose tolerance truncates the band.
+    assert bandwidth(kp, 50) == 49
+    w = bandwidth(kp, 200, tol=0.3)
+    assert w < 199
+    assert Hbanded(kp, 200, tol=0.3).shape == (w+1, 200)
+
+def test_Hmemmap(kp, tmpdir):
+    """Tests the out-of-core assembly of the Hamiltonian in blocks of
+    rows.
+    """
+    from basis.evaluate import H, Hmemmap, Hmemmapop
+    import numpy as np
+    filename = str(tmpdir.join("H.npy"))
+    Hm = Hmemmap(kp, 100, filename, rows=7)
+    assert np.allclose(Hm, H(kp, 100))
+    assert np.allclose(np.load(filename, mmap_mode="r"), H(kp, 100))
+
+    matvec = Hmemmapop(Hm, rows=7)
+    v = np.random.rand(100, 3)
+    assert np.allclose(matvec(v), np.dot(H(kp, 100), v))
+    assert np.allclose(matvec(v[:,0]), np.dot(H(kp, 100), v[:,0]))
+
+def test_H32(kp):
+    """Tests the single precision Hamiltonian.
+    """
+    from basis.evaluate import H
+    import numpy as np
+    H32 = H(kp, 100, dtype=np.float32)
+    assert H32.dtype == np.float32
+    assert np.allclose(H32, H(kp, 100), rtol=1e-6)
+
+def test_Hmemory(kp):
+    """Tests that building the single precision Hamiltonian does not need
+    much more memory than the matrix itself.
+    """
+    import tracemalloc
+    import numpy as np
+    from basis.evaluate import H
+    #The sine tables are cached across calls, so they are built first.
+    H(kp, 1500, dtype=np.float32)
+    tracemalloc.start()
+    try:
+        result = H(kp, 1500, dtype=np.float32)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 1.6*result.nbytes
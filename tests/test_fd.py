@@ -0,0 +1,64 @@
+"""Tests the finite-difference cross-check solver.
+"""
+import pytest
+import numpy as np
+
+def test_richardson(harmonic):
+    """Tests that the extrapolation reaches the exact levels of a smooth
+    potential far more accurately than the finest grid.
+    """
+    from basis.potential import Potential
+    from basis.fd import eigensolve, richardson
+    V = Potential(harmonic)
+    exact = 2.*(2*np.arange(4) + 1)
+    E, U = eigensolve(V, 799, 4)
+    assert np.allclose(E, exact, atol=1e-2)
+    assert not np.allclose(E, exact, atol=1e-6)
+    assert np.allclose(np.sum(U**2, axis=0)*20./800, 1.)
+
+    E, C, error = richardson(V, 199, 4)
+    assert np.allclose(E, exact, atol=1e-6)
+    assert np.all(error < 1e-4)
+    assert C.shape == (199, 4)
+    assert np.allclose(np.sum(C**2, axis=0), 1., atol=1e-6)
+
+def test_crosscheck(kp):
+    """Tests that the finite-difference levels of the barrier potential
+    agree with the basis expansion.
+    """
+    from basis.solver import Solver
+    from basis.evaluate import H
+    from basis.fd import wave, domain, averages, grid
+    solver = Solver(kp.filepath, 999, method="fd")
+    E, C = solver.solve(4)
+    assert E.shape == (4,) and C.shape == (999, 4)
+    #The sine basis converges to within 5e-5 at N=800; without the cell
+    #averages, the steps leave an error of about 1e-2.
+    exact = np.linalg.eigvalsh(H(kp, 800))[0:4]
+    assert np.allclose(E, exact, rtol=0, atol=1e-4)
+
+    #The cell averages integrate the ten barriers of width b exactly.
+    assert np.isclose(np.sum(averages(kp, 999))*grid(kp, 999)[1],
+                      10*kp.v0*kp.b, rtol=1e-10)
+
+    psi = wave(kp, C[:,0])
+    assert domain(kp) == (0., kp.L)
+    assert psi(0.) == 0. and psi(kp.L) == 0.
+
+    with pytest.raises(ValueError):
+        Solver(kp.filepath, 999, method="fd", precision="32")
+
+def test_run(harmonic, tmpdir):
+    """Tests the finite-difference method from the command line.
+    """
+    import sys
+    from basis.solve import _parser_options, run
+    outfile = str(tmpdir.join("output-{}.dat"))
+    plotfile = str(tmpdir.join("plots.pdf"))
+    sys.argv = ["py.test", "-potential", harmonic, "-N", "199", "-method", "fd",
+                "-nev", "3", "-action", "save", "-outfile", outfile,
+                "-plotfile", plotfile, "-plot", "0", "1"]
+    run(_parser_options())
+    assert np.allclose(np.loadtxt(outfile.format("E")), [2., 6., 10.])
+    assert np.loadtxt(outfile.format("C")).shape == (199, 3)
+    assert tmpdir.join("plots.pdf").check()
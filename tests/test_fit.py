@@ -0,0 +1,26 @@
+"""Tests fitting potential parameters to a target spectrum.
+"""
+import pytest
+import numpy as np
+
+def test_fit():
+    """Tests that known parameters are recovered from the energies
+    they produce.
+    """
+    from basis.potential import Potential
+    from basis.evaluate import H
+    from basis.fit import fit
+    N = 80
+    V = Potential("potentials/paper.cfg")
+    V.adjust(v0=130., b=0.21)
+    targets = np.linalg.eigvalsh(H(V, N))[[0, 9, 12]]
+
+    V = Potential("potentials/paper.cfg")
+    fitted, E = fit(V, N, targets, ["v0", "b"], levels=[0, 9, 12])
+    assert abs(fitted["v0"] - 130.) < 1e-6
+    assert abs(fitted["b"] - 0.21) < 1e-8
+    assert np.allclose(E, targets)
+    assert V.v0 == fitted["v0"]
+
+    with pytest.raises(ValueError):
+        fit(V, N, targets, ["v0"], levels=[0])
@@ -0,0 +1,29 @@
+"""Tests the import-time budget of the package, so that library imports
+and CLI startup only load what they use.
+"""
+import pytest
+
+def test_budget():
+    """Tests that importing the library and the script modules is cheap
+    and does not load the plotting, coloring or parsing dependencies.
+    `numpy` is imported first since every numerical module needs it, so
+    its cost is not counted against the package.
+    """
+    import subprocess
+    import sys
+    code = ("import numpy, sys; import basis.evaluate, basis.solve; "
+            "print(' '.join(m for m in ('termcolor', 'matplotlib', 'argparse', "
+            "'scipy') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    assert result.stdout.strip() == ""
+
+    #The cumulative time of the top-level basis imports, in microseconds.
+    total = 0
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() in ("basis", "basis.evaluate",
+                                                      "basis.solve"):
+            total += int(fields[1])
+    assert 0 < total < 100000
@@ -0,0 +1,30 @@
+"""Tests the iterative eigensolvers against dense diagonalization.
+"""
+import pytest
+import numpy as np
+
+def test_davidson(kp):
+    """Tests cold and warm-started Davidson solves for the lowest
+    eigenpairs.
+    """
+    from basis.evaluate import H, Hop, Hdiag
+    from basis.iterative import davidson
+    N = 150
+    Hans = H(kp, N)
+    assert np.allclose(Hdiag(kp, N), np.diag(Hans))
+    exact = np.linalg.eigvalsh(Hans)[0:12]
+    E, C, cold = davidson(Hop(kp, N), Hdiag(kp, N), 12)
+    assert np.allclose(E, exact)
+    assert np.allclose(np.dot(C.T, C), np.eye(12))
+
+    #Warm start from the eigenvectors of a slightly different potential.
+    v0 = kp.v0
+    kp.adjust(v0=1.01*v0)
+    exact = np.linalg.eigvalsh(H(kp, N))[0:12]
+    E, C, warm = davidson(Hop(kp, N), Hdiag(kp, N), 12, X=C)
+    kp.adjust(v0=v0)
+    assert np.allclose(E, exact)
+    assert warm < cold
+
+    with pytest.raises(ValueError):
+        davidson(Hans.dot, np.diag(Hans), 12, maxiter=1)
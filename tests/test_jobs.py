@@ -0,0 +1,89 @@
+"""Tests the batch job runner.
+"""
+import pytest
+import json
+import numpy as np
+def test_schedule():
+    """Tests the grouping of jobs by potential and the largest-first order.
+    """
+    from basis.jobs import schedule
+    jobs = [{"potential": "a.cfg", "N": 100}, {"potential": "b.cfg", "N": 50},
+            {"potential": "a.cfg", "N": 300}, {"potential": "b.cfg", "N": 400}]
+    groups = schedule(jobs, {})
+    assert [[i for i, args in group] for group in groups] == [[3, 1], [2, 0]]
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_jobs(tmpdir, processes, get_sargs):
+    """Tests running a job file with adjustments, different basis sizes and
+    a failing job.
+    """
+    from basis.evaluate import H
+    from basis.potential import Potential
+    manifest = str(tmpdir.join("manifest.json"))
+    outfile = str(tmpdir.join("v0-{}.dat"))
+    from os import path
+    cfg = path.abspath("potentials/paper.cfg")
+    spec = {"defaults": {"N": 40, "nev": 3}, "manifest": manifest,
+            "jobs": [{"potential": cfg},
+                     {"potential": cfg, "adjust": {"v0": 50.},
+                      "outfile": outfile},
+                     {"potential": cfg, "N": 60},
+                     {"potential": path.abspath("potentials/missing.cfg")}]}
+    jobfile = str(tmpdir.join("jobs.json"))
+    with open(jobfile, 'w') as f:
+        json.dump(spec, f)
+
+    from basis.solve import run
+    with tmpdir.as_cwd():
+        entries = run(get_sargs(["py.test", "-jobs", jobfile, "-processes",
+                                 str(processes)]))
+
+    assert [e["status"] for e in entries] == ["ok", "ok", "ok", "error"]
+    with open(manifest) as f:
+        assert json.load(f) == json.loads(json.dumps(entries))
+
+    V = Potential("potentials/paper.cfg")
+    assert np.allclose(entries[0]["E"], np.linalg.eigvalsh(H(V, 40))[0:3])
+    assert np.allclose(entries[2]["E"], np.linalg.eigvalsh(H(V, 60))[0:3])
+    V.adjust(v0=50.)
+    exact = np.linalg.eigvalsh(H(V, 40))[0:3]
+    assert np.allclose(entries[1]["E"], exact)
+    assert np.allclose(np.loadtxt(outfile.format("E")), exact)
+
+def test_outfiles(tmpdir, get_sargs):
+    """Tests that jobs without an `outfile` write their own files, and that
+    relative potentials are found next to the job file.
+    """
+    import shutil
+    jobdir = tmpdir.mkdir("jobs")
+    shutil.copy("potentials/paper.cfg", str(jobdir.join("paper.cfg")))
+    spec = {"defaults": {"N": 30, "nev": 2},
+            "jobs": [{"potential": "paper.cfg"},
+                     {"potential": "paper.cfg", "adjust": {"v0": 50.}}]}
+    jobfile = str(jobdir.join("jobs.json"))
+    with open(jobfile, 'w') as f:
+        json.dump(spec, f)
+
+    from basis.solve import run
+    with tmpdir.mkdir("work").as_cwd():
+        entries = run(get_sargs(["py.test", "-jobs", jobfile]))
+        assert [e["status"] for e in entries] == ["ok", "ok"]
+        assert entries[0]["files"] != entries[1]["files"]
+        for entry in entries:
+            assert np.allclose(np.loadtxt(entry["files"][0]), entry["E"])
+
+def test_load(tmpdir):
+    """Tests loading YAML job files and the check for missing potentials.
+    """
+    pytest.importorskip("yaml")
+    from basis.jobs import load
+    jobfile = str(tmpdir.join("jobs.yaml"))
+    with open(jobfile, 'w') as f:
+        f.write("- potential: kp.cfg\n  N: 200\n- N: 100\n")
+    with pytest.raises(ValueError):
+        load(jobfile)
+    with open(jobfile, 'w') as f:
+        f.write("- potential: kp.cfg\n  N: 200\n")
+    spec = load(jobfile)
+    assert spec["jobs"] == [{"potential": str(tmpdir.join("kp.cfg")), "N": 200}]
+    assert spec["manifest"] == "manifest.json"
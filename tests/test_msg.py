@@ -0,0 +1,81 @@
+"""Tests the lazy formatting, progress reports and JSON-lines sink of
+the messaging module.
+"""
+import pytest
+import json
+
+@pytest.fixture
+def verbose():
+    """Enables verbosity level 2 for the test and restores the defaults.
+    """
+    from basis import msg
+    msg.set_verbosity(2)
+    msg.nocolor = True
+    yield msg
+    msg.set_verbosity(None)
+    msg.nocolor = False
+    msg.set_sink(None)
+
+def test_lazy(verbose, capsys):
+    """Tests that messages are only formatted when they are printed.
+    """
+    msg = verbose
+    calls = []
+    def text():
+        calls.append(1)
+        return "lazy"
+    msg.info(text, 3)
+    msg.info("{} of {}", 3, args=(1, 2))
+    assert calls == [] and capsys.readouterr().out == ""
+    msg.info(text, 2)
+    msg.info("{} of {}", 2, args=(1, 2))
+    msg.warn("{:.1f}", args=(0.25,))
+    assert calls == [1]
+    assert capsys.readouterr().out.split("\n")[0:3] == ["lazy", "1 of 2",
+                                                         "WARNING: 0.2"]
+
+def test_sink(verbose, tmpdir, capsys):
+    """Tests the JSON-lines sink and the rate-limited progress reports.
+    """
+    msg = verbose
+    sink = str(tmpdir.join("log.jsonl"))
+    msg.set_sink(sink, 3)
+    msg.info("hidden {}", 3, args=(1,))
+    msg.info("ignored", 4)
+    with msg.progress(1000, "rows", 2, interval=3600.) as report:
+        for i in range(1000):
+            report.update()
+    with msg.progress(10, "quiet", 4) as report:
+        report.update(10)
+    assert not report.enabled
+    msg.set_sink(None)
+
+    with open(sink) as f:
+        records = [json.loads(line) for line in f]
+    assert [r["kind"] for r in records] == ["info", "progress"]
+    assert records[0]["message"] == "hidden 1"
+    assert records[1]["count"] == 1000 and records[1]["eta"] is None
+    assert capsys.readouterr().out.strip().startswith("rows: 1000/1000 (100%)")
+
+def test_emit(capsys):
+    """Tests that the inlined check of :func:`basis.msg._emit` agrees with
+    :func:`basis.msg.will_print` for every setting.
+    """
+    from basis import msg
+    msg.nocolor = True
+    try:
+        for verbosity in (None, False, True, 0, 2):
+            for quiet in (None, False, True):
+                msg.set_verbosity(verbosity)
+                msg.set_quiet(quiet)
+                for level in (-1, 0, 1, 2, 3):
+                    msg.std("text", level)
+                    printed = capsys.readouterr().out != ""
+                    assert printed == msg.will_print(level)
+                msg.err("text", 1)
+                printed = capsys.readouterr().out != ""
+                assert printed == (msg.will_print(1) or verbosity is None)
+    finally:
+        msg.set_verbosity(None)
+        msg.set_quiet(None)
+        msg.nocolor = False
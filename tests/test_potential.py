@@ -99,3 +99,18 @@ def test_incorrect():
     """
     with pytest.raises(ValueError):
         V = Potential("potentials/wrong.cfg")
+
+def test_linear():
+    """Tests the symbolic detection of the parameters that the potential
+    depends on linearly.
+    """
+    from basis.potential import _degree
+    import ast
+    for config in ["kp", "sho", "bump"]:
+        assert Potential("potentials/{}.cfg".format(config)).linear_params() == ["v0"]
+
+    cases = [("v0*x + 2", 1), ("x**2", 0), ("v0*v0", None), ("v0/2.", 1),
+             ("1./v0", None), ("v0 if v0 > 0 else 0.", None),
+             ("-(v0 - x)", 1), ("numpy.exp(v0)", None)]
+    for expr, degree in cases:
+        assert _degree(ast.parse(expr, mode="eval"), set(["v0"])) == degree
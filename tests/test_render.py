@@ -0,0 +1,95 @@
+"""Tests the headless rendering of wave functions for sweeps.
+"""
+import pytest
+import numpy as np
+
+def test_decimate():
+    """Tests that the decimated curve keeps the extrema of every pixel
+    column in order.
+    """
+    from basis.render import decimate
+    x = np.linspace(0, 1, 100003)
+    y = np.sin(50*x) + 0.1*np.cos(3000*x)
+    xd, yd = decimate(x, y, 640)
+    assert len(xd) <= 2*640 and np.all(np.diff(xd) > 0)
+    assert yd.max() == y.max() and yd.min() == y.min()
+    assert np.allclose(np.interp(xd, x, y), yd)
+    xs = x[0:100]
+    assert decimate(xs, y[0:100], 640)[0] is xs
+
+def test_synthesize(kp):
+    """Tests the chunked wave function synthesis against
+    :func:`basis.evaluate.wave`.
+    """
+    from basis.render import synthesize
+    from basis.evaluate import wave
+    C = np.random.rand(30, 2)
+    x = np.linspace(0, kp.L, 10001)
+    Y = synthesize(kp.L, C, x, chunk=1000)
+    assert np.allclose(Y[:,1], wave(kp, C[:,1])(x))
+    assert np.allclose(synthesize(kp.L, C, x, True)[:,0],
+                       wave(kp, C[:,0])(x)**2)
+
+def test_renderer(tmpdir):
+    """Tests that the figure and its lines are reused between frames.
+    """
+    from basis.render import Renderer
+    renderer = Renderer()
+    x = np.linspace(0, 1, 50000)
+    renderer.render(str(tmpdir.join("a.png")), [(x, x, "r"), (x, x**2, "b")])
+    lines = list(renderer.lines)
+    renderer.render(str(tmpdir.join("b.png")), [(x, -x, "g")], "title")
+    assert renderer.lines == lines
+    assert not lines[1].get_visible()
+    assert len(lines[0].get_xdata()) <= 2*renderer.width
+    assert tmpdir.join("b.png").check()
+
+@pytest.mark.parametrize("processes", ["1", "2"])
+def test_sweep(tmpdir, processes):
+    """Tests rendering the wave functions of a sweep from the command line.
+    """
+    import sys
+    from basis.solve import run, _parser_options
+    pattern = str(tmpdir.join("wave-{:02d}.png"))
+    sys.argv = ["py.test", "-potential", "potentials/paper.cfg", "-N", "30",
+                "-sweep", "v0", "50", "100", "3", "-nev", "3", "-plot", "-render",
+                pattern, "-resolution", "5000", "-processes", processes,
+                "-action", "save", "-outfile", str(tmpdir.join("output-{}.dat"))]
+    run(_parser_options())
+    for i in range(3):
+        assert tmpdir.join("wave-{:02d}.png".format(i)).check()
+
+def test_options(tmpdir):
+    """Tests rendering a sweep over a parameter that is not linear with
+    several processes, and the check of the rendered levels.
+    """
+    import sys
+    from basis.solve import run, _parser_options
+    pattern = str(tmpdir.join("wave-{:02d}.png"))
+    argv = ["py.test", "-potential", "potentials/paper.cfg", "-N", "30",
+            "-sweep", "b", "0.15", "0.2", "2", "-nev", "3", "-render", pattern,
+            "-resolution", "2000", "-processes", "2", "-action", "save",
+            "-outfile", str(tmpdir.join("output-{}.dat"))]
+    sys.argv = argv
+    run(_parser_options())
+    for i in range(2):
+        assert tmpdir.join("wave-{:02d}.png".format(i)).check()
+
+    sys.argv = argv + ["-plot", "1", "3"]
+    with pytest.raises(ValueError):
+        run(_parser_options())
+
+def test_headless(tmpdir):
+    """Tests that saved plots are drawn without :mod:`matplotlib.pyplot`.
+    """
+    import sys
+    import matplotlib.pyplot as plt
+    from basis.solve import run, _parser_options
+    plt.close("all")
+    plotfile = str(tmpdir.join("waves.png"))
+    sys.argv = ["py.test", "-potential", "potentials/paper.cfg", "-N", "30",
+                "-plot", "0", "1", "-action", "save", "-plotfile", plotfile,
+                "-outfile", str(tmpdir.join("output-{}.dat"))]
+    run(_parser_options())
+    assert tmpdir.join("waves.png").check()
+    assert plt.get_fignums() == []
@@ -0,0 +1,80 @@
+"""Tests the solver for separable 2D potentials.
+"""
+import pytest
+import numpy as np
+
+def test_lowest_sums():
+    """Tests the merge of the lowest sums against sorting all of them.
+    """
+    from basis.separable import lowest_sums
+    Ex = np.sort(np.random.rand(20))
+    Ey = np.sort(np.random.rand(15))
+    E, pairs = lowest_sums(Ex, Ey, 30)
+    assert np.allclose(E, np.sort(np.add.outer(Ex, Ey).ravel())[0:30])
+    assert np.allclose(E, Ex[pairs[:,0]] + Ey[pairs[:,1]])
+    assert len(lowest_sums(Ex[0:2], Ey[0:3], 10)[0]) == 6
+
+def test_separable(kp, well):
+    """Tests that the 2D levels of a lattice and a well are the lowest sums
+    of the 1D levels, with product states.
+    """
+    from basis.solver import Solver
+    from basis.separable import Separable
+    lattice = Solver(kp.filepath, 100)
+    problem = Separable((lattice, Solver(well, 20, basis="harmonic")))
+    E, X = problem.solve(8)
+    Ex = np.sort(np.linalg.eigvalsh(lattice.H))
+    sums = np.sort(np.add.outer(Ex[0:8], 2.*(2*np.arange(8) + 1)).ravel())
+    assert np.allclose(E, sums[0:8])
+    assert np.allclose(np.abs(X).sum(axis=0), 1.)
+
+    x, y = np.array([2.3, 4.1]), np.array([0.1, -0.2])
+    i, j = divmod(np.argmax(np.abs(X[:,0])), 8)
+    psi = problem.wave(X[:,0])(x, y)
+    from basis.evaluate import wave
+    from basis.bases import get
+    chi = get("harmonic", problem.solvers[1].V, 20).wave(problem.C[1][:,j])
+    assert np.allclose(psi, wave(kp, problem.C[0][:,i])(x)*chi(y))
+
+def test_coupled(well):
+    """Tests two harmonic oscillators coupled by :math:`g x y`, whose exact
+    levels follow from the normal modes with :math:`v_0 \\pm g/2`.
+    """
+    from basis.solver import Solver
+    from basis.separable import Separable, coupling
+    solvers = (Solver(well, 20, basis="harmonic"),
+               Solver(well, 20, basis="harmonic"))
+    E, X = Separable(solvers, coupling("0.8*x*y"), nkeep=8).solve(3)
+    wp, wm = np.sqrt(4.4), np.sqrt(3.6)
+    assert np.allclose(E, [wp + wm, wp + 3*wm, 3*wp + wm], atol=1e-6)
+
+    E, X = Separable(solvers, coupling("0.3"), nkeep=6).solve(4)
+    assert np.allclose(E, [4.3, 8.3, 8.3, 12.3])
+
+def test_run(well, tmpdir):
+    """Tests the separable solve from the command line.
+    """
+    import sys
+    from basis.solve import _parser_options, run
+    outfile = str(tmpdir.join("output-{}.dat"))
+    sys.argv = ["py.test", "-potential", well, "-ypotential", well, "-N", "20",
+                "-basis", "harmonic", "-nev", "4", "-coupling", "0.8*x*y",
+                "-action", "save", "-outfile", outfile]
+    E, X = run(_parser_options())
+    assert np.allclose(np.loadtxt(outfile.format("E")), E)
+    assert np.loadtxt(outfile.format("C")).shape == (64, 4)
+    assert np.loadtxt(outfile.format("Cx")).shape == (20, 8)
+
+@pytest.mark.parametrize("basis", ["sine", "plane"])
+def test_constant(kp, basis):
+    """Tests that a constant coupling shifts every level by exactly its
+    value for bases whose wave functions are not normalized over their
+    domain.
+    """
+    from basis.solver import Solver
+    from basis.separable import Separable, coupling
+    solvers = (Solver(kp.filepath, 41, basis=basis),
+               Solver(kp.filepath, 41, basis=basis))
+    E0, X = Separable(solvers).solve(4)
+    E, X = Separable(solvers, coupling("0.5"), nkeep=6).solve(4)
+    assert np.allclose(E, E0 + 0.5)
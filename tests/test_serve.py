@@ -0,0 +1,108 @@
+"""Tests the persistent solve server and its client.
+"""
+import pytest
+import numpy as np
+@pytest.fixture
+def address(tmpdir):
+    """Starts a server on a Unix socket in a background thread.
+    """
+    import threading
+    from basis.serve import server
+    sock = str(tmpdir.join("basis.sock"))
+    instance = server(sock)
+    thread = threading.Thread(target=instance.serve_forever)
+    thread.start()
+    yield sock
+    instance.shutdown()
+    instance.server_close()
+    thread.join()
+
+def test_address():
+    """Tests the parsing of server addresses.
+    """
+    from basis.serve import _address
+    assert _address("8765") == ("127.0.0.1", 8765)
+    assert _address("localhost:8765") == ("127.0.0.1", 8765)
+    assert _address("/tmp/basis.sock") == "/tmp/basis.sock"
+    with pytest.raises(ValueError):
+        _address("0.0.0.0:8765")
+    from basis.serve import server
+    with pytest.raises(ValueError):
+        server(("0.0.0.0", 0))
+
+def test_serve(address, tmpdir, get_sargs):
+    """Tests solves, sweeps and errors through the client.
+    """
+    from basis.serve import run, request
+    from basis.evaluate import H
+    from basis.potential import Potential
+    assert request(address, "ping") == {}
+    outfile = str(tmpdir.join("output-{}.dat"))
+    argv = ["py.test", "-connect", address, "-potential", "potentials/paper.cfg",
+            "-N", "60", "-action", "save", "print", "-outfile", outfile]
+    first = run(get_sargs(argv, "serve"))
+    second = run(get_sargs(argv, "serve"))
+    exact = np.linalg.eigvalsh(H(Potential("potentials/paper.cfg"), 60))
+    assert np.allclose(first["E"], exact)
+    assert np.allclose(second["C"], first["C"])
+    assert np.allclose(np.loadtxt(outfile.format("E")), exact)
+
+    argv.extend(["-sweep", "v0", "50", "100", "3", "-nev", "2"])
+    table = run(get_sargs(argv, "serve"))["table"]
+    assert table.shape == (3, 3)
+
+    with pytest.raises(ValueError):
+        request(address, "dummy")
+    with pytest.raises(ValueError):
+        request(address, "solve", {"potential": "potentials/missing.cfg"})
+
+def test_shutdown(tmpdir, get_sargs):
+    """Tests stopping the server from the client.
+    """
+    import threading
+    from basis.serve import run, server
+    sock = str(tmpdir.join("basis.sock"))
+    instance = server(sock)
+    thread = threading.Thread(target=instance.serve_forever)
+    thread.start()
+    run(get_sargs(["py.test", "-connect", sock, "-shutdown"], "serve"))
+    thread.join(10)
+    assert not thread.is_alive()
+    instance.server_close()
+    assert get_sargs(["py.test", "-examples"], "serve") is None
+
+def test_paths(monkeypatch, get_sargs):
+    """Tests that the client sends absolute paths, since the server may run
+    in a different directory.
+    """
+    import basis.serve
+    from os import path
+    sent = {}
+    def request(address, job, args=None):
+        sent.update(args)
+        return {"E": np.zeros(1), "C": np.zeros((1, 1))}
+    monkeypatch.setattr(basis.serve, "request", request)
+    argv = ["py.test", "-connect", "8765", "-potential", "potentials/paper.cfg",
+            "-memmap", "H.npy"]
+    basis.serve.run(get_sargs(argv, "serve"))
+    assert sent["potential"] == path.abspath("potentials/paper.cfg")
+    assert sent["memmap"] == path.abspath("H.npy")
+
+def test_evict(monkeypatch, get_sargs):
+    """Tests that the server only keeps the most recently used solvers.
+    """
+    import basis.serve
+    from basis.serve import server, _solver
+    monkeypatch.setattr(basis.serve, "maxsolvers", 2)
+    instance = server(("127.0.0.1", 0))
+    try:
+        argv = ["py.test", "-potential", "potentials/paper.cfg"]
+        args = get_sargs(argv, "serve")
+        solvers = [_solver(instance, dict(args, N=N))[0] for N in (10, 20)]
+        assert _solver(instance, dict(args, N=10))[0] is solvers[0]
+        _solver(instance, dict(args, N=30))
+        assert len(instance.solvers) == 2
+        assert _solver(instance, dict(args, N=10))[0] is solvers[0]
+        assert _solver(instance, dict(args, N=20))[0] is not solvers[1]
+    finally:
+        instance.server_close()
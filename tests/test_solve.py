@@ -82,3 +82,191 @@ def test_nbconv(tmpdir):
 
     from os import path
     assert path.isfile(plotfile)   
+
+def test_sensitivity(tmpdir):
+    """Tests the table of energy derivatives with respect to potential
+    parameters.
+    """
+    outfile = str(tmpdir.join("output-{}.dat"))
+    argv = ["py.test", "-potential", "potentials/paper.cfg", "-action",
+            "save", "print", "-outfile", outfile, "-sensitivity", "v0", "b",
+            "-plot"]
+    args = get_sargs(argv)
+    run(args)
+
+    from numpy import loadtxt
+    table = loadtxt(str(tmpdir.join("output-dE.dat")))
+    assert table.shape == (100, 3)
+
+@pytest.mark.parametrize("v0", ["1.", "100."])
+def test_perturbative(tmpdir, v0):
+    """Tests the perturbative solution method, including the fallback to
+    diagonalization for a strong potential.
+    """
+    from basis.potential import Potential
+    from os import path
+    cfg = str(tmpdir.join("weak.cfg"))
+    with open("potentials/paper.cfg") as f:
+        contents = f.read()
+    with open(cfg, 'w') as f:
+        f.write(contents.replace("v0=100.", "v0={}".format(v0)))
+
+    outfile = str(tmpdir.join("output-{}.dat"))
+    argv = ["py.test", "-potential", cfg, "-action", "save", "-outfile",
+            outfile, "-method", "perturbative", "-plot"]
+    args = get_sargs(argv)
+    run(args)
+
+    from numpy import loadtxt, sort
+    from numpy.linalg import eigvalsh
+    from basis.evaluate import H
+    E = sort(loadtxt(str(tmpdir.join("output-E.dat"))))
+    exact = eigvalsh(H(Potential(cfg), 100))
+    assert abs(E - exact).max() < 1e-3
+
+def test_sweep(tmpdir):
+    """Tests the parameter sweep from the command line.
+    """
+    outfile = str(tmpdir.join("output-{}.dat"))
+    argv = ["py.test", "-potential", "potentials/paper.cfg", "-action",
+            "save", "print", "-outfile", outfile, "-sweep", "v0", "50", "100",
+            "3", "-nev", "4", "-track"]
+    args = get_sargs(argv)
+    table = run(args)
+    assert table.shape == (3, 5)
+
+    from numpy import loadtxt, allclose
+    assert allclose(loadtxt(str(tmpdir.join("output-sweep.dat"))), table)
+
+def test_banded(tmpdir):
+    """Tests the banded solution method against full diagonalization.
+    """
+    outfile = str(tmpdir.join("output-{}.dat"))
+    argv = ["py.test", "-potential", "potentials/paper.cfg", "-action",
+            "save", "-outfile", outfile, "-method", "banded", "-nev", "12",
+            "-plot"]
+    args = get_sargs(argv)
+    run(args)
+
+    from numpy import loadtxt, allclose
+    from numpy.linalg import eigvalsh
+    from basis.evaluate import H
+    from basis.potential import Potential
+    E = loadtxt(str(tmpdir.join("output-E.dat")))
+    C = loadtxt(str(tmpdir.join("output-C.dat")))
+    assert C.shape == (100, 12)
+    exact = eigvalsh(H(Potential("potentials/paper.cfg"), 100))[0:12]
+    assert allclose(E, exact)
+
+def test_memmap(tmpdir):
+    """Tests the solution from a memory-mapped Hamiltonian.
+    """
+    outfile = str(tmpdir.join("output-{}.dat"))
+    argv = ["py.test", "-potential", "potentials/paper.cfg", "-action",
+            "save", "-outfile", outfile, "-memmap", str(tmpdir.join("H.npy")),
+            "-nev", "5", "-plot"]
+    args = get_sargs(argv)
+    run(args)
+
+    from numpy import loadtxt, allclose
+    from numpy.linalg import eigvalsh
+    from basis.evaluate import H
+    from basis.potential import Potential
+    E = loadtxt(str(tmpdir.join("output-E.dat")))
+    exact = eigvalsh(H(Potential("potentials/paper.cfg"), 100))[0:5]
+    assert allclose(E, exact)
+
+@pytest.mark.parametrize("precision,tol", [("32", 1e-3), ("mixed", 1e-9)])
+def test_precision(tmpdir, precision, tol):
+    """Tests the single and mixed precision solutions against the double
+    precision one.
+    """
+    outfile = str(tmpdir.join("output-{}.dat"))
+    argv = ["py.test", "-potential", "potentials/paper.cfg", "-action",
+            "save", "-outfile", outfile, "-precision", precision, "-nev", "6",
+            "-plot"]
+    args = get_sargs(argv)
+    run(args)
+
+    from numpy import loadtxt, sort
+    from numpy.linalg import eigvalsh
+    from basis.evaluate import H
+    from basis.potential import Potential
+    E = sort(loadtxt(str(tmpdir.join("output-E.dat"))))[0:6]
+    exact = eigvalsh(H(Potential("potentials/paper.cfg"), 100))[0:6]
+    assert abs(E - exact).max() < tol
+
+def test_parallel_sweep():
+    """Tests the parallel sweep over a linear parameter from the command
+    line.
+    """
+    from numpy import sort
+    argv = ["py.test", "-potential", "potentials/paper.cfg", "-sweep", "v0",
+            "0", "100", "4", "-nev", "3", "-processes", "2", "-N", "50"]
+    args = get_sargs(argv)
+    table = run(args)
+    assert table.shape == (4, 4)
+
+    #Tracking falls back to a serial sweep, which finds the same levels.
+    tracked = run(get_sargs(argv + ["-track"]))
+    assert tracked.shape == table.shape
+    assert abs(sort(tracked[:,1:], axis=1) - table[:,1:]).max() < 1e-8
+
+def test_profile(tmpdir):
+    """Tests the per-stage timing and memory report, both as JSON and as a
+    printed table.
+    """
+    import json
+    from basis import instrument
+    outfile = str(tmpdir.join("output-{}.dat"))
+    profile = str(tmpdir.join("profile.json"))
+    argv = ["py.test", "-potential", "potentials/paper.cfg", "-action", "save",
+            "-outfile", outfile, "-plot", "-profile", profile]
+    run(get_sargs(argv))
+    with open(profile) as f:
+        records = json.load(f)
+    stages = [r["stage"] for r in records]
+    for name in ["parse potential", "eigensolve", "assemble H", "sort", "save",
+                 "plot"]:
+        assert name in stages
+    assert all(r["seconds"] >= 0 and r["peak_MB"] > 0 for r in records)
+    #Assembly is nested inside the eigensolve stage.
+    assert records[stages.index("assemble H")]["depth"] == 1
+    assert instrument.stage("disabled") is instrument._null
+
+    run(get_sargs(argv[0:-1]))
+
+def test_tracing():
+    """Tests that disabling the profile leaves memory tracing alone if it was
+    started by the caller.
+    """
+    import tracemalloc
+    from basis import instrument
+    tracemalloc.start()
+    try:
+        instrument.enable()
+        instrument.disable()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    instrument.enable()
+    instrument.disable()
+    assert not tracemalloc.is_tracing()
+
+def test_nopeak(monkeypatch):
+    """Tests the stage peaks on interpreters whose :mod:`tracemalloc` cannot
+    reset the peak (before Python 3.9).
+    """
+    import tracemalloc
+    from basis import instrument
+    monkeypatch.delattr(tracemalloc, "reset_peak")
+    instrument.enable()
+    try:
+        with instrument.stage("outer"):
+            with instrument.stage("inner"):
+                block = bytearray(2**20)
+            del block
+        outer, inner = instrument.records()
+        assert inner["peak_MB"] >= 1. and outer["peak_MB"] >= inner["peak_MB"]
+    finally:
+        instrument.disable()
@@ -0,0 +1,53 @@
+"""Tests the reusable solver object and its caching of the Hamiltonian
+and eigenpairs.
+"""
+import pytest
+import numpy as np
+
+def test_update():
+    """Tests that updates of linear and non-linear parameters give the
+    same energies as solving from scratch.
+    """
+    from basis.solver import Solver
+    from basis.evaluate import H
+    solver = Solver("potentials/paper.cfg", 60)
+    E, C = solver.solve()
+    assert E.shape == (60,) and np.all(np.diff(E) >= 0)
+    assert solver.solve()[0] is E
+
+    solver.update(v0=50.)
+    assert solver._linear is not None
+    assert np.allclose(solver.solve()[0], np.linalg.eigvalsh(H(solver.V, 60)))
+
+    solver.update(b=0.1)
+    assert solver._linear is None
+    assert np.allclose(solver.solve()[0], np.linalg.eigvalsh(H(solver.V, 60)))
+
+def test_grow(tmpdir):
+    """Tests growing the basis with an iterative method that starts from
+    the previous eigenvectors.
+    """
+    from basis.solver import Solver
+    from basis.evaluate import H
+    memmap = str(tmpdir.join("H.npy"))
+    solver = Solver("potentials/paper.cfg", 60, memmap=memmap)
+    E, C = solver.solve(5)
+    assert E.shape == (5,)
+    solver.grow(80)
+    assert solver._guess.shape == (80, 5)
+    E, C = solver.solve(5)
+    assert np.allclose(E, np.linalg.eigvalsh(H(solver.V, 80))[0:5])
+
+@pytest.mark.parametrize("method,precision,memmap", [
+    ("perturbative", "32", None), ("banded", "32", None),
+    ("davidson", "mixed", None), ("diag", "32", "H.npy"),
+    ("perturbative", "64", "H.npy"), ("davidson", "64", "H.npy")])
+def test_conflicts(method, precision, memmap):
+    """Tests that reduced precision is rejected for the methods and the
+    memory map that would ignore it, and the memory map for methods that it
+    would override.
+    """
+    from basis.solver import Solver
+    with pytest.raises(ValueError):
+        Solver("potentials/paper.cfg", 60, method=method, precision=precision,
+               memmap=memmap)
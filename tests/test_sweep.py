@@ -0,0 +1,70 @@
+"""Tests warm-started parameter sweeps of the energy levels.
+"""
+import pytest
+import numpy as np
+
+@pytest.mark.parametrize("track", [False, True])
+def test_sweep(track):
+    """Tests the sweep energies against direct diagonalization at each
+    point.
+    """
+    from basis.potential import Potential
+    from basis.evaluate import H
+    from basis.sweep import sweep
+    V = Potential("potentials/paper.cfg")
+    values = np.linspace(90., 110., 5)
+    results = list(sweep(V, 80, "v0", values, nev=8, track=track))
+    assert len(results) == 5
+
+    W = Potential("potentials/paper.cfg")
+    for value, E, C in results:
+        W.adjust(v0=value)
+        exact = np.linalg.eigvalsh(H(W, 80))[0:8]
+        assert np.allclose(np.sort(E), exact)
+        assert np.allclose(np.dot(C.T, C), np.eye(8))
+
+def test_track():
+    """Tests that tracking follows the states through a crossing.
+    """
+    from basis.sweep import _track
+    C = np.eye(4)
+    perm = [2, 0, 3, 1]
+    assert list(_track(C, C[:,perm])) == [1, 3, 0, 2]
+
+def test_parallel():
+    """Tests the sweep over a linear parameter with shared memory
+    worker processes.
+    """
+    from basis.potential import Potential
+    from basis.evaluate import H
+    from basis.sweep import parallel_sweep, linear_parts
+    V = Potential("potentials/paper.cfg")
+    values = [0., 50., 100.]
+    results = list(parallel_sweep(V, 60, "v0", values, nev=5, processes=2))
+    assert [r[0] for r in results] == values
+    for value, E, C in results:
+        V.adjust(v0=value)
+        assert np.allclose(E, np.linalg.eigvalsh(H(V, 60))[0:5])
+
+    assert linear_parts(V, 60, "b") is None
+    with pytest.raises(ValueError):
+        list(parallel_sweep(V, 60, "b", [0.1, 0.2]))
+
+def test_attach():
+    """Tests that the shared memory blocks attached by a worker are closed
+    again when it is finalized.
+    """
+    from multiprocessing import shared_memory
+    from basis.sweep import _attach, _detach, _shared
+    part = np.arange(9.).reshape(3, 3)
+    shm = shared_memory.SharedMemory(create=True, size=part.nbytes)
+    try:
+        np.ndarray(part.shape, dtype=float, buffer=shm.buf)[:] = part
+        _attach({"G": shm.name}, 3)
+        attached = _shared["G"][0]
+        assert np.allclose(_shared["G"][1], part)
+        _detach()
+        assert _shared == {} and attached.buf is None
+    finally:
+        shm.close()
+        shm.unlink()